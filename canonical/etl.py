@@ -1,4 +1,3 @@
-from django.core.exceptions import ObjectDoesNotExist
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 import os, base64, re, hashlib, hmac
@@ -6,13 +5,14 @@ import json
 
 from datetime import datetime
 
+from core import serialization
+from core.serialization import canonical_json_bytes
 from tenants.models import Account, AccountEncryption
-from tenants.local_kms import generate_encrypted_dek, decrypt_dek
+from tenants.local_kms import generate_encrypted_dek
 
 from . import etl_postcode
 from dotenv import load_dotenv
 from django.conf import settings
-import time
 
 load_dotenv()
 
@@ -53,23 +53,29 @@ def hmac_value(value: str, secret: str) -> str:
         ).hexdigest()
 
 def hash_with_platform_secret(data: dict) -> str:
-    canonical_json = json.dumps(
-        data,
-        sort_keys=True,
-        separators=(",", ":")
-    )
+    # byte-identical to json.dumps(sort_keys=True, separators=(",", ":")):
+    # stored row_hash/business_key_hash values depend on it
+    canonical_json = canonical_json_bytes(data)
     platform_secret = os.getenv("HMAC_SECRET")
     return hmac.new(
         platform_secret.encode(),
-        canonical_json.encode(),
+        canonical_json,
         hashlib.sha256
     ).hexdigest()
 
-def etl_transform(source_fields, canonical_fields, orig_header, orig_rows, tenant_mapping=None, prepare_for_display=False):
-    account = resolve_account(tenant_mapping)
-    account_encryption = get_account_encryption(account)
-    dek = decrypt_dek(account_encryption.encrypted_dek)
-    
+def etl_transform(plan, orig_header, orig_rows, prepare_for_display=False, raw_rows_as_json=True):
+    """
+    `plan` is a canonical.plan.ExecutionPlan: all schema and mapping metadata
+    is read from it, so no queries run per row.
+
+    Raw rows are returned as JSON text for display, or as the dicts
+    themselves with raw_rows_as_json=False (the ingest path stores them).
+    """
+    source_fields = plan.source_fields
+    canonical_fields = plan.canonical_fields
+    tenant_mapping = plan.tenant_mapping
+    dek = plan.dek
+
 
     #########################
     #prepare raw data storage
@@ -85,7 +91,7 @@ def etl_transform(source_fields, canonical_fields, orig_header, orig_rows, tenan
             continue
 
         raw_json_dict=dict(zip(orig_header, orig_row))
-        raw_data_storage_unencr_row_dict, raw_data_storage_encr_row_dict = raw_data_for_storage(raw_json_dict, source_fields, tenant_mapping, account, dek)
+        raw_data_storage_unencr_row_dict, raw_data_storage_encr_row_dict = raw_data_for_storage(raw_json_dict, plan)
         if raw_data_storage_unencr_row_dict==None or raw_data_storage_encr_row_dict==None:
             continue
 
@@ -117,8 +123,6 @@ def etl_transform(source_fields, canonical_fields, orig_header, orig_rows, tenan
 
         canonical_rows.append(canonical_row)
 
-    start = time.perf_counter()
-
     ####################
     #prepare for display
     ####################  
@@ -128,9 +132,8 @@ def etl_transform(source_fields, canonical_fields, orig_header, orig_rows, tenan
             canonical_row_copy_for_display = canonical_row.copy()
             for k in list(canonical_row_copy_for_display.keys()):
                 v = canonical_row_copy_for_display[k]
-                try:
-                    cf = canonical_fields.get(name=k)
-                except:
+                cf = plan.canonical_fields_by_name.get(k)
+                if cf is None:
                     # safely remove keys while iterating
                     canonical_row_copy_for_display.pop(k)
                     continue
@@ -140,19 +143,23 @@ def etl_transform(source_fields, canonical_fields, orig_header, orig_rows, tenan
                     canonical_row_copy_for_display[k] = decrypt(
                         canonical_row_copy_for_display,
                         k,
-                        str(account.short),
+                        plan.account_short,
                         dek,
                         cf.format_type
                     )
                     
             display_rows.append(canonical_row_copy_for_display)
-    
-    end = time.perf_counter()
-    print(f"prepare for display took {end - start:.6f}s")
 
-    return [json.dumps(row) for row in raw_data_storage_encr_row_dicts], canonical_rows, display_rows
+    if raw_rows_as_json:
+        raw_data_storage_encr_row_dicts = [serialization.dumps(row) for row in raw_data_storage_encr_row_dicts]
+    return raw_data_storage_encr_row_dicts, canonical_rows, display_rows
+
+def raw_data_for_storage(raw_json_dict, plan):
+    source_fields = plan.source_fields
+    tenant_mapping = plan.tenant_mapping
+    account = plan.account
+    dek = plan.dek
 
-def raw_data_for_storage(raw_json_dict, source_fields, tenant_mapping, account, dek):
     #remove field None: None if it exists
     raw_json_dict.pop(None, None)
 
@@ -286,14 +293,19 @@ def encrypt_value(v, dek, short):
         return v
 
 def decrypt_value(encrypted_value, dek, short):
+    # contract PII columns (core.fields.EncryptedBinaryField) hold the bytes
+    # themselves, raw payloads the base64 text
+    is_binary = isinstance(encrypted_value, (bytes, memoryview))
     if getattr(settings, "DISABLED_ENCR_AND_HMAC", False):
+        if is_binary:
+            encrypted_value = bytes(encrypted_value).decode("utf-8")
         # reverse your test wrapper
         if encrypted_value.startswith("ENCR(") and encrypted_value.endswith(")"):
             return encrypted_value[5:-1]
         return encrypted_value
     else:
         # Step 1: base64 decode
-        encrypted_bytes = base64.b64decode(encrypted_value)
+        encrypted_bytes = bytes(encrypted_value) if is_binary else base64.b64decode(encrypted_value)
 
         # Step 2: decrypt using SAME dek and SAME short
         decrypted_bytes = decrypt_as_aesgcm_with_nonce(
@@ -324,17 +336,14 @@ def decrypt_as_aesgcm_with_nonce(dek: bytes, encrypted: bytes, aad: str) -> byte
     # Decrypt (will raise InvalidTag if wrong key/aad)
     return aesgcm.decrypt(nonce, ciphertext, aad.encode())
 
-def apply_value_mapping(value, mapping_group):
-    if not mapping_group or value is None:
+def apply_value_mapping(value, value_mappings):
+    """
+    `value_mappings` is a CanonicalFieldPlan's from_code -> to_code dict.
+    """
+    if not value_mappings or value is None:
         return value
 
-    value_to_lookup = value
-
-    try:
-        mapping = mapping_group.mappings.get(from_code=value_to_lookup)
-        return mapping.to_code
-    except ObjectDoesNotExist:
-        return value  # fallback to original
+    return value_mappings.get(value, value)  # fallback to original
     
 def build_canonical_row(raw_data_storage_encr_row_dict, canonical_fields, raw_json_dict, tenant_mapping=None):
     #use raw_json_dict to create hmac'd row_hash of non encrypted data and prepend to kv's
@@ -354,9 +363,9 @@ def build_canonical_row(raw_data_storage_encr_row_dict, canonical_fields, raw_js
             kv_value = apply_normalisation(value, cf.name, cf.normalisation)
             
             # Apply mappings
-            if hasattr(cf, "value_mapping_group") and cf.value_mapping_group:
+            if cf.value_mappings is not None:
                 k, v = list(kv_value.items())[0]
-                v = apply_value_mapping(v, cf.value_mapping_group)
+                v = apply_value_mapping(v, cf.value_mappings)
                 kv_value={k: v}
 
         for k, v in kv_value.items():
@@ -0,0 +1,127 @@
+from django.utils.timezone import now
+
+from tenants.local_kms import decrypt_dek
+
+from .models import FieldMapping
+
+
+#########################################################
+# Execution plan: everything the ETL needs from the schema
+# tables, loaded once per run. The ETL functions in
+# canonical.etl only read these plain objects, so the row
+# loops never touch the ORM.
+#########################################################
+
+class SourceFieldPlan:
+    __slots__ = (
+        "source_field_name",
+        "is_tenant_mapping_source",
+        "is_business_key",
+        "normalisation",
+        "pii_requires_encryption",
+        "pii_requires_fingerprint",
+        "is_volatile",
+    )
+
+    def __init__(self, field_mapping):
+        for attr in self.__slots__:
+            setattr(self, attr, getattr(field_mapping, attr))
+
+
+class CanonicalFieldPlan:
+    __slots__ = ("name", "source_field", "normalisation", "format_type", "value_mappings")
+
+    def __init__(self, canonical_field, source_field):
+        self.name = canonical_field.name
+        self.source_field = source_field
+        self.normalisation = canonical_field.normalisation
+        self.format_type = canonical_field.format_type
+
+        # from_code -> to_code, or None if the field has no value mapping group
+        group = canonical_field.value_mapping_group
+        self.value_mappings = (
+            {m.from_code: m.to_code for m in group.mappings.all()} if group else None
+        )
+
+
+class TenantMappingPlan:
+    """
+    A TenantMapping's codes, with the same resolution rules as
+    TenantMapping.resolve_tenant_as_internal_tenant_code.
+    """
+
+    def __init__(self, tenant_mapping):
+        self.pk = tenant_mapping.pk
+        self.account = tenant_mapping.account
+
+        # source value -> [(effective_from_date, internal_tenant_code)], newest first
+        self.codes = {}
+        # internal_tenant_code -> Tenant, for FK assignment when syncing
+        self.tenants_by_code = {}
+
+        mapping_codes = tenant_mapping.mapping_codes.select_related("mapped_tenant").order_by("-effective_from_date")
+        for mapping_code in mapping_codes:
+            tenant = mapping_code.mapped_tenant
+            self.codes.setdefault(mapping_code.source_system_field_value, []).append(
+                (mapping_code.effective_from_date, tenant.internal_tenant_code)
+            )
+            self.tenants_by_code[tenant.internal_tenant_code] = tenant
+
+    def resolve_tenant_as_internal_tenant_code(self, source_value, as_of_date=None):
+        as_of_date = as_of_date or now().date()
+        for effective_from_date, internal_tenant_code in self.codes.get(source_value, ()):
+            if effective_from_date <= as_of_date:
+                return internal_tenant_code
+        return None
+
+
+class ExecutionPlan:
+    def __init__(self, source_fields, canonical_fields, tenant_mapping, account, dek):
+        self.source_fields = source_fields
+        self.canonical_fields = canonical_fields
+        self.canonical_fields_by_name = {cf.name: cf for cf in canonical_fields}
+        self.tenant_mapping = tenant_mapping
+        self.account = account
+        self.account_short = str(account.short)
+        self.dek = dek
+
+
+def build_execution_plan(source_schema, canonical_schema, tenant_mapping=None):
+    """
+    Materialise schema, value mapping and tenant mapping metadata for one run
+    in a fixed handful of queries.
+    """
+    from .etl import get_account_encryption, resolve_account
+
+    source_plans = {}
+    source_fields = []
+    for field_mapping in FieldMapping.objects.filter(source_schema=source_schema):
+        source_plans[field_mapping.pk] = SourceFieldPlan(field_mapping)
+        source_fields.append(source_plans[field_mapping.pk])
+
+    canonical_fields = []
+    for canonical_field in (
+        canonical_schema.fields
+        .select_related("source_field", "value_mapping_group")
+        .prefetch_related("value_mapping_group__mappings")
+    ):
+        source_field = source_plans.get(canonical_field.source_field_id)
+        if source_field is None and canonical_field.source_field is not None:
+            # canonical field fed from another source schema's field
+            source_field = SourceFieldPlan(canonical_field.source_field)
+        canonical_fields.append(CanonicalFieldPlan(canonical_field, source_field))
+
+    if tenant_mapping is not None:
+        tenant_mapping = type(tenant_mapping).objects.select_related("account").get(pk=tenant_mapping.pk)
+        tenant_mapping_plan = TenantMappingPlan(tenant_mapping)
+    else:
+        tenant_mapping_plan = None
+
+    account = resolve_account(tenant_mapping)
+    dek = decrypt_dek(get_account_encryption(account).encrypted_dek)
+
+    return ExecutionPlan(source_fields, canonical_fields, tenant_mapping_plan, account, dek)
+
+def build_execution_plan_for_accountjob(accountjob):
+    job = accountjob.job
+    return build_execution_plan(job.source_schema, job.canonical_schema, accountjob.tenant_mapping)
@@ -1,3 +1,211 @@
-from django.test import TestCase
+import base64
+import os
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from canonical.etl import etl_transform, get_account_encryption
+from canonical.models import CanonicalField, CanonicalSchema, FieldMapping, SourceSchema
+from canonical.plan import build_execution_plan
+from canonical.utils import build_canonical_row
+from contracts.models import Vehicle
+from raw_data.models import RawCustomerVehicleData
+from raw_data.views import store_raw_row, sync_model_from_canonical
+from tenants.models import Account, Tenant, TenantMapping, TenantMappingCode
+from tenants.tenant_cache import tenant_cache
+from value_mappings.models import ValueMapping, ValueMappingGroup
+
+TEST_MASTER_KEY = base64.urlsafe_b64encode(b"0" * 32).decode()
+
+
+@override_settings(DISABLED_ENCR_AND_HMAC=True, LOCAL_MASTER_KEY=TEST_MASTER_KEY)
+@mock.patch.dict(os.environ, {"HMAC_SECRET": "test-secret"})
+class ExecutionPlanQueryTests(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(name="Acme", short="ACME")
+        # created lazily by the first plan build otherwise
+        get_account_encryption(self.account)
+        self.tenant = Tenant.objects.create(
+            account=self.account,
+            internal_tenant_code="ACME/LOC/BRD",
+            external_tenant_code="T1",
+            desc="Acme Tenant",
+        )
+
+        self.tenant_mapping = TenantMapping.objects.create(account=self.account, desc="Acme DMS")
+        TenantMappingCode.objects.create(
+            tenant_mapping=self.tenant_mapping,
+            source_system_field_value="001",
+            mapped_tenant=self.tenant,
+            effective_from_date=date(2020, 1, 1),
+        )
+
+        fuel_types = ValueMappingGroup.objects.create(code="fuel types")
+        ValueMapping.objects.create(group=fuel_types, from_code="D", to_code="diesel")
+
+        self.source_schema = SourceSchema.objects.create(name="vehicles", system="DMS", filename_prefix="VEH")
+        site = FieldMapping.objects.create(
+            source_schema=self.source_schema, source_field_name="site", order=1,
+            is_tenant_mapping_source=True, is_business_key=True,
+        )
+        reg = FieldMapping.objects.create(
+            source_schema=self.source_schema, source_field_name="reg", order=2,
+            is_business_key=True, pii_requires_encryption=True,
+        )
+        fuel = FieldMapping.objects.create(source_schema=self.source_schema, source_field_name="fuel", order=3)
+
+        self.canonical_schema = CanonicalSchema.objects.create(name="vehicle", contract="contracts.Vehicle")
+        CanonicalField.objects.create(
+            schema=self.canonical_schema, name="tenant", source_field=site, data_type="tenant_mapping", order=1,
+        )
+        CanonicalField.objects.create(
+            schema=self.canonical_schema, name="reg", source_field=reg, data_type="string", order=2,
+        )
+        CanonicalField.objects.create(
+            schema=self.canonical_schema, name="fuel", source_field=fuel, data_type="mapped_string",
+            value_mapping_group=fuel_types, order=3,
+        )
+
+        self.header = ["site", "reg", "fuel"]
+        self.rows = [["001", f"AB{i:02d} CDE", "D"] for i in range(50)]
+
+    def test_etl_transform_runs_no_queries(self):
+        plan = build_execution_plan(self.source_schema, self.canonical_schema, self.tenant_mapping)
+
+        with self.assertNumQueries(0):
+            raw_json_rows, canonical_rows, display_rows = etl_transform(
+                plan,
+                orig_header=self.header,
+                orig_rows=[list(row) for row in self.rows],
+                prepare_for_display=True,
+            )
+
+        self.assertEqual(len(raw_json_rows), 50)
+        self.assertEqual(canonical_rows[0]["tenant"], "ACME/LOC/BRD")
+        self.assertEqual(canonical_rows[0]["fuel"], "diesel")
+        self.assertEqual(canonical_rows[0]["reg"], "ENCR(AB00 CDE)")
+        self.assertEqual(display_rows[0]["reg"], "AB00 CDE")
+
+    def test_plan_queries_do_not_grow_with_mapping_codes(self):
+        with CaptureQueriesContext(connection) as one_code:
+            build_execution_plan(self.source_schema, self.canonical_schema, self.tenant_mapping)
+
+        for i in range(2, 12):
+            TenantMappingCode.objects.create(
+                tenant_mapping=self.tenant_mapping,
+                source_system_field_value=f"{i:03d}",
+                mapped_tenant=Tenant.objects.create(
+                    account=self.account,
+                    internal_tenant_code=f"ACME/L{i:02d}/BRD",
+                    external_tenant_code=f"T{i}",
+                    desc=f"Acme Tenant {i}",
+                ),
+                effective_from_date=date(2020, 1, 1),
+            )
+
+        with CaptureQueriesContext(connection) as many_codes:
+            plan = build_execution_plan(self.source_schema, self.canonical_schema, self.tenant_mapping)
+
+        self.assertEqual(len(many_codes), len(one_code))
+        self.assertEqual(len(plan.tenant_mapping.tenants_by_code), 11)
+
+
+@override_settings(DISABLED_ENCR_AND_HMAC=True, LOCAL_MASTER_KEY=TEST_MASTER_KEY)
+@mock.patch.dict(os.environ, {"HMAC_SECRET": "test-secret"})
+class IngestRowLoopQueryTests(TestCase):
+    """
+    The raw store and canonical sync loops of process_file: only the rows'
+    own reads/writes, never schema, mapping or tenant lookups.
+    """
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Acme", short="ACME")
+        get_account_encryption(self.account)
+        self.tenant = Tenant.objects.create(
+            account=self.account,
+            internal_tenant_code="ACME/LOC/BRD",
+            external_tenant_code="T1",
+            desc="Acme Tenant",
+        )
+        self.tenant_mapping = TenantMapping.objects.create(account=self.account, desc="Acme DMS")
+        TenantMappingCode.objects.create(
+            tenant_mapping=self.tenant_mapping,
+            source_system_field_value="001",
+            mapped_tenant=self.tenant,
+            effective_from_date=date(2020, 1, 1),
+        )
+
+        self.source_schema = SourceSchema.objects.create(name="vehicles", system="DMS", filename_prefix="VEH")
+        self.canonical_schema = CanonicalSchema.objects.create(name="vehicle", contract="contracts.Vehicle")
+        columns = [
+            # source field, canonical field, data type, flags
+            ("site", "tenant", "tenant_mapping", {"is_tenant_mapping_source": True, "is_business_key": True}),
+            ("vehicle_id", "external_vehicle_id", "string", {"is_business_key": True}),
+            ("reg", "registration_number", "string", {"pii_requires_encryption": True}),
+            ("vin", "vin", "string", {"pii_requires_encryption": True}),
+        ]
+        for order, (source_name, canonical_name, data_type, flags) in enumerate(columns, 1):
+            source_field = FieldMapping.objects.create(
+                source_schema=self.source_schema, source_field_name=source_name, order=order, **flags,
+            )
+            CanonicalField.objects.create(
+                schema=self.canonical_schema, name=canonical_name, source_field=source_field,
+                data_type=data_type, order=order,
+            )
+
+        self.header = [source_name for source_name, _, _, _ in columns]
+        self.rows = [["001", f"V{i:03d}", f"AB{i:02d} CDE", f"WBA{i:014d}"] for i in range(50)]
+        self.plan = build_execution_plan(self.source_schema, self.canonical_schema, self.tenant_mapping)
+        self.raw_rows, self.canonical_rows, _ = etl_transform(
+            self.plan,
+            orig_header=self.header,
+            orig_rows=[list(row) for row in self.rows],
+            raw_rows_as_json=False,
+        )
+
+        tenant_cache.clear()
+        self.addCleanup(tenant_cache.clear)
+
+    def test_raw_store_loop_queries_only_its_rows(self):
+        tenant_cache.by_code(self.tenant.internal_tenant_code)
+
+        # per new row: the current-version lookup and the insert
+        with self.assertNumQueries(2 * len(self.raw_rows)):
+            for row_number, raw_row in enumerate(self.raw_rows, 1):
+                store_raw_row(
+                    raw_row,
+                    row_number,
+                    Path("/srv/sftp_drops/acme/dms/ready"),
+                    Path("/srv/sftp_drops/acme/dms/ready/VEH_001.csv"),
+                    "run-1",
+                    RawCustomerVehicleData,
+                    is_tenant_aware=True,
+                    source_schema_id=self.source_schema.pk,
+                )
+
+        self.assertEqual(RawCustomerVehicleData.objects.filter(is_current=True).count(), 50)
+
+    def test_canonical_sync_queries_do_not_grow_with_rows(self):
+        accountjob = SimpleNamespace(
+            job=SimpleNamespace(canonical_schema=self.canonical_schema),
+            tenant_mapping=self.tenant_mapping,
+        )
+
+        # savepoint, existing rows (with their tenants), one bulk insert, release
+        with self.assertNumQueries(4):
+            result = sync_model_from_canonical(
+                accountjob, self.plan, self.canonical_rows[:5], build_canonical_row,
+            )
+        self.assertEqual(result["created"], 5)
+
+        with self.assertNumQueries(4):
+            result = sync_model_from_canonical(
+                accountjob, self.plan, self.canonical_rows, build_canonical_row,
+            )
+        self.assertEqual((result["created"], result["unchanged"]), (45, 5))
+        self.assertEqual(Vehicle.objects.filter(tenant=self.tenant).count(), 50)
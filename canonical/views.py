@@ -3,6 +3,7 @@ import json
 from django.shortcuts import render, get_object_or_404
 from .widgets import PalmtreeExcelWidget
 from .etl import etl_transform
+from .plan import build_execution_plan
 from datetime import date, datetime
 from django.contrib import messages
 
@@ -114,18 +115,13 @@ def job_preview(request, job_pk):
             break
         
         source_data = strip_empty_columns(strip_empty_rows(table_data.data or []))
-        source_fields = job.source_schema.field_mappings.all()
-        tenant_mapping = None
-
-        canonical_fields = job.canonical_schema.fields.all()
+        plan = build_execution_plan(job.source_schema, job.canonical_schema, tenant_mapping=None)
 
         header, *rows = table_data.data
         raw_json_rows, canonical_rows, display_rows = etl_transform(
-            source_fields=source_fields,
-            canonical_fields=canonical_fields,
+            plan,
             orig_header=header,
             orig_rows=rows,        
-            tenant_mapping=tenant_mapping,
             prepare_for_display=True,
         )
 
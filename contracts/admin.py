@@ -4,9 +4,21 @@ from django.shortcuts import render
 from django.core.exceptions import PermissionDenied
 from .models import Customer, Vehicle, CustomerVehicleLink, Recall, Booking
 from core.admin_mixins import TimeStampedAdminMixin, ReadOnlyAdminMixin
+from core.fields import ciphertext_to_text
 from tenants.models import Tenant
 from core.filters import TenantByAccountFilter
 
+def ciphertext_column(field_name):
+    """
+    list_display column showing an EncryptedBinaryField as base64 text.
+    """
+    def column(obj):
+        return ciphertext_to_text(getattr(obj, field_name))
+    column.short_description = field_name.replace("_", " ")
+    column.admin_order_field = field_name
+    return column
+
+
 class DataContractAdminMixin:
     """
     Adds a 'View Data Contract' button to any ModelAdmin
@@ -65,7 +77,7 @@ class CustomerAdmin(
         'tenant',
         'external_retailer_id',
         'external_customer_id',
-        'last_name',
+        ciphertext_column('last_name'),
     )
     search_fields = (
         'tenant',
@@ -96,8 +108,8 @@ class VehicleAdmin(
 ):
     list_display = (
         'tenant',
-        'registration_number',
-        'vin',
+        ciphertext_column('registration_number'),
+        ciphertext_column('vin'),
         'brand',
         'model',
     )
@@ -158,7 +170,7 @@ class RecallAdmin(
     admin.ModelAdmin
 ):
     list_display = (
-        'vin',
+        ciphertext_column('vin'),
         'code',
         'desc',
     )
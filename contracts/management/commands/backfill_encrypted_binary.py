@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+# table -> base64 ciphertext columns with a bytea shadow (contracts 0019)
+PII_COLUMNS = {
+    "contract_customer": [
+        "title", "first_name", "last_name", "salutation", "email", "mobile_phone", "home_phone",
+        "address_line_1", "address_line_2", "address_line_3", "address_line_4", "address_line_5",
+        "postcode_full", "postcode_area", "postcode_district", "postcode_sector",
+    ],
+    "contract_vehicle": ["registration_number", "vin"],
+    "contract_recall": ["vin"],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the bytea shadow columns added by contracts 0019 from the base64 "
+        "PII columns, in id batches, before the bytea swap (0021/0022) is deployed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows converted per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches, to leave I/O for live traffic",
+        )
+
+    def handle(self, *args, **options):
+        for table, columns in PII_COLUMNS.items():
+            with connection.cursor() as cursor:
+                existing = {c.name for c in connection.introspection.get_table_description(cursor, table)}
+            if not all(f"{column}_bin" in existing for column in columns):
+                self.stdout.write(f"{table}: no shadow columns (already converted, or 0019 not applied)")
+                continue
+
+            converted = self.backfill_table(table, columns, options["batch_size"], options["pause"])
+            self.stdout.write(self.style.SUCCESS(f"{table}: {converted} rows converted"))
+
+    def backfill_table(self, table, columns, batch_size, pause):
+        """
+        Keyset over id: each batch is its own short transaction, so live
+        writes (kept in step by the 0019 trigger) are never blocked for long.
+        """
+        assignments = ", ".join(f"{column}_bin = palmtree_ciphertext_bytea({column})" for column in columns)
+        missing = " OR ".join(f"({column}_bin IS NULL AND {column} IS NOT NULL)" for column in columns)
+        sql = f"UPDATE {table} SET {assignments} WHERE id > %s AND id <= %s AND ({missing})"
+        last_id_sql = f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s) batch"
+
+        converted = 0
+        last_id = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(last_id_sql, [last_id, batch_size])
+                batch_last_id = cursor.fetchone()[0]
+                if batch_last_id is None:
+                    break
+                cursor.execute(sql, [last_id, batch_last_id])
+                converted += cursor.rowcount
+            last_id = batch_last_id
+
+            self.stdout.write(f"{table}: up to id {last_id}, {converted} rows converted")
+            if pause:
+                time.sleep(pause)
+        return converted
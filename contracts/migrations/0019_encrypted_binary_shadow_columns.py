@@ -0,0 +1,73 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:40
+
+from django.db import migrations
+
+# Expand step of the base64 text -> bytea conversion of the PII ciphertext
+# columns: add a bytea shadow column for each, kept current by a trigger while
+# the (unchanged) models still write the text columns, so
+# `manage.py backfill_encrypted_binary` can fill existing rows in batches
+# online. The swap (0021/0022, models on EncryptedBinaryField) ships in the
+# following release, once the backfill has run.
+PII_COLUMNS = {
+    "contract_customer": [
+        "title", "first_name", "last_name", "salutation", "email", "mobile_phone", "home_phone",
+        "address_line_1", "address_line_2", "address_line_3", "address_line_4", "address_line_5",
+        "postcode_full", "postcode_area", "postcode_district", "postcode_sector",
+    ],
+    "contract_vehicle": ["registration_number", "vin"],
+    "contract_recall": ["vin"],
+}
+
+# base64 text is decoded; anything else (the DISABLED_ENCR_AND_HMAC wrapper) is
+# kept as its UTF-8 bytes - as core.fields.ciphertext_from_text
+CIPHERTEXT_BYTEA_SQL = r"""
+CREATE OR REPLACE FUNCTION palmtree_ciphertext_bytea(value text) RETURNS bytea
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN value IS NULL THEN NULL
+        WHEN value ~ '^([A-Za-z0-9+/]{4})*([A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?$' THEN decode(value, 'base64')
+        ELSE convert_to(value, 'UTF8')
+    END
+$$;
+"""
+
+
+def expand_sql(table, columns):
+    add_columns = ", ".join(f"ADD COLUMN {column}_bin bytea NULL" for column in columns)
+    assignments = "\n".join(f"    NEW.{column}_bin := palmtree_ciphertext_bytea(NEW.{column});" for column in columns)
+    return [
+        f"ALTER TABLE {table} {add_columns};",
+        f"""
+CREATE OR REPLACE FUNCTION {table}_sync_bin() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+{assignments}
+    RETURN NEW;
+END
+$$;
+""",
+        f"CREATE TRIGGER {table}_sync_bin BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_sync_bin();",
+    ]
+
+
+def reverse_expand_sql(table, columns):
+    drop_columns = ", ".join(f"DROP COLUMN {column}_bin" for column in columns)
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_sync_bin ON {table};",
+        f"DROP FUNCTION IF EXISTS {table}_sync_bin();",
+        f"ALTER TABLE {table} {drop_columns};",
+    ]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0018_remove_booking_fingerprint_vin_remove_booking_vin"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CIPHERTEXT_BYTEA_SQL, "DROP FUNCTION IF EXISTS palmtree_ciphertext_bytea(text);"),
+    ] + [
+        migrations.RunSQL(expand_sql(table, columns), reverse_expand_sql(table, columns))
+        for table, columns in PII_COLUMNS.items()
+    ]
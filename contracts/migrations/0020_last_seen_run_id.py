@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0019_encrypted_binary_shadow_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name=model_name,
+            name="last_seen_run_id",
+            field=models.CharField(blank=True, max_length=19, null=True),
+        )
+        for model_name in ("booking", "customer", "customervehiclelink", "recall", "vehicle")
+    ]
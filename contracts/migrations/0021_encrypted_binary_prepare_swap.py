@@ -0,0 +1,72 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:20
+
+from django.db import migrations
+
+# First half of the swap to the bytea shadow columns added by 0019 (deploy
+# only once `manage.py backfill_encrypted_binary` has run). Non-atomic, and
+# nothing here takes more than row locks or SHARE UPDATE EXCLUSIVE:
+# - catch up any rows the backfill missed (the trigger covers new writes)
+# - add NOT NULL checks as NOT VALID and validate them without blocking
+#   writes, so 0022's SET NOT NULL needs no table scan under its lock
+PII_COLUMNS = {
+    "contract_customer": [
+        "title", "first_name", "last_name", "salutation", "email", "mobile_phone", "home_phone",
+        "address_line_1", "address_line_2", "address_line_3", "address_line_4", "address_line_5",
+        "postcode_full", "postcode_area", "postcode_district", "postcode_sector",
+    ],
+    "contract_vehicle": ["registration_number", "vin"],
+    "contract_recall": ["vin"],
+}
+NULLABLE_COLUMNS = {("contract_customer", "email")}
+
+
+def not_null_columns(table, columns):
+    return [column for column in columns if (table, column) not in NULLABLE_COLUMNS]
+
+
+def catch_up_sql(table, columns):
+    missing = " OR ".join(f"({column}_bin IS NULL AND {column} IS NOT NULL)" for column in columns)
+    assignments = ", ".join(f"{column}_bin = palmtree_ciphertext_bytea({column})" for column in columns)
+    return f"UPDATE {table} SET {assignments} WHERE {missing};"
+
+
+def add_checks_sql(table, columns):
+    checks = ", ".join(
+        f"ADD CONSTRAINT {table}_{column}_bin_nn CHECK ({column}_bin IS NOT NULL) NOT VALID"
+        for column in not_null_columns(table, columns)
+    )
+    return f"ALTER TABLE {table} {checks};"
+
+
+def drop_checks_sql(table, columns):
+    checks = ", ".join(
+        f"DROP CONSTRAINT IF EXISTS {table}_{column}_bin_nn"
+        for column in not_null_columns(table, columns)
+    )
+    return f"ALTER TABLE {table} {checks};"
+
+
+def validate_checks_sql(table, columns):
+    return [
+        f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_bin_nn;"
+        for column in not_null_columns(table, columns)
+    ]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("contracts", "0020_last_seen_run_id"),
+    ]
+
+    operations = [
+        migrations.RunSQL(catch_up_sql(table, columns), migrations.RunSQL.noop)
+        for table, columns in PII_COLUMNS.items()
+    ] + [
+        migrations.RunSQL(add_checks_sql(table, columns), drop_checks_sql(table, columns))
+        for table, columns in PII_COLUMNS.items()
+    ] + [
+        migrations.RunSQL(validate_checks_sql(table, columns), migrations.RunSQL.noop)
+        for table, columns in PII_COLUMNS.items()
+    ]
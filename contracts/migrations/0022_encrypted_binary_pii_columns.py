@@ -0,0 +1,86 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:25
+
+from django.db import migrations
+
+import core.fields
+
+# Second half of the swap (see 0021): in one transaction per table, drop the
+# sync trigger and replace each text column with its bytea shadow. The
+# validated checks from 0021 let the single ALTER TABLE ... SET NOT NULL skip
+# its scan, so the ACCESS EXCLUSIVE lock is only held for catalogue changes.
+# Not reversible.
+PII_COLUMNS = {
+    "contract_customer": [
+        "title", "first_name", "last_name", "salutation", "email", "mobile_phone", "home_phone",
+        "address_line_1", "address_line_2", "address_line_3", "address_line_4", "address_line_5",
+        "postcode_full", "postcode_area", "postcode_district", "postcode_sector",
+    ],
+    "contract_vehicle": ["registration_number", "vin"],
+    "contract_recall": ["vin"],
+}
+NULLABLE_COLUMNS = {("contract_customer", "email")}
+
+
+def swap_sql(table, columns):
+    not_null = [column for column in columns if (table, column) not in NULLABLE_COLUMNS]
+    sql = [
+        f"DROP TRIGGER {table}_sync_bin ON {table};",
+        f"DROP FUNCTION {table}_sync_bin();",
+        f"ALTER TABLE {table} " + ", ".join(f"DROP COLUMN {column}" for column in columns) + ";",
+    ]
+    # RENAME can't be combined with other ALTER TABLE subcommands
+    sql += [f"ALTER TABLE {table} RENAME COLUMN {column}_bin TO {column};" for column in columns]
+    # separate statements: ALTER TABLE runs DROP CONSTRAINT before SET NOT NULL,
+    # which would lose the checks that let it skip the scan
+    sql.append(f"ALTER TABLE {table} " + ", ".join(f"ALTER COLUMN {column} SET NOT NULL" for column in not_null) + ";")
+    sql.append(f"ALTER TABLE {table} " + ", ".join(f"DROP CONSTRAINT {table}_{column}_bin_nn" for column in not_null) + ";")
+    return sql
+
+
+def alter_fields(model_name, fields):
+    return [
+        migrations.AlterField(model_name=model_name, name=name, field=field)
+        for name, field in fields
+    ]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contracts", "0021_encrypted_binary_prepare_swap"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(swap_sql(table, columns))
+                for table, columns in PII_COLUMNS.items()
+            ] + [
+                # dropped with the old vin column
+                migrations.RunSQL('CREATE INDEX "contract_re_vin_a6042e_idx" ON "contract_recall" ("vin", "code");'),
+                migrations.RunSQL("DROP FUNCTION palmtree_ciphertext_bytea(text);"),
+            ],
+            state_operations=alter_fields("customer", [
+                ("title", core.fields.EncryptedBinaryField(blank=True, help_text="e.g. Mr, Mrs, Ms, Dr")),
+                ("first_name", core.fields.EncryptedBinaryField(blank=True)),
+                ("last_name", core.fields.EncryptedBinaryField(blank=True)),
+                ("salutation", core.fields.EncryptedBinaryField(blank=True, help_text="e.g. 'Dear John', 'Dear Mr Smith'")),
+                ("email", core.fields.EncryptedBinaryField(blank=True, null=True)),
+                ("mobile_phone", core.fields.EncryptedBinaryField(blank=True, help_text="Mobile phone number")),
+                ("home_phone", core.fields.EncryptedBinaryField(blank=True, help_text="Home phone number")),
+                ("address_line_1", core.fields.EncryptedBinaryField(blank=True)),
+                ("address_line_2", core.fields.EncryptedBinaryField(blank=True)),
+                ("address_line_3", core.fields.EncryptedBinaryField(blank=True)),
+                ("address_line_4", core.fields.EncryptedBinaryField(blank=True)),
+                ("address_line_5", core.fields.EncryptedBinaryField(blank=True)),
+                ("postcode_full", core.fields.EncryptedBinaryField(blank=True)),
+                ("postcode_area", core.fields.EncryptedBinaryField(blank=True)),
+                ("postcode_district", core.fields.EncryptedBinaryField(blank=True)),
+                ("postcode_sector", core.fields.EncryptedBinaryField(blank=True)),
+            ]) + alter_fields("vehicle", [
+                ("registration_number", core.fields.EncryptedBinaryField(help_text="Vehicle number from source system")),
+                ("vin", core.fields.EncryptedBinaryField(help_text="VIN from source system")),
+            ]) + alter_fields("recall", [
+                ("vin", core.fields.EncryptedBinaryField(help_text="VIN from source system")),
+            ]),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from tenants.models import Tenant
 from core.models import CoreContractModel
-from core.models import encr_b64_size, HMAC_B64_SIZE
+from core.models import HMAC_B64_SIZE
+from core.fields import EncryptedBinaryField
 
 OPT_IN_TRI_STATE_CHOICES = [
     ('true', 'True'),
@@ -27,88 +28,72 @@ class Customer(CoreContractModel):
         help_text="Customer identifier from source system"
     )
 
-    title = models.CharField(
-        max_length=encr_b64_size(20),
+    title = EncryptedBinaryField(
         blank=True,
         help_text="e.g. Mr, Mrs, Ms, Dr"
     )
 
-    first_name = models.CharField(
-        max_length=encr_b64_size(100),
+    first_name = EncryptedBinaryField(
         blank=True
     )
 
-    last_name = models.CharField(
-        max_length=encr_b64_size(100),
+    last_name = EncryptedBinaryField(
         blank=True
     )
 
-    salutation = models.CharField(
-        max_length=encr_b64_size(150),
+    salutation = EncryptedBinaryField(
         blank=True,
         help_text="e.g. 'Dear John', 'Dear Mr Smith'"
     )
 
-    email = models.EmailField(
-        max_length=encr_b64_size(254),
+    email = EncryptedBinaryField(
         blank=True,
         null=True
     )
 
-    mobile_phone = models.CharField(
-        max_length=encr_b64_size(30),
+    mobile_phone = EncryptedBinaryField(
         blank=True,
         help_text="Mobile phone number"
     )
 
-    home_phone = models.CharField(
-        max_length=encr_b64_size(30),
+    home_phone = EncryptedBinaryField(
         blank=True,
         help_text="Home phone number"
     )
 
-    address_line_1 = models.CharField(
-        max_length=encr_b64_size(255),
+    address_line_1 = EncryptedBinaryField(
         blank=True
     )
 
-    address_line_2 = models.CharField(
-        max_length=encr_b64_size(255),
+    address_line_2 = EncryptedBinaryField(
         blank=True
     )
 
-    address_line_3 = models.CharField(
-        max_length=encr_b64_size(255),
+    address_line_3 = EncryptedBinaryField(
         blank=True
     )
 
-    address_line_4 = models.CharField(
-        max_length=encr_b64_size(255),
+    address_line_4 = EncryptedBinaryField(
         blank=True
     )
 
-    address_line_5 = models.CharField(
-        max_length=encr_b64_size(255),
+    address_line_5 = EncryptedBinaryField(
         blank=True
     )
 
-    postcode_full = models.CharField(
-        max_length=encr_b64_size(8), 
+    postcode_full = EncryptedBinaryField(
         blank=True
     )
 
-    postcode_area = models.CharField(
-        max_length=encr_b64_size(2), 
+    postcode_area = EncryptedBinaryField(
         blank=True
     )
 
-    postcode_district = models.CharField(
-        max_length=encr_b64_size(4), 
+    postcode_district = EncryptedBinaryField(
         blank=True
     )
 
-    postcode_sector = models.CharField(
-        max_length=encr_b64_size(6), 
+    postcode_sector = EncryptedBinaryField(
         blank=True
     )
 
@@ -214,8 +199,7 @@ class Vehicle(CoreContractModel):
         help_text="Vehicle unique identifier (number) from source system"
     )
 
-    registration_number = models.CharField(
-        max_length=encr_b64_size(20),
+    registration_number = EncryptedBinaryField(
         help_text="Vehicle number from source system"
     )
 
@@ -226,8 +210,7 @@ class Vehicle(CoreContractModel):
         help_text="The date the vehicle was first registered"
     )
 
-    vin = models.CharField(
-        max_length=encr_b64_size(17),
+    vin = EncryptedBinaryField(
         help_text="VIN from source system"
     )
 
@@ -320,8 +303,7 @@ class CustomerVehicleLink(CoreContractModel):
 
 
 class Recall(CoreContractModel):
-    vin = models.CharField(
-        max_length=encr_b64_size(17),
+    vin = EncryptedBinaryField(
         help_text="VIN from source system"
     )
 
@@ -0,0 +1,63 @@
+import json
+import logging
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "events:"
+
+# Comment line sent while idle so proxies don't drop the connection
+SSE_HEARTBEAT_SECONDS = 15
+# Streams end after this long and EventSource reconnects, so a worker thread
+# is never held by one browser tab indefinitely (each stream holds a thread:
+# gunicorn runs gthread workers, see gunicorn.conf.py)
+SSE_MAX_STREAM_SECONDS = 5 * 60
+SSE_RETRY_MILLISECONDS = 3000
+
+
+def publish_event(channel, event_type, data):
+    """
+    Fire-and-forget push to anyone streaming `channel` (see sse_stream).
+    Never raises: live progress must not break the work being reported on.
+    """
+    try:
+        get_redis_client().publish(
+            CHANNEL_PREFIX + channel,
+            json.dumps({"type": event_type, "data": data}, cls=DjangoJSONEncoder),
+        )
+    except Exception:
+        logger.warning(f"Could not publish {event_type} event to {channel}", exc_info=True)
+
+
+def format_sse(event_type, data):
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+def sse_stream(channels):
+    """
+    Generator of text/event-stream chunks for a StreamingHttpResponse,
+    relaying events published to `channels` via Redis pub/sub.
+    """
+    pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(*[CHANNEL_PREFIX + channel for channel in channels])
+    try:
+        yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n"
+
+        started = time.monotonic()
+        last_sent = started
+        while time.monotonic() - started < SSE_MAX_STREAM_SECONDS:
+            message = pubsub.get_message(timeout=1.0)
+            now = time.monotonic()
+            if message is not None:
+                event = json.loads(message["data"])
+                yield format_sse(event["type"], json.dumps(event["data"]))
+                last_sent = now
+            elif now - last_sent >= SSE_HEARTBEAT_SECONDS:
+                yield ": heartbeat\n\n"
+                last_sent = now
+    finally:
+        pubsub.close()
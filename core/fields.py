@@ -0,0 +1,48 @@
+import base64
+import re
+
+from django.db import models
+
+# Standard base64 text, as canonical.etl.encrypt_value produces
+BASE64_TEXT = re.compile(r"^(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?$")
+
+
+def ciphertext_from_text(value):
+    """
+    bytes for an ETL ciphertext string: base64 is decoded, anything else
+    (the DISABLED_ENCR_AND_HMAC "ENCR(...)" wrapper) is kept as UTF-8.
+    """
+    if BASE64_TEXT.match(value):
+        return base64.b64decode(value)
+    return value.encode("utf-8")
+
+
+def ciphertext_to_text(value):
+    """
+    The base64 form of stored ciphertext (for display and JSON).
+    """
+    if value is None:
+        return None
+    return base64.b64encode(bytes(value)).decode("ascii")
+
+
+class EncryptedBinaryField(models.BinaryField):
+    """
+    PII ciphertext (nonce + AES-GCM output, see canonical.etl) stored as
+    bytea rather than base64 text. Accepts the raw bytes or the ETL's base64
+    strings, so canonical rows can be assigned unchanged; reads back as bytes.
+    """
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            return ciphertext_from_text(value)
+        if isinstance(value, memoryview):
+            return bytes(value)
+        return value
+
+    def get_prep_value(self, value):
+        return self.to_python(super().get_prep_value(value))
+
+    def from_db_value(self, value, expression, connection):
+        # to_python also takes the base64 text of a not yet converted column
+        return self.to_python(value)
@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from django.apps import apps
-from django.db import transaction
-from django.db.models import ForeignKey
+from django.db import connection, connections, transaction
+from django.db.models import ForeignKey, ManyToManyField
 from core.models import FixtureControlledModel
 
 
@@ -17,6 +19,23 @@ class Command(BaseCommand):
             default="fixtures",
             help="Directory where fixture JSON files are located",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Diff each fixture against the table in memory and apply bulk_create/bulk_update",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk_create/bulk_update statement (--bulk only)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Import models with no FK dependency on each other in parallel (--bulk only)",
+        )
 
     def handle(self, *args, **options):
         fixture_dir = Path(options["dir"])
@@ -26,27 +45,30 @@ class Command(BaseCommand):
             if issubclass(m, FixtureControlledModel) and not m._meta.abstract
         ]
 
+        if options["bulk"]:
+            self.handle_bulk(models, fixture_dir, options["batch_size"], options["workers"])
+            return
+
         models = self.sort_models_by_fk_dependency(models)
 
         for model in models:
-            fixture_file = fixture_dir / f"{model._meta.app_label}__{model.__name__}.json"
-            if not fixture_file.exists():
+            fixture_data = self.load_fixture(model, fixture_dir)
+            if fixture_data is None:
                 continue
 
-            with fixture_file.open(encoding="utf-8") as f:
-                fixture_data = json.load(f)
+            fk_names = self.fk_field_names(model)
+            m2m_names = self.m2m_field_names(model)
 
             with transaction.atomic():
+                m2m_rows = []
                 for obj in fixture_data:
                     fields = obj["fields"].copy()
+                    m2m_values = {name: fields.pop(name) for name in m2m_names.intersection(fields)}
 
                     # Assign ForeignKeys using raw _id (no DB lookup)
-                    for field_name, value in list(fields.items()):
-                        field = model._meta.get_field(field_name)
-
-                        if isinstance(field, ForeignKey) and value is not None:
-                            fields[f"{field_name}_id"] = value
-                            del fields[field_name]
+                    for field_name in fk_names.intersection(fields):
+                        if fields[field_name] is not None:
+                            fields[f"{field_name}_id"] = fields.pop(field_name)
 
                     # Determine unique identifier
                     if hasattr(model, "natural_key_fields"):
@@ -57,10 +79,17 @@ class Command(BaseCommand):
                     else:
                         nk_fields = {"pk": obj["pk"]}
 
-                    model.objects.update_or_create(
+                    instance, _ = model.objects.update_or_create(
                         defaults=fields,
                         **nk_fields
                     )
+                    if m2m_values:
+                        m2m_rows.append((instance, m2m_values))
+
+                # once every row exists, so self-referencing m2m targets do too
+                for instance, m2m_values in m2m_rows:
+                    for field_name, pks in m2m_values.items():
+                        getattr(instance, field_name).set(pks)
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -68,10 +97,212 @@ class Command(BaseCommand):
                 )
             )
 
+    def load_fixture(self, model, fixture_dir):
+        fixture_file = fixture_dir / f"{model._meta.app_label}__{model.__name__}.json"
+        if not fixture_file.exists():
+            return None
+
+        with fixture_file.open(encoding="utf-8") as f:
+            return json.load(f)
+
+    def fk_field_names(self, model):
+        return {
+            field.name for field in model._meta.get_fields()
+            if isinstance(field, ForeignKey)
+        }
+
+    def m2m_field_names(self, model):
+        return {field.name for field in model._meta.many_to_many}
+
+    # --------------------------------------------------------
+    # Bulk import
+    # --------------------------------------------------------
+
+    def handle_bulk(self, models, fixture_dir, batch_size, workers):
+        for level in self.fk_dependency_levels(models):
+            if workers > 1 and len(level) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(
+                        lambda model: self.import_model_bulk_in_thread(model, fixture_dir, batch_size),
+                        level,
+                    ))
+            else:
+                results = [self.import_model_bulk(model, fixture_dir, batch_size) for model in level]
+
+            for model, result in zip(level, results):
+                if result is None:
+                    continue
+                created, updated, unchanged = result
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{model._meta.app_label}.{model.__name__}: "
+                        f"{created} created, {updated} updated, {unchanged} unchanged"
+                    )
+                )
+
+    def import_model_bulk_in_thread(self, model, fixture_dir, batch_size):
+        try:
+            return self.import_model_bulk(model, fixture_dir, batch_size)
+        finally:
+            # each thread has its own connection
+            connections.close_all()
+
+    def import_model_bulk(self, model, fixture_dir, batch_size):
+        """
+        One model: read existing rows once, diff against the fixture in
+        memory, then bulk_create new rows and bulk_update changed ones.
+        Returns (created, updated, unchanged), or None if there's no fixture.
+        """
+        fixture_data = self.load_fixture(model, fixture_dir)
+        if fixture_data is None:
+            return None
+
+        # fixture field name -> model field, resolved once per model
+        fields_by_name = {}
+        for obj in fixture_data:
+            for field_name in obj["fields"]:
+                if field_name not in fields_by_name:
+                    fields_by_name[field_name] = model._meta.get_field(field_name)
+        concrete = [f for f in fields_by_name.values() if f.concrete and not f.many_to_many]
+        m2m_fields = [f for f in fields_by_name.values() if f.many_to_many]
+        attnames = [f.attname for f in concrete]
+
+        nk_names = list(model.natural_key_fields()) if hasattr(model, "natural_key_fields") else None
+        nk_attnames = [model._meta.get_field(name).attname for name in nk_names] if nk_names else None
+
+        # incoming rows as attname -> python value
+        incoming = []
+        for obj in fixture_data:
+            values = {
+                f.attname: f.to_python(obj["fields"][f.name])
+                for f in concrete if f.name in obj["fields"]
+            }
+            key = tuple(values[a] for a in nk_attnames) if nk_names else model._meta.pk.to_python(obj["pk"])
+            incoming.append((key, values))
+
+        with transaction.atomic():
+            existing = {}
+            for row in model.objects.values("pk", *attnames).iterator(chunk_size=batch_size):
+                key = tuple(row[a] for a in nk_attnames) if nk_names else row["pk"]
+                existing[key] = row
+
+            to_create = []
+            to_update = []
+            update_fields = set()
+            unchanged = 0
+            for key, values in incoming:
+                current = existing.get(key)
+                if current is None:
+                    instance = model(**values)
+                    if not nk_names:
+                        instance.pk = key
+                    to_create.append(instance)
+                    continue
+
+                changed = [a for a, v in values.items() if current.get(a) != v]
+                if not changed:
+                    unchanged += 1
+                    continue
+
+                instance = model(pk=current["pk"], **values)
+                to_update.append(instance)
+                update_fields.update(changed)
+
+            if to_create:
+                model.objects.bulk_create(to_create, batch_size=batch_size)
+            if to_update:
+                model.objects.bulk_update(
+                    to_update,
+                    # bulk_update takes field names, not attnames
+                    [f.name for f in concrete if f.attname in update_fields and not f.primary_key],
+                    batch_size=batch_size,
+                )
+
+            if to_create and not nk_names:
+                # rows were inserted with explicit pks: move the sequence past them
+                with connection.cursor() as cursor:
+                    for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                        cursor.execute(sql)
+
+            if m2m_fields:
+                if nk_names:
+                    pk_by_key = {
+                        tuple(row[a] for a in nk_attnames): row["pk"]
+                        for row in model.objects.values("pk", *nk_attnames).iterator(chunk_size=batch_size)
+                    }
+                    pks = [pk_by_key[key] for key, _ in incoming]
+                else:
+                    pks = [key for key, _ in incoming]
+                for field in m2m_fields:
+                    self.sync_m2m_bulk(field, pks, fixture_data, batch_size)
+
+        return len(to_create), len(to_update), unchanged
+
+    def sync_m2m_bulk(self, field, pks, fixture_data, batch_size):
+        """
+        Make the field's through table hold exactly the fixture's pairs for
+        the fixture's rows: insert the missing pairs, delete the stale ones.
+        """
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+        target_pk = field.remote_field.model._meta.pk
+
+        wanted = {
+            (pk, target_pk.to_python(value))
+            for pk, obj in zip(pks, fixture_data)
+            for value in obj["fields"].get(field.name, [])
+        }
+        existing = {
+            (row[source], row[target]): row["pk"]
+            for row in through.objects.filter(**{f"{source}__in": pks}).values("pk", source, target)
+        }
+
+        stale = [through_pk for pair, through_pk in existing.items() if pair not in wanted]
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        missing = [through(**{source: s, target: t}) for s, t in wanted if (s, t) not in existing]
+        if missing:
+            through.objects.bulk_create(missing, batch_size=batch_size)
+
     # --------------------------------------------------------
     # Dependency Sorting
     # --------------------------------------------------------
 
+    def model_dependencies(self, model, models):
+        dependencies = {
+            field.remote_field.model
+            for field in model._meta.get_fields()
+            if isinstance(field, (ForeignKey, ManyToManyField))
+        }
+        # self-referencing FKs/m2ms don't order models
+        dependencies.discard(model)
+        return dependencies.intersection(models)
+
+    def fk_dependency_levels(self, models):
+        """
+        Group models into levels: every model's FK targets are in earlier
+        levels, so the models within a level can be imported in parallel.
+        """
+        levels = []
+        models = set(models)
+
+        while models:
+            level = [
+                model for model in models
+                if not self.model_dependencies(model, models)
+            ]
+
+            if not level:
+                raise Exception(
+                    "Circular dependency detected in fixture models."
+                )
+
+            levels.append(sorted(level, key=lambda m: m._meta.label))
+            models.difference_update(level)
+
+        return levels
+
     def sort_models_by_fk_dependency(self, models):
         """
         Topologically sort models so FK dependencies are created first.
@@ -83,13 +314,7 @@ class Command(BaseCommand):
             progressed = False
 
             for model in list(models):
-                dependencies = {
-                    field.remote_field.model
-                    for field in model._meta.get_fields()
-                    if isinstance(field, ForeignKey)
-                }
-
-                dependencies = dependencies.intersection(models)
+                dependencies = self.model_dependencies(model, models)
 
                 if not dependencies:
                     sorted_models.append(model)
@@ -102,4 +327,3 @@ class Command(BaseCommand):
                 )
 
         return sorted_models
-    
\ No newline at end of file
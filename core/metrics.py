@@ -0,0 +1,257 @@
+"""
+Cheap in-process metric registries with a Prometheus text exporter.
+
+Counters, histograms and gauges accumulate in memory in whichever process
+records them (celery worker, gunicorn worker, watcher). `flush()` pushes the
+accumulated deltas to Redis in a single pipeline so the /metrics endpoint can
+expose totals across every process without probing anything live.
+"""
+import logging
+import math
+import threading
+
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "palmtree:metrics:"
+
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, math.inf)
+
+
+def _label_key(labelnames, labels):
+    missing = set(labelnames) - set(labels)
+    if missing:
+        raise ValueError(f"Missing metric labels: {sorted(missing)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._pending = {}
+        (registry or REGISTRY).register(self)
+
+    @property
+    def redis_key(self):
+        return KEY_PREFIX + self.name
+
+    def _field(self, label_values, suffix=""):
+        return "\x1f".join(label_values) + "\x1e" + suffix
+
+    @staticmethod
+    def _split_field(field):
+        label_part, suffix = field.split("\x1e", 1)
+        return (tuple(label_part.split("\x1f")) if label_part else ()), suffix
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def flush_to(self, pipe):
+        for field, value in self.drain().items():
+            pipe.hincrbyfloat(self.redis_key, field, value)
+
+    def samples(self, stored):
+        """
+        Convert stored {field: value} into (suffix, label_values, value) tuples.
+        """
+        for field, value in sorted(stored.items()):
+            label_values, suffix = self._split_field(field)
+            yield suffix, label_values, float(value)
+
+    def render(self, stored):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, label_values, value in self.samples(stored):
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        field = self._field(_label_key(self.labelnames, labels), "_total")
+        with self._lock:
+            self._pending[field] = self._pending.get(field, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Last-write-wins gauge (e.g. a timestamp of the last successful run).
+    """
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        field = self._field(_label_key(self.labelnames, labels))
+        with self._lock:
+            self._pending[field] = value
+
+    def flush_to(self, pipe):
+        pending = self.drain()
+        if pending:
+            pipe.hset(self.redis_key, mapping=pending)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        buckets = tuple(sorted(buckets))
+        if buckets[-1] != math.inf:
+            buckets = buckets + (math.inf,)
+        self.buckets = buckets
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        label_values = _label_key(self.labelnames, labels)
+        with self._lock:
+            for bound in self.buckets:
+                if value <= bound:
+                    field = self._field(label_values, f"_bucket:{_format_value(bound)}")
+                    self._pending[field] = self._pending.get(field, 0) + 1
+            for suffix, amount in (("_sum", value), ("_count", 1)):
+                field = self._field(label_values, suffix)
+                self._pending[field] = self._pending.get(field, 0) + amount
+
+    def samples(self, stored):
+        for suffix, label_values, value in super().samples(stored):
+            if suffix.startswith("_bucket:"):
+                yield "_bucket", label_values + (suffix.split(":", 1)[1],), value
+            else:
+                yield suffix, label_values, value
+
+    def render(self, stored):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        bucket_order = {_format_value(b): i for i, b in enumerate(self.buckets)}
+        samples = sorted(
+            self.samples(stored),
+            key=lambda s: (s[1][:len(self.labelnames)], s[0] != "_bucket", bucket_order.get(s[1][-1], 0)),
+        )
+        for suffix, label_values, value in samples:
+            if suffix == "_bucket":
+                labels = format_labels(self.labelnames, label_values[:-1], extra=[("le", label_values[-1])])
+            else:
+                labels = format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def register_collector(self, fn):
+        """
+        Register fn() -> list of exposition lines, evaluated at scrape time
+        (for cheap point-in-time gauges such as queue depth).
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def flush(self):
+        """
+        Push every metric's accumulated deltas to Redis in one round trip.
+        Failures are logged, never raised: metrics must not break an ingest run.
+        """
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for metric in self._metrics.values():
+                metric.flush_to(pipe)
+            pipe.execute()
+        except Exception:
+            logger.exception("Failed to flush metrics to Redis")
+
+    def render(self):
+        lines = []
+        client = get_redis_client()
+        pipe = client.pipeline(transaction=False)
+        metrics = list(self._metrics.values())
+        for metric in metrics:
+            pipe.hgetall(metric.redis_key)
+        for metric, stored in zip(metrics, pipe.execute()):
+            stored = {k.decode(): v.decode() for k, v in stored.items()}
+            lines.extend(metric.render(stored))
+
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception:
+                logger.exception(f"Metric collector {collector.__name__} failed")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# =====================================================
+# Ingest metrics
+# =====================================================
+
+INGEST_ROWS = Counter(
+    "palmtree_ingest_rows",
+    "Rows output by each ingest pipeline stage",
+    labelnames=("accountjob", "stage"),
+)
+
+INGEST_RUNS = Counter(
+    "palmtree_ingest_runs",
+    "Ingest runs by outcome",
+    labelnames=("accountjob", "outcome"),
+)
+
+INGEST_RUN_DURATION = Histogram(
+    "palmtree_ingest_run_duration_seconds",
+    "Wall time of a complete ingest run (one file)",
+    labelnames=("accountjob",),
+)
+
+INGEST_STAGE_DURATION = Histogram(
+    "palmtree_ingest_stage_duration_seconds",
+    "Wall time of each ingest pipeline stage",
+    labelnames=("stage",),
+)
+
+INGEST_LAST_SUCCESS = Gauge(
+    "palmtree_accountjob_last_success_timestamp_seconds",
+    "Unix time of the last successful ingest run per AccountJob",
+    labelnames=("accountjob",),
+)
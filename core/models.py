@@ -89,6 +89,9 @@ class Address(models.Model):
 
 class CoreContractModel(TimeStampedModel, models.Model):
     row_hash = models.CharField(max_length=64)
+    # snapshot that last contained the row (many-file snapshots delete
+    # the rows of their tenants that no part stamped)
+    last_seen_run_id = models.CharField(max_length=19, null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -0,0 +1,13 @@
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis_client():
+    """
+    Shared Redis connection (the same Redis we already run for Celery).
+    The client holds a connection pool, so one instance per process is enough.
+    """
+    return redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=1)
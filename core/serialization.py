@@ -0,0 +1,74 @@
+import json
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# "orjson" (when installed) or "json"
+JSON_SERIALISER = getattr(settings, "JSON_SERIALISER", "orjson")
+
+
+def use_orjson():
+    return orjson is not None and JSON_SERIALISER == "orjson"
+
+
+#########################################
+# hot-path JSON (internal, not hashed)
+#########################################
+def dumps(obj):
+    """
+    Compact JSON text. Not for hashing: formatting may differ from json.dumps.
+    """
+    if use_orjson():
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"))
+
+def loads(data):
+    if use_orjson():
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+#########################################
+# canonical JSON (hashed)
+#########################################
+# Everything else (floats: orjson writes 1e-05 as 0.00001; dates, Decimals...)
+# takes the stdlib path, as do non-str keys and out-of-range ints, which
+# orjson rejects
+ORJSON_SAFE_TYPES = (str, int, bool, type(None))
+
+def orjson_compatible(obj):
+    """
+    True if orjson's output for `obj` can match json.dumps's byte for byte.
+    """
+    if isinstance(obj, ORJSON_SAFE_TYPES):
+        return True
+    if isinstance(obj, dict):
+        return all(orjson_compatible(v) for v in obj.values())
+    if isinstance(obj, list):
+        return all(orjson_compatible(v) for v in obj)
+    return False
+
+def canonical_json_bytes(obj):
+    """
+    Exactly json.dumps(obj, sort_keys=True, separators=(",", ":")).encode(),
+    the form row_hash and business_key_hash are computed over, so stored
+    hashes stay valid whichever serialiser produced them.
+    """
+    if use_orjson() and orjson_compatible(obj):
+        try:
+            raw = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except orjson.JSONEncodeError:
+            raw = None
+        # json.dumps escapes non-ASCII (ensure_ascii) and DEL as \uXXXX,
+        # orjson writes them as UTF-8: only pure printable-ASCII output matches
+        if raw is not None and raw.isascii() and b"\x7f" not in raw:
+            return raw
+
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
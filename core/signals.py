@@ -1,9 +1,13 @@
 # core/admin/fixture_signals.py
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.core import serializers
+from django.core.cache import cache
+from django.conf import settings
+from django.db import transaction
 from pathlib import Path
 import json
+import threading
 
 from django.apps import apps
 from core.models import FixtureControlledModel
@@ -22,7 +26,7 @@ def dump_fixture(model, output_dir="fixtures"):
     # Get fields to include (exclude model-defined ones)
     exclude_fields = getattr(model, "FIXTURE_EXCLUDE_FIELDS", [])
     fields = [
-        f.name for f in model._meta.fields
+        f.name for f in (*model._meta.fields, *model._meta.many_to_many)
         if f.name not in exclude_fields
     ]
 
@@ -52,10 +56,66 @@ def dump_fixture(model, output_dir="fixtures"):
     print(f"Fixture updated: {filename}")
 
 
+FIXTURE_DUMP_DEBOUNCE_SECONDS = getattr(settings, "FIXTURE_DUMP_DEBOUNCE_SECONDS", 5)
+FIXTURE_DUMP_KEY_PREFIX = "fixture_dump:"
+
+# keys with a callback waiting for the current transaction to commit
+_pending = threading.local()
+
+
+def on_commit_once(key, fn):
+    """
+    Call fn() once the current transaction commits, once per key however
+    many times it was scheduled in that transaction.
+    """
+    keys = getattr(_pending, "keys", None)
+    if keys is None:
+        keys = _pending.keys = set()
+    keys.add(key)
+    # registered every time: if the transaction rolls back, the key stays
+    # pending and the next committed callback for it runs
+    transaction.on_commit(lambda: _run_pending(key, fn))
+
+
+def _run_pending(key, fn):
+    keys = getattr(_pending, "keys", set())
+    if key not in keys:
+        return  # already run for this commit
+    keys.discard(key)
+    fn()
+
+
+def schedule_fixture_dump(model):
+    """
+    Dump the model's fixture once the current transaction commits, however
+    many of its rows were saved (e.g. an inline formset of 200 rows).
+    """
+    label = model._meta.label
+    on_commit_once(("fixture_dump", label), lambda: flush_fixture_dump(label))
+
+
+def flush_fixture_dump(label):
+    if getattr(settings, "FIXTURE_DUMP_ASYNC", False):
+        # one queued dump per model per debounce window; it reads the table
+        # when it runs, so it covers every commit made before then
+        if cache.add(FIXTURE_DUMP_KEY_PREFIX + label, 1, FIXTURE_DUMP_DEBOUNCE_SECONDS * 2):
+            from core.tasks import dump_fixture_celery_task
+            dump_fixture_celery_task.apply_async(args=[label], countdown=FIXTURE_DUMP_DEBOUNCE_SECONDS)
+    else:
+        dump_fixture(apps.get_model(label))
+
+
 # Connect to all FixtureControlledModel subclasses in all apps
 for model in apps.get_models():
     if os.environ.get("IS_STAGING_SERVER") == "True":
         if issubclass(model, FixtureControlledModel) and not model._meta.abstract:
-            post_save.connect(lambda sender, **kwargs: dump_fixture(sender), sender=model)
-            post_delete.connect(lambda sender, **kwargs: dump_fixture(sender), sender=model)
+            post_save.connect(lambda sender, **kwargs: schedule_fixture_dump(sender), sender=model)
+            post_delete.connect(lambda sender, **kwargs: schedule_fixture_dump(sender), sender=model)
+            for field in model._meta.many_to_many:
+                # m2m rows are exported with the model that declares the field
+                m2m_changed.connect(
+                    lambda sender, dumped_model=model, **kwargs: schedule_fixture_dump(dumped_model),
+                    sender=field.remote_field.through,
+                    weak=False,
+                )
             
\ No newline at end of file
@@ -0,0 +1,27 @@
+from celery import shared_task
+
+
+@shared_task(ignore_result=True)
+def refresh_health_status():
+    """
+    Celery Beat task:
+    Refreshes the cached healthcheck snapshot so the page never probes live
+    """
+    from palmtree_etl.health import refresh_health_status
+
+    refresh_health_status()
+
+
+@shared_task(ignore_result=True)
+def dump_fixture_celery_task(model_label):
+    """
+    Deferred fixture dump queued by core.signals (FIXTURE_DUMP_ASYNC).
+    Runs on the staging host, where the fixtures folder lives.
+    """
+    from django.apps import apps
+    from django.core.cache import cache
+    from core.signals import FIXTURE_DUMP_KEY_PREFIX, dump_fixture
+
+    # commits from here on queue a fresh dump
+    cache.delete(FIXTURE_DUMP_KEY_PREFIX + model_label)
+    dump_fixture(apps.get_model(model_label))
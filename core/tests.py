@@ -1,3 +1,99 @@
-from django.test import TestCase
+import json
+import os
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from canonical.etl import hash_with_platform_secret
+from core import serialization
+from core.serialization import canonical_json_bytes
+
+
+def reference_canonical_json(obj):
+    # the format stored row_hash/business_key_hash values were computed over
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+# Rows covering every branch of canonical_json_bytes: orjson fast path and
+# each stdlib fallback
+COMPATIBILITY_ROWS = [
+    {},
+    {"vin": "WBA1234567890ABCD", "reg": "AB12 CDE", "mileage": 12345, "notes": None, "opt_in": True},
+    {"b": "2", "a": "1", "C": "0", "_": "x", "a1": "y", "A": "z"},
+    {"postcode": {"postcode_full": "SW1A 1AA", "postcode_area": "SW"}, "tags": ["b", "a", None, 1]},
+    {"first_name": "Zoë", "city": "Kraków", "symbol": "€", "emoji": "😀"},
+    {"naïve_key": "value"},
+    {"controls": "a\x00b\x1f\x7f\n\t\b\f\r", "quotes": '"\\/', "separator": " "},
+    {"price": 1e-05, "large": 1e16, "small": 0.1, "whole": 2.0, "negative_zero": -0.0},
+    {"big": 2 ** 64, "negative_big": -(2 ** 63) - 1, "max": 2 ** 63 - 1},
+    {"nested": {"deeper": {"value": 1.5, "text": "ok"}}},
+    "a JSON string of JSON: {\"customer_id\": \"C001\"}",
+    json.dumps({"customer_id": "C001", "tenant_code": "ACME/LOC/BRD"}, ensure_ascii=False),
+    json.dumps({"name": "Zoë"}, ensure_ascii=False),
+]
+
+
+@mock.patch.dict(os.environ, {"HMAC_SECRET": "test-secret"})
+class CanonicalJsonCompatibilityTests(SimpleTestCase):
+    def assert_compatible(self):
+        for obj in COMPATIBILITY_ROWS:
+            with self.subTest(obj=obj):
+                self.assertEqual(canonical_json_bytes(obj), reference_canonical_json(obj))
+
+    @unittest.skipIf(serialization.orjson is None, "orjson not installed")
+    def test_orjson_matches_json_dumps(self):
+        with mock.patch.object(serialization, "JSON_SERIALISER", "orjson"):
+            self.assert_compatible()
+
+    def test_stdlib_matches_json_dumps(self):
+        with mock.patch.object(serialization, "JSON_SERIALISER", "json"):
+            self.assert_compatible()
+
+    def test_unsupported_types_raise_like_json_dumps(self):
+        with self.assertRaises(TypeError):
+            canonical_json_bytes({"value": {1, 2}})
+
+    def test_row_hash_unchanged(self):
+        # digests computed with the previous json.dumps implementation
+        row = {
+            "vin": "WBA1234567890ABCD",
+            "reg": "AB12 CDE",
+            "mileage": 12345,
+            "notes": None,
+            "opt_in": True,
+            "postcode": {"postcode_full": "SW1A 1AA", "postcode_area": "SW"},
+        }
+        self.assertEqual(
+            hash_with_platform_secret(row),
+            "068771ed2844d13c8d36620f596ffea201794be3331a9ca6285b801d22010545",
+        )
+
+        row = {
+            "vin": "WBA1234567890ABCD",
+            "first_name": "Zoë",
+            "reg": "AB12 CDE",
+            "mileage": 12345,
+            "price": 1e-05,
+            "notes": None,
+            "postcode": {"postcode_full": "SW1A 1AA", "postcode_area": "SW"},
+        }
+        self.assertEqual(
+            hash_with_platform_secret(row),
+            "d8d6bf078b8c4999fb36ce464df75ed002cbd51d6a3b91087ed366d23d3eb1e2",
+        )
+
+    def test_business_key_hash_unchanged(self):
+        business_key_json = json.dumps({"customer_id": "C001", "tenant_code": "ACME/LOC/BRD"}, ensure_ascii=False)
+        self.assertEqual(
+            hash_with_platform_secret(business_key_json),
+            "bda36acfa4ab390d0e3f0d7ad3030371b84cda0c42066c095e5ea51a5c2347f5",
+        )
+
+
+class HotPathJsonTests(SimpleTestCase):
+    def test_round_trip(self):
+        row = {"vin": "WBA1234567890ABCD", "first_name": "Zoë", "mileage": 12345, "postcode": {"postcode_area": "SW"}}
+        for serialiser in ("orjson", "json"):
+            with self.subTest(serialiser=serialiser), mock.patch.object(serialization, "JSON_SERIALISER", serialiser):
+                self.assertEqual(serialization.loads(serialization.dumps(row)), row)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = "version:"
+
+
+def get_version(name):
+    return cache.get_or_set(VERSION_KEY_PREFIX + name, 1, None)
+
+
+def bump_version(name):
+    """
+    Invalidate every process's copy of `name` (call from post_save/post_delete).
+    """
+    key = VERSION_KEY_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key missing (evicted or never read) - any new value invalidates
+        cache.set(key, int(time.time()), None)
+
+
+class VersionedLoader:
+    """
+    In-process copy of some data loaded from the DB, shared by every caller
+    in the process, reloaded when its version in the shared cache changes.
+
+    The version is checked at most every `check_interval` seconds, so hot
+    paths (row loops, the watcher) pay a dict lookup, not a cache round trip.
+    Signal handlers call bump_version(name), which reaches other processes
+    (celery workers, the watcher) within check_interval.
+    """
+
+    def __init__(self, name, loader, check_interval=10):
+        self.name = name
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = 0
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.check_interval:
+            return self._value
+
+        with self._lock:
+            version = get_version(self.name)
+            if self._value is None or version != self._version:
+                self._value = self.loader()
+                self._version = version
+            self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
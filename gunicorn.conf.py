@@ -0,0 +1,17 @@
+# Loaded by gunicorn from the app folder (palmtree.service runs it there),
+# or pass -c gunicorn.conf.py
+import multiprocessing
+import os
+
+# Threaded workers: each open dashboard tab holds one thread on the live
+# events stream (core.events.sse_stream, up to SSE_MAX_STREAM_SECONDS), so
+# sync workers would be tied up by a handful of browser tabs
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+# Worker heartbeat, not a request limit: gthread workers keep notifying the
+# arbiter while threads sit on a stream
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
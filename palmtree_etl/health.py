@@ -0,0 +1,150 @@
+import logging
+import shutil
+import subprocess
+import time
+
+import psutil
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import OperationalError
+
+from core.redis_client import get_redis_client
+from palmtree_etl.celery import app
+
+logger = logging.getLogger(__name__)
+
+HEALTH_STATUS_CACHE_KEY = "healthcheck:status"
+HEALTH_REFRESH_LOCK_KEY = "healthcheck:refresh_lock"
+
+# How often the background collector refreshes the probes, and how old a
+# snapshot may get before the page reports it as stale
+HEALTH_REFRESH_SECONDS = getattr(settings, "HEALTH_REFRESH_SECONDS", 15)
+HEALTH_STALE_SECONDS = HEALTH_REFRESH_SECONDS * 4
+
+
+# =====================================================
+# PROBES (expensive - only run by the background collector)
+# =====================================================
+
+def get_celery_workers():
+    """
+    Names of the workers answering a broadcast ping. (The collector runs in
+    a worker, so a process check would always find celery running.)
+    """
+    try:
+        replies = app.control.ping(timeout=1) or []
+    except Exception:
+        return []
+    return sorted(name for reply in replies for name in reply)
+
+def is_celery_beat_running():
+    try:
+        output = subprocess.check_output(['pgrep', '-af', 'celery'], text=True)
+        return any('beat' in line for line in output.splitlines())
+    except subprocess.CalledProcessError:
+        return False
+
+def get_db_status():
+    db_conn = connections["default"]
+    try:
+        c = db_conn.cursor()
+        c.execute("SELECT 1;")
+        return "ok"
+    except OperationalError:
+        return "down"
+
+def get_redis_status():
+    try:
+        get_redis_client().ping()
+        return "running"
+    except Exception:
+        return "down"
+
+def get_active_tasks():
+    try:
+        i = app.control.inspect(timeout=1)
+        active = i.active() or {}
+
+        tasks = []
+
+        for worker, worker_tasks in active.items():
+            for task in worker_tasks:
+                # Optional: filter only AccountJob tasks
+                if "account" in task.get("name", "").lower():
+                    tasks.append({
+                        "id": task.get("id"),
+                        "name": task.get("name"),
+                        "args": task.get("args"),
+                        "kwargs": task.get("kwargs"),
+                        "worker": worker,
+                    })
+
+        return tasks
+    except Exception:
+        return []
+
+
+# =====================================================
+# COLLECTOR
+# =====================================================
+
+def collect_health_status():
+    status = {}
+
+    # Services
+    status["celery_workers"] = get_celery_workers()
+    status["celery_worker"] = "running" if status["celery_workers"] else "stopped"
+    status["celery_beat"] = "running" if is_celery_beat_running() else "stopped"
+    status["database"] = get_db_status()
+    status["redis"] = get_redis_status()
+
+    # CSS classes
+    status["celery_worker_class"] = "ok" if status["celery_worker"]=="running" else "down"
+    status["celery_beat_class"] = "ok" if status["celery_beat"]=="running" else "down"
+    status["database_class"] = "ok" if status["database"]=="ok" else "down"
+    status["redis_class"] = "ok" if status["redis"] == "running" else "down"
+
+    # System resources
+    total, used, free = shutil.disk_usage("/")
+    status["disk"] = {"total_gb": total//2**30, "used_gb": used//2**30, "free_gb": free//2**30}
+
+    mem = psutil.virtual_memory()
+    status["memory"] = {
+        "total_mb": mem.total//1024//1024,
+        "used_mb": mem.used//1024//1024,
+        "free_mb": mem.available//1024//1024
+    }
+
+    status["active_tasks"] = get_active_tasks()
+
+    status["collected_at"] = time.time()
+    return status
+
+def refresh_health_status():
+    """
+    Run every probe once and store the snapshot in the cache.
+    A short lock stops concurrent refreshes piling onto the broker.
+    """
+    if not cache.add(HEALTH_REFRESH_LOCK_KEY, 1, HEALTH_REFRESH_SECONDS):
+        return None
+
+    try:
+        status = collect_health_status()
+        cache.set(HEALTH_STATUS_CACHE_KEY, status, HEALTH_STALE_SECONDS * 10)
+        return status
+    finally:
+        cache.delete(HEALTH_REFRESH_LOCK_KEY)
+
+def get_health_status():
+    """
+    Cached snapshot for the page and load balancer probe. Never probes live:
+    None until the collector has run.
+    """
+    status = cache.get(HEALTH_STATUS_CACHE_KEY)
+    if status is None:
+        return None
+
+    status["age_seconds"] = int(time.time() - status["collected_at"])
+    status["is_stale"] = status["age_seconds"] > HEALTH_STALE_SECONDS
+    return status
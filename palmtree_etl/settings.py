@@ -22,6 +22,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
 environ.Env.read_env(BASE_DIR / ".env")
 TEMP_FILES_DIR = env("TEMP_FILES_DIR")
+# Shared parses of drop files (raw_data.parsed_files): worker-only, never under an SFTP root
+PARSED_FILES_DIR = env("PARSED_FILES_DIR", default=str(Path(TEMP_FILES_DIR) / "parsed"))
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
@@ -226,6 +228,16 @@ TIME_FORMAT = 'H:i'
 IS_STAGING_SERVER = env.bool("IS_STAGING_SERVER", default=False)
 DISABLED_ENCR_AND_HMAC = env.bool("DISABLED_ENCR_AND_HMAC", default=False)
 
+# Staging: dump fixtures from a celery worker (on this host) instead of in the request
+FIXTURE_DUMP_ASYNC = env.bool("FIXTURE_DUMP_ASYNC", default=False)
+
+# Raw row payloads: "json" (JSONField) or "compact" (raw_data.payload_codec)
+RAW_PAYLOAD_FORMAT = env("RAW_PAYLOAD_FORMAT", default="json")
+RAW_PAYLOAD_COMPRESSION = env("RAW_PAYLOAD_COMPRESSION", default="zlib")
+
+# Hot-path JSON (core.serialization): "orjson" when installed, or "json"
+JSON_SERIALISER = env("JSON_SERIALISER", default="orjson")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -250,9 +262,39 @@ LOGGING = {
     },
 }
 
-CELERY_BROKER_URL = "redis://127.0.0.1:6379/0" # = Redis running on your server /0 = Redis database index
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://127.0.0.1:6379/0") # /0 = Redis database index
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_REDIS_URL", default="redis://127.0.0.1:6379/1"), # separate Redis db index from Celery
+    }
+}
+
+# Account.celery_queue routes each account's jobs; run a worker per queue,
+# e.g. `celery -A palmtree_etl worker -Q celery` and `... -Q large_accounts`
+METRICS_CELERY_QUEUES = ["celery"]
+
+# /metrics/ is for staff, or a scraper sending "Authorization: Bearer <token>"
+METRICS_BEARER_TOKEN = env("METRICS_BEARER_TOKEN", default=None)
+
+HEALTH_REFRESH_SECONDS = 15
+
+DROPZONE_CATALOGUE_SYNC_SECONDS = 300
+
+# Installed into django_celery_beat's DatabaseScheduler on beat start-up
+CELERY_BEAT_SCHEDULE = {
+    "refresh-health-status": {
+        "task": "core.tasks.refresh_health_status",
+        "schedule": HEALTH_REFRESH_SECONDS,
+    },
+    "sync-dropzone-file-catalogues": {
+        "task": "tenants.tasks.sync_dropzone_file_catalogues",
+        "schedule": DROPZONE_CATALOGUE_SYNC_SECONDS,
+    },
+}
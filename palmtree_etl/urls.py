@@ -21,4 +21,6 @@ urlpatterns = [
     path("tenants/", include("tenants.urls")),
     path("vendor/", include("vendor.urls")),
     path("healthcheck/", views.healthcheck_page, name="healthcheck"),
+    path("healthz/", views.healthz, name="healthz"),
+    path("metrics/", views.metrics_page, name="metrics"),
 ]
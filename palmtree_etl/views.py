@@ -1,107 +1,123 @@
 # myapp/views.py
 from django.shortcuts import render
-import psutil
-import shutil
-from celery import Celery
-from django.db import connections
-from django.db.utils import OperationalError
-import subprocess
-import redis
+import hmac
+import logging
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from redis.exceptions import RedisError
 
-app = Celery("palmtree_etl")
-app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
-
-def is_process_running(name):
-    for proc in psutil.process_iter(["name", "cmdline"]):
-        try:
-            cmdline = proc.info.get("cmdline") or []
-            pname = proc.info.get("name") or ""
-            if name.lower() in pname.lower() or any(name.lower() in str(c).lower() for c in cmdline):
-                return True
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-    return False
-
-def is_celery_beat_running():
-    try:
-        output = subprocess.check_output(['pgrep', '-af', 'celery'], text=True)
-        return any('beat' in line for line in output.splitlines())
-    except subprocess.CalledProcessError:
-        return False
-
-def get_db_status():
-    db_conn = connections["default"]
-    try:
-        c = db_conn.cursor()
-        c.execute("SELECT 1;")
-        return "ok"
-    except OperationalError:
-        return "down"
+from core.metrics import REGISTRY, format_labels
+from core.redis_client import get_redis_client
+from palmtree_etl.health import get_health_status
 
-def get_redis_status():
-    try:
-        r = redis.from_url(settings.CELERY_BROKER_URL, socket_connect_timeout=1)
-        r.ping()
-        return "running"
-    except Exception:
-        return "down"
-    
-
-
-def get_active_tasks():
-    try:
-        i = app.control.inspect()
-        active = i.active() or {}
+logger = logging.getLogger(__name__)
 
-        tasks = []
 
-        for worker, worker_tasks in active.items():
-            for task in worker_tasks:
-                # Optional: filter only AccountJob tasks
-                if "account" in task.get("name", "").lower():
-                    tasks.append({
-                        "id": task.get("id"),
-                        "name": task.get("name"),
-                        "args": task.get("args"),
-                        "kwargs": task.get("kwargs"),
-                        "worker": worker,
-                    })
+def healthcheck_page(request):
+    status = get_health_status() or {}
 
-        return tasks
-    except Exception:
-        return []
+    return render(request, "healthcheck.html", {"status": status})
 
+def healthz(request):
+    """
+    Load balancer probe: answers from the cached snapshot in milliseconds.
+    No snapshot, or a stale one, is a 503: nothing is checking the services.
+    """
+    status = get_health_status()
+    if status is None:
+        return JsonResponse({"status": "unknown"}, status=503)
+
+    healthy = status["database"] == "ok" and not status["is_stale"]
+    return JsonResponse(
+        {
+            "status": "ok" if healthy else ("stale" if status["is_stale"] else "down"),
+            "database": status["database"],
+            "redis": status["redis"],
+            "celery_worker": status["celery_worker"],
+            "celery_beat": status["celery_beat"],
+            "age_seconds": status["age_seconds"],
+            "is_stale": status["is_stale"],
+        },
+        status=200 if healthy else 503,
+    )
+
+
+##################################
+# Prometheus metrics (scrape time)
+##################################
+@REGISTRY.register_collector
+def celery_queue_depth():
+    """
+    Messages waiting in each Celery queue (a Redis list per queue).
+    """
+    from tenants.models import Account
+
+    # the configured queues plus every account's own queue
+    queues = sorted(
+        set(getattr(settings, "METRICS_CELERY_QUEUES", ["celery"]))
+        | set(Account.objects.filter(deleted=False).values_list("celery_queue", flat=True).distinct())
+    )
+    pipe = get_redis_client().pipeline(transaction=False)
+    for queue in queues:
+        pipe.llen(queue)
+
+    lines = [
+        "# HELP palmtree_celery_queue_depth Messages waiting in each Celery queue",
+        "# TYPE palmtree_celery_queue_depth gauge",
+    ]
+    for queue, depth in zip(queues, pipe.execute()):
+        lines.append(f"palmtree_celery_queue_depth{format_labels(('queue',), (queue,))} {depth}")
+    return lines
+
+@REGISTRY.register_collector
+def dropzone_ready_files():
+    """
+    Files waiting in each drop zone's ready folder, from the file catalogue
+    (tenants.file_catalogue) rather than the disk.
+    """
+    from django.db.models import Count, Q
+    from tenants.models import SFTPDropZone
+
+    zones = (
+        SFTPDropZone.objects
+        .filter(deleted=False)
+        .exclude(folder_path__isnull=True)
+        .annotate(ready_files=Count("files", filter=Q(files__folder="ready", files__deleted=False)))
+        .values_list("zone_folder", "ready_files")
+    )
+
+    lines = [
+        "# HELP palmtree_dropzone_ready_files Files waiting in the ready folder of each drop zone",
+        "# TYPE palmtree_dropzone_ready_files gauge",
+    ]
+    for zone, count in zones:
+        lines.append(f"palmtree_dropzone_ready_files{format_labels(('zone',), (zone,))} {count}")
+    return lines
+
+def metrics_request_allowed(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_BEARER_TOKEN", None)
+    if not token:
+        return False
+    scheme, _, given = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(given.encode(), token.encode())
 
+def metrics_page(request):
+    """
+    Prometheus exposition. 503 while Redis (where the metrics live) is down,
+    so the scrape shows as failed rather than as every counter resetting.
+    """
+    if not metrics_request_allowed(request):
+        return HttpResponseForbidden()
 
-def healthcheck_page(request):
-    status = {}
-
-    # Services
-    status["celery_worker"] = "running" if is_process_running("celery") else "stopped"
-    status["celery_beat"] = "running" if is_celery_beat_running() else "stopped"
-    status["database"] = get_db_status()
-    status["redis"] = get_redis_status()
-
-    # CSS classes
-    status["celery_worker_class"] = "ok" if status["celery_worker"]=="running" else "down"
-    status["celery_beat_class"] = "ok" if status["celery_beat"]=="running" else "down"
-    status["database_class"] = "ok" if status["database"]=="ok" else "down"
-    status["redis_class"] = "ok" if status["redis"] == "running" else "down"
-
-    # System resources
-    total, used, free = shutil.disk_usage("/")
-    status["disk"] = {"total_gb": total//2**30, "used_gb": used//2**30, "free_gb": free//2**30}
-
-    mem = psutil.virtual_memory()
-    status["memory"] = {
-        "total_mb": mem.total//1024//1024,
-        "used_mb": mem.used//1024//1024,
-        "free_mb": mem.available//1024//1024
-    }
-
-    # 🔥 Add this
-    status["active_tasks"] = get_active_tasks()
-
-    return render(request, "healthcheck.html", {"status": status})
+    try:
+        body = REGISTRY.render()
+    except RedisError:
+        logger.warning("Metrics unavailable: Redis is down", exc_info=True)
+        return HttpResponse("metrics unavailable\n", status=503, content_type="text/plain; charset=utf-8")
+
+    return HttpResponse(
+        body,
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -3,6 +3,7 @@ from django.utils.html import format_html
 import json
 from .models import RawCustomerVehicleData, RawRecallData, RawBookingData
 from core.filters import TenantByAccountFilter
+from .payload_codec import raw_payload
 
 
 class BaseRawDataAdmin(admin.ModelAdmin):
@@ -41,10 +42,11 @@ class BaseRawDataAdmin(admin.ModelAdmin):
     ordering = ("-ingested_at",)
 
     def pretty_payload(self, obj):
-        if not obj.payload:
+        payload = raw_payload(obj)
+        if not payload:
             return ""
 
-        formatted_json = json.dumps(obj.payload, indent=2, sort_keys=True)
+        formatted_json = json.dumps(payload, indent=2, sort_keys=True)
 
         return format_html(
             "<pre style='white-space: pre-wrap; word-wrap: break-word;'>{}</pre>",
@@ -0,0 +1,94 @@
+import gzip
+import json
+import logging
+import os
+
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RawBookingData, RawCustomerVehicleData, RawRecallData
+from .payload_codec import decode_payload, get_layout_by_id
+
+logger = logging.getLogger(__name__)
+
+RAW_DATA_MODELS = (RawCustomerVehicleData, RawRecallData, RawBookingData)
+
+# Superseded versions (is_current=False) ingested longer ago than this are
+# exported and removed
+RAW_HISTORY_RETENTION_DAYS = getattr(settings, "RAW_HISTORY_RETENTION_DAYS", 90)
+RAW_HISTORY_EXPORT_DIR = getattr(settings, "RAW_HISTORY_EXPORT_DIR", settings.BASE_DIR / "raw_history")
+RAW_HISTORY_BATCH_SIZE = 5000
+
+
+def history_export_path(export_dir, model, cutoff):
+    return Path(export_dir) / f"{model._meta.label_lower}.{cutoff:%Y%m%dT%H%M%S}.jsonl.gz"
+
+
+def compact_model_history(model, cutoff, export_dir=None, batch_size=RAW_HISTORY_BATCH_SIZE, dry_run=False):
+    """
+    Move one raw model's superseded versions ingested before `cutoff` out of
+    the table: each batch (keyset on id, via the partial history index) is
+    appended to a gzipped JSON-lines export, then deleted in the same
+    transaction. With export_dir=None the rows are only deleted.
+    Returns the number of rows compacted (or that would be, for dry_run).
+    """
+    history = model.objects.filter(is_current=False, ingested_at__lt=cutoff)
+    if dry_run:
+        return history.count()
+
+    export_file = None
+    if export_dir is not None:
+        export_path = history_export_path(export_dir, model, cutoff)
+        export_path.parent.mkdir(parents=True, exist_ok=True)
+        export_file = gzip.open(export_path, "at", encoding="utf-8")
+
+    compacted = 0
+    last_id = 0
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    history
+                    .filter(id__gt=last_id)
+                    .order_by("id")
+                    .values()[:batch_size]
+                )
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+
+                if export_file is not None:
+                    for row in rows:
+                        if row["payload_compact"] is not None:
+                            row["payload"] = decode_payload(row["payload_compact"], get_layout_by_id(row["payload_layout_id"]).fields)
+                        row.pop("payload_compact")
+                    export_file.writelines(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+                    # the rows are gone once this commits: make sure they're on disk first
+                    export_file.flush()
+                    os.fsync(export_file.fileno())
+                model.objects.filter(id__in=[row["id"] for row in rows]).delete()
+            compacted += len(rows)
+    finally:
+        if export_file is not None:
+            export_file.close()
+
+    if compacted:
+        logger.info(f"Compacted {compacted} superseded {model._meta.label} rows ingested before {cutoff:%Y-%m-%d}")
+    return compacted
+
+
+def compact_raw_history(days=RAW_HISTORY_RETENTION_DAYS, export_dir=RAW_HISTORY_EXPORT_DIR,
+                        batch_size=RAW_HISTORY_BATCH_SIZE, dry_run=False):
+    """
+    {model label: rows compacted} across all raw data models.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    return {
+        model._meta.label: compact_model_history(model, cutoff, export_dir, batch_size, dry_run)
+        for model in RAW_DATA_MODELS
+    }
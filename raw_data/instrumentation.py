@@ -0,0 +1,262 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from core import metrics as ingest_metrics
+from core.events import publish_event
+from tenants.dropzones import dropzone_channel
+from tenants.models import AccountJobLog
+
+logger = logging.getLogger(__name__)
+
+
+# Pipeline stages in the order run_account_job executes them
+STAGES = (
+    "read",
+    "validate",
+    "transform",
+    "raw_store",
+    "deletion_flagging",
+    "canonical_sync",
+    "file_move",
+)
+
+# Row progress is pushed to the dashboard at most this often
+PROGRESS_EVENT_SECONDS = 1.0
+
+# Buffered run log writes are flushed at least this often (and at every
+# stage boundary)
+RUN_LOG_FLUSH_SECONDS = 5.0
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper callable that counts every query
+    issued on the current thread's default connection.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def format_stage_metrics(stage, metrics):
+    """
+    One line, human readable summary of a stage for AccountJobLog / admin.
+    """
+    parts = [
+        f"wall {metrics.get('wall_seconds', 0):.3f}s",
+        f"cpu {metrics.get('cpu_seconds', 0):.3f}s",
+    ]
+    if metrics.get("rows_in") is not None or metrics.get("rows_out") is not None:
+        parts.append(f"rows {metrics.get('rows_in', '-')} → {metrics.get('rows_out', '-')}")
+    parts.append(f"queries {metrics.get('queries', 0)}")
+    if metrics.get("bytes_read"):
+        parts.append(f"bytes read {metrics['bytes_read']}")
+    return f"Stage {stage}: " + ", ".join(parts)
+
+
+class RunLogBuffer:
+    """
+    Batches a run's AccountJobLog inserts (one bulk_create per flush) and
+    coalesces IngestRun field updates (one save of the changed fields per
+    flush), instead of a write per status change.
+
+    Flushes when RUN_LOG_FLUSH_SECONDS have passed since the last flush, at
+    stage boundaries (RunInstrumentation), and on leaving the `with` block -
+    also when the run raises, after logging the error.
+
+    Usage:
+        with RunLogBuffer(ingest_run) as run_log:
+            run_log.update_run(result_text="Processing")
+            run_log.log("Processing")
+    """
+
+    def __init__(self, ingest_run, flush_seconds=RUN_LOG_FLUSH_SECONDS):
+        self.ingest_run = ingest_run
+        self.flush_seconds = flush_seconds
+        self.pending_logs = []
+        self.dirty_fields = set()
+        self.last_flush = time.monotonic()
+        self.failed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.fail(exc)
+        self.flush()
+        return False
+
+    def fail(self, exc):
+        """
+        Record the exception the run raised (once, whoever sees it first).
+        """
+        if self.failed:
+            return
+        self.failed = True
+        result_text = f"Failed: {exc!r}"[:1000]
+        self.update_run(result_text=result_text)
+        self.log(result_text)
+
+    def log(self, message, stage="", metrics=None):
+        self.pending_logs.append(AccountJobLog(
+            ingest_run=self.ingest_run,
+            message=message,
+            stage=stage,
+            metrics=metrics,
+        ))
+        self.flush_if_due()
+
+    def update_run(self, **fields):
+        for name, value in fields.items():
+            setattr(self.ingest_run, name, value)
+        self.dirty_fields.update(fields)
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        if time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if self.dirty_fields:
+            self.ingest_run.save(update_fields=sorted(self.dirty_fields | {"updated_at"}))
+            self.dirty_fields.clear()
+        if self.pending_logs:
+            AccountJobLog.objects.bulk_create(self.pending_logs)
+            self.pending_logs = []
+        self.last_flush = time.monotonic()
+
+
+class RunInstrumentation:
+    """
+    Records wall time, CPU time, rows in/out, DB query count and bytes read
+    for each pipeline stage of an IngestRun.
+
+    Usage:
+        instrumentation = RunInstrumentation(ingest_run, run_log)
+        with instrumentation.stage("read") as metrics:
+            ...
+            metrics["rows_out"] = len(rows)
+            metrics["bytes_read"] = size
+
+    Stage results are written to IngestRun.stage_metrics and an AccountJobLog
+    row is added per stage so the admin inline shows where time was spent,
+    through the run's RunLogBuffer, which is flushed at each stage boundary.
+    They are also fed into the in-process metric registries; call finish()
+    once the run is over to push them to the /metrics exporter. Used as a
+    context manager, a run that raises before finish() finishes as "error".
+
+    Run start, stage results, row progress (progress()) and the outcome are
+    published to the drop zone's event channel for the live dashboard.
+    """
+
+    def __init__(self, ingest_run, run_log):
+        self.ingest_run = ingest_run
+        self.run_log = run_log
+        self.accountjob_label = str(ingest_run.accountjob_id)
+        self.started = time.perf_counter()
+        self.last_progress_event = 0
+        self.finished = False
+        if self.ingest_run.stage_metrics is None:
+            self.ingest_run.stage_metrics = {}
+        self.publish("run", {"status": "started"})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and not self.finished:
+            self.run_log.fail(exc)
+            self.finish("error")
+        return False
+
+    def publish(self, event_type, data):
+        if self.ingest_run.sftp_drop_zone_id is None:
+            return
+        publish_event(dropzone_channel(self.ingest_run.sftp_drop_zone_id), event_type, {
+            "ingest_run": self.ingest_run.pk,
+            "accountjob": self.ingest_run.accountjob_id,
+            "filename": str(self.ingest_run.path_and_filename).rsplit("/", 1)[-1],
+            **data,
+        })
+
+    def progress(self, stage, rows_done, rows_total, stage_started):
+        """
+        Rows done so far in a long stage, with an ETA from the rate so far.
+        Cheap to call per row: events are throttled.
+        """
+        now = time.perf_counter()
+        if now - self.last_progress_event < PROGRESS_EVENT_SECONDS and rows_done < rows_total:
+            return
+        self.last_progress_event = now
+
+        elapsed = now - stage_started
+        rate = rows_done / elapsed if elapsed > 0 else 0
+        self.publish("progress", {
+            "stage": stage,
+            "rows_done": rows_done,
+            "rows_total": rows_total,
+            "rows_per_second": round(rate, 1),
+            "eta_seconds": round((rows_total - rows_done) / rate, 1) if rate else None,
+        })
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        metrics = {
+            "rows_in": rows_in,
+            "rows_out": None,
+            "bytes_read": 0,
+        }
+        counter = QueryCounter()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            with connection.execute_wrapper(counter):
+                yield metrics
+        finally:
+            metrics["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+            metrics["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            metrics["queries"] = counter.count
+            try:
+                self.record(name, metrics)
+            except Exception:
+                # e.g. the database went away mid-stage: the stage's own
+                # error is the one to propagate
+                logger.exception(f"Could not record metrics for stage {name}")
+
+    def record(self, name, metrics):
+        ingest_metrics.INGEST_STAGE_DURATION.observe(metrics["wall_seconds"], stage=name)
+        if metrics.get("rows_out"):
+            ingest_metrics.INGEST_ROWS.inc(metrics["rows_out"], accountjob=self.accountjob_label, stage=name)
+
+        self.ingest_run.stage_metrics[name] = metrics
+        self.run_log.update_run(stage_metrics=self.ingest_run.stage_metrics)
+        self.run_log.log(format_stage_metrics(name, metrics), stage=name, metrics=metrics)
+        self.run_log.flush()
+        self.publish("stage", {"stage": name, "metrics": metrics})
+
+    def finish(self, outcome):
+        """
+        Record the run outcome ("success", "validation_failed" or "error")
+        and flush the metric registries.
+        """
+        self.finished = True
+        ingest_metrics.INGEST_RUNS.inc(accountjob=self.accountjob_label, outcome=outcome)
+        ingest_metrics.INGEST_RUN_DURATION.observe(
+            time.perf_counter() - self.started,
+            accountjob=self.accountjob_label,
+        )
+        if outcome == "success":
+            ingest_metrics.INGEST_LAST_SUCCESS.set(time.time(), accountjob=self.accountjob_label)
+        ingest_metrics.REGISTRY.flush()
+        # the dashboard re-reads the run when it gets the event
+        self.run_log.flush()
+        self.publish("run", {"status": outcome, "result_text": self.ingest_run.result_text})
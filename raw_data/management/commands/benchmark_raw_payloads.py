@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Func, IntegerField
+
+from raw_data.compaction import RAW_DATA_MODELS
+from raw_data.payload_codec import COMPRESSIONS, decode_payload, encode_payload, zstandard
+
+
+class Command(BaseCommand):
+    help = "Compare stored JSON payload sizes with the compact payload format on a sample of raw rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=5000,
+            help="Rows sampled per raw data model (newest current JSON rows)",
+        )
+
+    def handle(self, *args, **options):
+        for model in RAW_DATA_MODELS:
+            rows = model.objects.filter(is_current=True, payload__isnull=False).order_by("-id")
+            sample = list(
+                rows
+                .annotate(stored_bytes=Func(F("payload"), function="pg_column_size", output_field=IntegerField()))
+                .values_list("payload", "stored_bytes")[:options["sample"]]
+            )
+            if not sample:
+                self.stdout.write(f"{model._meta.label}: no JSON payload rows to sample")
+                continue
+
+            total_rows = model.objects.count()
+            stored = sum(stored_bytes for _, stored_bytes in sample)
+            text = sum(len(json.dumps(payload).encode("utf-8")) for payload, _ in sample)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{model._meta.label}: {len(sample)} rows sampled of {total_rows}"))
+            self.report("jsonb as stored", stored, stored, len(sample), total_rows)
+            self.report("json text", text, stored, len(sample), total_rows)
+
+            for name, compression in COMPRESSIONS.items():
+                if name == "zstd" and zstandard is None:
+                    self.stdout.write("  compact/zstd: skipped (zstandard not installed)")
+                    continue
+
+                started = time.perf_counter()
+                encoded = [(encode_payload(payload, list(payload), compression), list(payload)) for payload, _ in sample]
+                encode_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for data, fields in encoded:
+                    decode_payload(data, fields)
+                decode_seconds = time.perf_counter() - started
+
+                self.report(
+                    f"compact/{name}",
+                    sum(len(data) for data, _ in encoded),
+                    stored,
+                    len(sample),
+                    total_rows,
+                    f", encode {encode_seconds * 1e6 / len(sample):.1f}us/row, decode {decode_seconds * 1e6 / len(sample):.1f}us/row",
+                )
+
+    def report(self, label, size, stored, sample_rows, total_rows, extra=""):
+        per_row = size / sample_rows
+        self.stdout.write(
+            f"  {label}: {per_row:.0f} B/row ({size / stored:.0%} of stored), "
+            f"~{per_row * total_rows / 1024 ** 3:.2f} GiB for the table{extra}"
+        )
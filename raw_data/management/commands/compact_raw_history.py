@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from raw_data.compaction import (
+    RAW_HISTORY_BATCH_SIZE,
+    RAW_HISTORY_EXPORT_DIR,
+    RAW_HISTORY_RETENTION_DAYS,
+    compact_raw_history,
+)
+
+
+class Command(BaseCommand):
+    help = "Export superseded raw data versions older than N days to gzipped JSON lines and delete them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=RAW_HISTORY_RETENTION_DAYS,
+            help="Keep superseded versions ingested within this many days",
+        )
+        parser.add_argument(
+            "--export-dir",
+            type=str,
+            default=str(RAW_HISTORY_EXPORT_DIR),
+            help="Directory for the .jsonl.gz exports",
+        )
+        parser.add_argument(
+            "--no-export",
+            action="store_true",
+            help="Delete without exporting",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RAW_HISTORY_BATCH_SIZE,
+            help="Rows exported and deleted per transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the rows that would be compacted",
+        )
+
+    def handle(self, *args, **options):
+        results = compact_raw_history(
+            days=options["days"],
+            export_dir=None if options["no_export"] else options["export_dir"],
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        verb = "would be compacted" if options["dry_run"] else "compacted"
+        for label, count in results.items():
+            self.stdout.write(self.style.SUCCESS(f"{label}: {count} superseded rows {verb}"))
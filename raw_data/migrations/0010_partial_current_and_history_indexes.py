@@ -0,0 +1,76 @@
+# Generated by Django 4.2.27 on 2026-10-19 14:35
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # raw tables are large: build indexes without locking out ingest
+    atomic = False
+
+    dependencies = [
+        ("raw_data", "0009_alter_rawbookingdata_debug_business_key_and_more"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="rawcustomervehicledata",
+            index=models.Index(
+                condition=models.Q(("is_current", True)),
+                fields=["tenant", "business_key_hash"],
+                name="rawcvd_current_bk_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="rawcustomervehicledata",
+            index=models.Index(
+                condition=models.Q(("is_current", False)),
+                fields=["ingested_at"],
+                name="rawcvd_history_ingested_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="rawcustomervehicledata",
+            name="raw_data_ra_tenant__ff2dfd_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="rawrecalldata",
+            index=models.Index(
+                condition=models.Q(("is_current", True)),
+                fields=["business_key_hash"],
+                name="rawrecall_current_bk_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="rawrecalldata",
+            index=models.Index(
+                condition=models.Q(("is_current", False)),
+                fields=["ingested_at"],
+                name="rawrecall_history_ingested_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="rawrecalldata",
+            name="raw_data_ra_busines_a0265f_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="rawbookingdata",
+            index=models.Index(
+                condition=models.Q(("is_current", True)),
+                fields=["tenant", "business_key_hash"],
+                name="rawbooking_current_bk_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="rawbookingdata",
+            index=models.Index(
+                condition=models.Q(("is_current", False)),
+                fields=["ingested_at"],
+                name="rawbooking_history_ingest_idx",
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="rawbookingdata",
+            name="raw_data_ra_tenant__0535b2_idx",
+        ),
+    ]
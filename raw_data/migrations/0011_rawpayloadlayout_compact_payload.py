@@ -0,0 +1,98 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("canonical", "0024_remove_job_filename_prefix_and_more"),
+        ("raw_data", "0010_partial_current_and_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RawPayloadLayout",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("version", models.PositiveIntegerField()),
+                ("fields", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "source_schema",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="raw_payload_layouts",
+                        to="canonical.sourceschema",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("source_schema", "version")},
+            },
+        ),
+        migrations.AlterField(
+            model_name="rawbookingdata",
+            name="payload",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="rawcustomervehicledata",
+            name="payload",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="rawrecalldata",
+            name="payload",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rawbookingdata",
+            name="payload_compact",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rawcustomervehicledata",
+            name="payload_compact",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rawrecalldata",
+            name="payload_compact",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rawbookingdata",
+            name="payload_layout",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="raw_data.rawpayloadlayout",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rawcustomervehicledata",
+            name="payload_layout",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="raw_data.rawpayloadlayout",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rawrecalldata",
+            name="payload_layout",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="raw_data.rawpayloadlayout",
+            ),
+        ),
+    ]
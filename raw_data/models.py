@@ -1,6 +1,24 @@
 from django.db import models
+from django.db.models import Q
 from tenants.models import Tenant
 
+
+class RawPayloadLayout(models.Model):
+    """
+    A SourceSchema's payload field list, versioned: compact raw payloads
+    (raw_data.payload_codec) store only values, in this order.
+    """
+    source_schema = models.ForeignKey("canonical.SourceSchema", on_delete=models.PROTECT, related_name="raw_payload_layouts")
+    version = models.PositiveIntegerField()
+    fields = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("source_schema", "version")
+
+    def __str__(self):
+        return f"{self.source_schema} v{self.version}"
+
 class BaseRawData(models.Model):
     source_name = models.CharField(max_length=255)
     source_file = models.CharField(max_length=512, null=True, blank=True)
@@ -8,7 +26,10 @@ class BaseRawData(models.Model):
     row_hash = models.CharField(max_length=64)
     business_key_hash = models.CharField(max_length=64, null=True, blank=True)
     debug_business_key = models.JSONField(null=True, blank=True)
-    payload = models.JSONField()
+    # payload is null when the row is stored in the compact format
+    payload = models.JSONField(null=True, blank=True)
+    payload_layout = models.ForeignKey(RawPayloadLayout, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    payload_compact = models.BinaryField(null=True, blank=True)
     ingested_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
     is_current = models.BooleanField(default=False)
@@ -18,6 +39,14 @@ class BaseRawData(models.Model):
     class Meta:
         abstract = True
 
+
+# Lookups only ever want current rows: index just those (partial indexes), so
+# the index stays the size of the current data however much history builds
+# up. History gets its own small index on ingested_at for compaction
+# (raw_data.compaction).
+CURRENT_ROWS = Q(is_current=True)
+HISTORY_ROWS = Q(is_current=False)
+
 class RawCustomerVehicleData(BaseRawData):
     tenant = models.ForeignKey(
         Tenant,
@@ -27,7 +56,8 @@ class RawCustomerVehicleData(BaseRawData):
 
     class Meta:
         indexes = [
-            models.Index(fields=["tenant", "business_key_hash", "is_current"]),
+            models.Index(fields=["tenant", "business_key_hash"], condition=CURRENT_ROWS, name="rawcvd_current_bk_idx"),
+            models.Index(fields=["ingested_at"], condition=HISTORY_ROWS, name="rawcvd_history_ingested_idx"),
         ]
 
     def __str__(self):
@@ -37,7 +67,8 @@ class RawCustomerVehicleData(BaseRawData):
 class RawRecallData(BaseRawData):
     class Meta:
         indexes = [
-            models.Index(fields=["business_key_hash", "is_current"]),
+            models.Index(fields=["business_key_hash"], condition=CURRENT_ROWS, name="rawrecall_current_bk_idx"),
+            models.Index(fields=["ingested_at"], condition=HISTORY_ROWS, name="rawrecall_history_ingested_idx"),
         ]
 
     def __str__(self):
@@ -52,7 +83,8 @@ class RawBookingData(BaseRawData):
 
     class Meta:
         indexes = [
-            models.Index(fields=["tenant", "business_key_hash", "is_current"]),
+            models.Index(fields=["tenant", "business_key_hash"], condition=CURRENT_ROWS, name="rawbooking_current_bk_idx"),
+            models.Index(fields=["ingested_at"], condition=HISTORY_ROWS, name="rawbooking_history_ingest_idx"),
         ]
 
     def __str__(self):
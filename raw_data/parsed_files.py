@@ -0,0 +1,155 @@
+import fcntl
+import hashlib
+import logging
+import os
+import time
+
+from pathlib import Path
+
+from django.conf import settings
+
+from core.redis_client import get_redis_client
+from core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Worker-private (0700), outside the SFTP roots: a spill is only ever data
+# (JSON lines, never pickle), but nothing a client uploads should sit where
+# the workers load parses from
+PARSED_FILES_DIR = Path(getattr(settings, "PARSED_FILES_DIR", Path(settings.TEMP_FILES_DIR) / "parsed"))
+
+DROP_FILE_SEPARATOR = "|"
+
+REFS_KEY_PREFIX = "parsed:refs"
+REFS_TTL_SECONDS = 24 * 60 * 60
+
+# Spills outlive their consumers only if a run crashed; the sweep removes
+# them once their source has left /ready, or after this long regardless
+PARSED_FILE_MAX_AGE_SECONDS = getattr(settings, "PARSED_FILE_MAX_AGE_SECONDS", 6 * 60 * 60)
+PARSED_FILE_ORPHAN_GRACE_SECONDS = 10 * 60
+
+
+def csv_to_header_and_rows(contents, separator=','):
+    lines = contents.splitlines()
+    header, *rows = lines
+    header = header.split(separator)
+    rows = [row.split(separator) for row in rows]
+    return header, rows
+
+def parse_file(path_and_filename):
+    with open(path_and_filename, "r") as f:
+        contents = f.read()
+    return csv_to_header_and_rows(contents, DROP_FILE_SEPARATOR)
+
+
+#########################################
+# parsed-file cache (path + mtime + size)
+#########################################
+def parsed_folder_for(zone_dir):
+    """
+    The spill folder for one zone folder (the parent of drop/ready/processed).
+    """
+    zone_hash = hashlib.sha256(str(Path(zone_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+    return PARSED_FILES_DIR / zone_hash
+
+def spill_path_for(path_and_filename):
+    """
+    Where the parsed copy of this version (mtime + size) of a file lives.
+    """
+    path_and_filename = Path(path_and_filename)
+    st = os.stat(path_and_filename)
+    return (
+        parsed_folder_for(path_and_filename.parent.parent)
+        / f"{path_and_filename.name}.{st.st_mtime_ns}.{st.st_size}.jsonl"
+    )
+
+def refs_key(spill_path):
+    return f"{REFS_KEY_PREFIX}:{Path(spill_path).name}"
+
+def spill_parsed_file(path_and_filename, spill_path=None, consumers=1):
+    """
+    Parse a drop file once and spill it to disk as JSON lines (the header,
+    then one row per line), for every
+    AccountJob consuming this version of the file to load instead of
+    re-reading and re-splitting it. `consumers` jobs will each call
+    release_parsed_file; the last one evicts the spill.
+
+    Concurrent callers (workers on the same host) wait on a file lock, so the
+    file is parsed once however many jobs start together.
+    """
+    spill_path = Path(spill_path or spill_path_for(path_and_filename))
+    if spill_path.exists():
+        return spill_path
+
+    PARSED_FILES_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    spill_path.parent.mkdir(mode=0o700, exist_ok=True)
+    with open(spill_path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if spill_path.exists():
+                return spill_path
+
+            header, rows = parse_file(path_and_filename)
+
+            tmp_path = spill_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(dumps(header) + "\n")
+                f.writelines(dumps(row) + "\n" for row in rows)
+            os.replace(tmp_path, spill_path)
+
+            get_redis_client().set(refs_key(spill_path), consumers, ex=REFS_TTL_SECONDS)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    logger.info(f"Parsed {path_and_filename} once for {consumers} job(s): {len(rows)} rows → {spill_path}")
+    return spill_path
+
+def load_parsed_file(spill_path):
+    with open(spill_path, "r", encoding="utf-8") as f:
+        header = loads(f.readline())
+        rows = [loads(line) for line in f]
+    return header, rows
+
+def release_parsed_file(spill_path):
+    """
+    A consuming job has finished with the spill; the last one removes it.
+    """
+    remaining = get_redis_client().decr(refs_key(spill_path))
+    if remaining <= 0:
+        remove_parsed_file(spill_path)
+
+def remove_parsed_file(spill_path):
+    spill_path = Path(spill_path)
+    for path in (spill_path, spill_path.with_suffix(".lock")):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    get_redis_client().delete(refs_key(spill_path))
+
+def evict_stale_parsed_files(zone_dirs):
+    """
+    Sweep for spills whose consumers crashed before releasing them.
+    """
+    now = time.time()
+    evicted = 0
+    for zone_dir in zone_dirs:
+        parsed_folder = parsed_folder_for(zone_dir)
+        try:
+            entries = list(os.scandir(parsed_folder))
+        except FileNotFoundError:
+            continue
+
+        for entry in entries:
+            if not entry.name.endswith(".jsonl"):
+                continue
+            age = now - entry.stat().st_mtime
+            source_name = entry.name.rsplit(".", 3)[0]
+            try:
+                source_gone = spill_path_for(Path(zone_dir) / "ready" / source_name).name != entry.name
+            except FileNotFoundError:
+                source_gone = True
+            if age > PARSED_FILE_MAX_AGE_SECONDS or (source_gone and age > PARSED_FILE_ORPHAN_GRACE_SECONDS):
+                remove_parsed_file(entry.path)
+                evicted += 1
+    return evicted
@@ -0,0 +1,288 @@
+import base64
+import binascii
+import json
+import logging
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+#########################################################
+# Compact raw payloads
+#
+# A payload dict is stored as its values only, in the
+# column order of a RawPayloadLayout (the SourceSchema's
+# field list, versioned whenever the keys change):
+#
+#   format byte | compression byte | body (maybe compressed)
+#
+# body is a sequence of tagged values. Ciphertext strings
+# (base64 of nonce + AES-GCM output) are stored as their
+# raw bytes and re-encoded on decode, so decode_payload()
+# returns exactly the dict that was encoded.
+#########################################################
+
+FORMAT_V1 = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+# "json" (payload JSONField) or "compact" (payload_layout + payload_compact)
+RAW_PAYLOAD_FORMAT = getattr(settings, "RAW_PAYLOAD_FORMAT", "json")
+RAW_PAYLOAD_COMPRESSION = getattr(settings, "RAW_PAYLOAD_COMPRESSION", "zlib")
+
+# Bodies shorter than this aren't worth a compressor's framing
+MIN_COMPRESS_BYTES = 64
+
+TAG_NONE = 0
+TAG_STR = 1
+TAG_CIPHERTEXT = 2
+TAG_DICT = 3
+TAG_JSON = 4
+
+# nonce (12) + GCM tag (16): anything shorter can't be one of our ciphertexts
+MIN_CIPHERTEXT_BYTES = 28
+
+
+class PayloadDecodeError(ValueError):
+    pass
+
+
+#########################################
+# tagged values
+#########################################
+def write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+def ciphertext_bytes(value):
+    """
+    The bytes behind a base64 ciphertext string, or None if `value` isn't
+    one. Only strings that re-encode to exactly themselves qualify, so
+    storing the bytes is lossless.
+    """
+    if len(value) < 40 or len(value) % 4:
+        return None
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) < MIN_CIPHERTEXT_BYTES or base64.b64encode(raw).decode("ascii") != value:
+        return None
+    return raw
+
+def write_value(out, value):
+    if value is None:
+        out.append(TAG_NONE)
+    elif isinstance(value, str):
+        raw = ciphertext_bytes(value)
+        if raw is not None:
+            out.append(TAG_CIPHERTEXT)
+        else:
+            out.append(TAG_STR)
+            raw = value.encode("utf-8")
+        write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, dict):
+        # nested normalised values, e.g. parse_postcode's components
+        out.append(TAG_DICT)
+        write_varint(out, len(value))
+        for k, v in value.items():
+            raw = k.encode("utf-8")
+            write_varint(out, len(raw))
+            out += raw
+            write_value(out, v)
+    else:
+        raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        out.append(TAG_JSON)
+        write_varint(out, len(raw))
+        out += raw
+
+def read_value(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag == TAG_NONE:
+        return None, pos
+    if tag == TAG_DICT:
+        count, pos = read_varint(buf, pos)
+        value = {}
+        for _ in range(count):
+            size, pos = read_varint(buf, pos)
+            k = bytes(buf[pos:pos + size]).decode("utf-8")
+            value[k], pos = read_value(buf, pos + size)
+        return value, pos
+
+    size, pos = read_varint(buf, pos)
+    raw = bytes(buf[pos:pos + size])
+    pos += size
+    if tag == TAG_STR:
+        return raw.decode("utf-8"), pos
+    if tag == TAG_CIPHERTEXT:
+        return base64.b64encode(raw).decode("ascii"), pos
+    if tag == TAG_JSON:
+        return json.loads(raw), pos
+    raise PayloadDecodeError(f"Unknown value tag {tag}")
+
+
+#########################################
+# payloads
+#########################################
+def compress(body, compression):
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        compression = COMPRESSION_ZLIB
+    if len(body) < MIN_COMPRESS_BYTES:
+        compression = COMPRESSION_NONE
+
+    if compression == COMPRESSION_ZSTD:
+        return compression, zstandard.ZstdCompressor(level=3).compress(body)
+    if compression == COMPRESSION_ZLIB:
+        return compression, zlib.compress(body, 6)
+    return COMPRESSION_NONE, body
+
+def decompress(body, compression):
+    if compression == COMPRESSION_NONE:
+        return body
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(body)
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise PayloadDecodeError("Payload is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise PayloadDecodeError(f"Unknown compression {compression}")
+
+def encode_payload(payload, fields, compression=None):
+    """
+    bytes for `payload`, whose keys must be exactly `fields` (a layout's
+    field list) in that order.
+    """
+    if compression is None:
+        compression = COMPRESSIONS[RAW_PAYLOAD_COMPRESSION]
+
+    body = bytearray()
+    for field in fields:
+        write_value(body, payload[field])
+
+    compression, body = compress(bytes(body), compression)
+    return bytes((FORMAT_V1, compression)) + body
+
+def decode_payload(data, fields):
+    """
+    The payload dict encode_payload() was given.
+    """
+    data = bytes(data)
+    if len(data) < 2 or data[0] != FORMAT_V1:
+        raise PayloadDecodeError("Not a compact raw payload")
+    body = decompress(data[2:], data[1])
+
+    payload = {}
+    pos = 0
+    for field in fields:
+        payload[field], pos = read_value(body, pos)
+    if pos != len(body):
+        raise PayloadDecodeError(f"Payload has {len(body) - pos} trailing bytes for its layout")
+    return payload
+
+
+#########################################
+# layouts
+#########################################
+# Layouts never change once created, so they're cached for the process
+_layouts_by_id = {}
+_layouts_by_fields = {}
+
+def remember_layout(layout):
+    _layouts_by_id[layout.pk] = layout
+    _layouts_by_fields[(layout.source_schema_id, tuple(layout.fields))] = layout
+    return layout
+
+def get_payload_layout(source_schema_id, fields):
+    """
+    The RawPayloadLayout for a source schema's payload keys, creating the
+    schema's next version if these keys are new.
+    """
+    from .models import RawPayloadLayout
+
+    fields = tuple(fields)
+    layout = _layouts_by_fields.get((source_schema_id, fields))
+    if layout is not None:
+        return layout
+
+    for _ in range(3):
+        layout = RawPayloadLayout.objects.filter(source_schema_id=source_schema_id, fields=list(fields)).first()
+        if layout is not None:
+            return remember_layout(layout)
+
+        latest = RawPayloadLayout.objects.filter(source_schema_id=source_schema_id).aggregate(v=Max("version"))["v"]
+        try:
+            with transaction.atomic():
+                layout = RawPayloadLayout.objects.create(
+                    source_schema_id=source_schema_id,
+                    version=(latest or 0) + 1,
+                    fields=list(fields),
+                )
+        except IntegrityError:
+            # another worker took this version number: look again
+            continue
+        logger.info(f"New raw payload layout v{layout.version} for source schema {source_schema_id}: {len(fields)} fields")
+        return remember_layout(layout)
+
+    raise RuntimeError(f"Could not allocate a raw payload layout for source schema {source_schema_id}")
+
+def get_layout_by_id(layout_id):
+    from .models import RawPayloadLayout
+
+    layout = _layouts_by_id.get(layout_id)
+    if layout is None:
+        layout = remember_layout(RawPayloadLayout.objects.get(pk=layout_id))
+    return layout
+
+
+#########################################
+# raw rows
+#########################################
+def payload_storage_fields(payload, source_schema_id, payload_format=None):
+    """
+    Field values for storing `payload` on a raw data row in the configured
+    format (RAW_PAYLOAD_FORMAT).
+    """
+    if (payload_format or RAW_PAYLOAD_FORMAT) != "compact" or source_schema_id is None:
+        return {"payload": payload}
+
+    layout = get_payload_layout(source_schema_id, payload.keys())
+    return {
+        "payload": None,
+        "payload_layout": layout,
+        "payload_compact": encode_payload(payload, layout.fields),
+    }
+
+def raw_payload(raw_row):
+    """
+    A raw data row's payload dict, whichever format it was stored in.
+    """
+    if raw_row.payload_compact is None:
+        return raw_row.payload
+    layout = get_layout_by_id(raw_row.payload_layout_id)
+    return decode_payload(raw_row.payload_compact, layout.fields)
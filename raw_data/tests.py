@@ -1,3 +1,215 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import tempfile
+import unittest
 
-# Create your tests here.
+from datetime import timedelta
+from pathlib import Path
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from canonical.models import SourceSchema
+from raw_data import payload_codec
+from raw_data.compaction import compact_model_history
+from raw_data.models import RawRecallData
+from raw_data.payload_codec import (
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    FORMAT_V1,
+    TAG_STR,
+    PayloadDecodeError,
+    ciphertext_bytes,
+    decode_payload,
+    encode_payload,
+    payload_storage_fields,
+)
+
+
+def fake_ciphertext(size=60):
+    # base64 of nonce + AES-GCM output, as canonical.etl stores PII
+    return base64.b64encode(os.urandom(size)).decode("ascii")
+
+
+# base64-looking strings that must come back exactly as they went in
+BASE64_LOOKALIKES = [
+    "QUJD",                                    # too short for a ciphertext
+    "QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVo=",   # base64, but too short
+    "A" * 42 + "B=",                          # non-zero padding bits: not canonical
+    "QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVphYmNkZWZn=",  # bad padding
+    "QUJD REVG R0hJ SktM TU5P UFFS U1RV VldY WVo=",  # spaces
+    "YWJj" * 10,                              # canonical, 30 bytes: kept as bytes
+]
+
+PAYLOAD = {
+    "customer_id": "C001",
+    "email": fake_ciphertext(),
+    "phone": None,
+    "notes": "",
+    "mileage": 12345,
+    "price": 1e-05,
+    "balance": -0.5,
+    "opt_in": True,
+    "tags": ["a", None, 1],
+    "postcode": {"postcode_full": "SW1A 1AA", "postcode_area": "SW", "nested": {"empty": "", "none": None}},
+    "name": "Zoë Kraków €",
+}
+
+
+class PayloadCodecRoundTripTests(SimpleTestCase):
+    def assert_round_trip(self, payload, compression=COMPRESSION_NONE):
+        fields = list(payload)
+        data = encode_payload(payload, fields, compression)
+        decoded = decode_payload(data, fields)
+        self.assertEqual(decoded, payload)
+        self.assertEqual(list(decoded), fields)
+        # types survive, not just equality (1 == 1.0 == True)
+        for field in fields:
+            self.assertIs(type(decoded[field]), type(payload[field]))
+        return data
+
+    def test_round_trip(self):
+        self.assert_round_trip(PAYLOAD)
+
+    def test_none_and_empty_string(self):
+        self.assert_round_trip({"a": None, "b": "", "c": None})
+
+    def test_empty_payload(self):
+        self.assert_round_trip({})
+
+    def test_nested_dicts(self):
+        self.assert_round_trip({"outer": {"inner": {"deepest": {"value": "x", "empty": {}}}}})
+
+    def test_numbers(self):
+        self.assert_round_trip({
+            "zero": 0,
+            "int": 42,
+            "negative": -7,
+            "big": 2 ** 64,
+            "float": 0.1,
+            "whole_float": 2.0,
+            "small_float": 1e-05,
+            "large_float": 1e16,
+            "bool": False,
+        })
+
+    def test_ciphertext_stored_as_bytes(self):
+        value = fake_ciphertext(60)
+        data = self.assert_round_trip({"email": value})
+        # format, compression, tag, varint length, 60 raw bytes
+        self.assertEqual(len(data), 2 + 1 + 1 + 60)
+
+    def test_base64_lookalikes(self):
+        for value in BASE64_LOOKALIKES:
+            with self.subTest(value=value):
+                self.assert_round_trip({"value": value})
+
+    def test_non_canonical_base64_is_stored_as_text(self):
+        for value in BASE64_LOOKALIKES[:5]:
+            with self.subTest(value=value):
+                self.assertIsNone(ciphertext_bytes(value))
+
+    def test_each_compression(self):
+        payload = {**PAYLOAD, "long": "x" * 500}
+        compressions = [COMPRESSION_NONE, COMPRESSION_ZLIB]
+        if payload_codec.zstandard is not None:
+            compressions.append(COMPRESSION_ZSTD)
+        for compression in compressions:
+            with self.subTest(compression=compression):
+                data = self.assert_round_trip(payload, compression)
+                self.assertEqual(data[1], compression)
+
+    def test_short_bodies_are_not_compressed(self):
+        data = self.assert_round_trip({"a": "b"}, COMPRESSION_ZLIB)
+        self.assertEqual(data[1], COMPRESSION_NONE)
+
+    @unittest.skipIf(payload_codec.zstandard is not None, "zstandard installed")
+    def test_zstd_falls_back_to_zlib(self):
+        data = self.assert_round_trip({"long": "x" * 500}, COMPRESSION_ZSTD)
+        self.assertEqual(data[1], COMPRESSION_ZLIB)
+
+
+class PayloadCodecErrorTests(SimpleTestCase):
+    def test_trailing_bytes(self):
+        data = encode_payload({"a": "1", "b": "2"}, ["a", "b"], COMPRESSION_NONE)
+        with self.assertRaisesRegex(PayloadDecodeError, "trailing bytes"):
+            decode_payload(data, ["a"])
+
+    def test_unknown_tag(self):
+        data = bytes((FORMAT_V1, COMPRESSION_NONE, 99, 0))
+        with self.assertRaisesRegex(PayloadDecodeError, "Unknown value tag 99"):
+            decode_payload(data, ["a"])
+
+    def test_unknown_compression(self):
+        data = bytes((FORMAT_V1, 9, TAG_STR, 1)) + b"x"
+        with self.assertRaisesRegex(PayloadDecodeError, "Unknown compression 9"):
+            decode_payload(data, ["a"])
+
+    def test_not_a_compact_payload(self):
+        for data in (b"", b"\x01", b'{"a": "1"}'):
+            with self.subTest(data=data):
+                with self.assertRaises(PayloadDecodeError):
+                    decode_payload(data, ["a"])
+
+
+class CompactModelHistoryTests(TestCase):
+    def setUp(self):
+        source_schema = SourceSchema.objects.create(name="recalls", system="OEM", filename_prefix="REC")
+        now = timezone.now()
+        self.cutoff = now - timedelta(days=30)
+
+        def raw_row(number, is_current, days_ago, payload_format):
+            payload = {"recall_id": f"R{number}", "vin": fake_ciphertext(), "mileage": number * 1000}
+            row = RawRecallData.objects.create(
+                source_name="recalls.csv", source_row_number=number, row_hash=f"hash-{number}",
+                is_current=is_current, last_seen_run_id="20261019T000000000",
+                **payload_storage_fields(payload, source_schema.pk, payload_format),
+            )
+            # ingested_at is auto_now_add
+            RawRecallData.objects.filter(pk=row.pk).update(ingested_at=now - timedelta(days=days_ago))
+            return row.pk, payload
+
+        self.old_json = raw_row(1, False, 60, "json")
+        self.old_compact = raw_row(2, False, 45, "compact")
+        self.recent = raw_row(3, False, 1, "compact")
+        self.old_current = raw_row(4, True, 60, "compact")
+
+    def test_only_superseded_rows_older_than_the_cutoff_are_removed(self):
+        compacted = compact_model_history(RawRecallData, self.cutoff, batch_size=1)
+
+        self.assertEqual(compacted, 2)
+        self.assertEqual(
+            set(RawRecallData.objects.values_list("pk", flat=True)),
+            {self.recent[0], self.old_current[0]},
+        )
+
+    def test_export_matches_the_deleted_rows(self):
+        with tempfile.TemporaryDirectory() as export_dir:
+            compact_model_history(RawRecallData, self.cutoff, export_dir=export_dir, batch_size=1)
+
+            (export_path,) = Path(export_dir).iterdir()
+            with gzip.open(export_path, "rt", encoding="utf-8") as f:
+                exported = {row["id"]: row for row in map(json.loads, f)}
+
+        self.assertEqual(set(exported), {self.old_json[0], self.old_compact[0]})
+        for pk, payload in (self.old_json, self.old_compact):
+            with self.subTest(pk=pk):
+                row = exported[pk]
+                self.assertEqual(row["payload"], payload)
+                self.assertNotIn("payload_compact", row)
+                self.assertEqual(row["source_row_number"], payload["mileage"] // 1000)
+                self.assertEqual(row["row_hash"], f"hash-{row['source_row_number']}")
+                self.assertFalse(row["is_current"])
+        self.assertIsNone(exported[self.old_json[0]]["payload_layout_id"])
+        self.assertIsNotNone(exported[self.old_compact[0]]["payload_layout_id"])
+
+    def test_dry_run_deletes_nothing(self):
+        with tempfile.TemporaryDirectory() as export_dir:
+            compacted = compact_model_history(RawRecallData, self.cutoff, export_dir=export_dir, dry_run=True)
+
+            self.assertEqual(compacted, 2)
+            self.assertEqual(list(Path(export_dir).iterdir()), [])
+        self.assertEqual(RawRecallData.objects.count(), 4)
@@ -1,29 +1,33 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from tenants.models import AccountJob, IngestRun, AccountJobLog
+from tenants.locks import LockNotAcquired, account_job_run_lock
 from tenants.utils import ensure_local_ready_folder
 from django.conf import settings
 from pathlib import Path
 from canonical.etl import etl_transform
+from canonical.plan import build_execution_plan_for_accountjob
 from tenants.models import Tenant, TenantMappingCode
-import json
+from tenants.tenant_cache import tenant_cache
+import time
 from django.utils import timezone
 import logging
-from pathlib import Path
 import shutil
 import os
 from django.contrib import messages
 from canonical.utils import build_canonical_row
+from core import serialization
 from django.db import models, transaction
 
 from .models import RawCustomerVehicleData, RawRecallData, RawBookingData
+from .instrumentation import RunInstrumentation, RunLogBuffer
+from .payload_codec import payload_storage_fields
+from .parsed_files import load_parsed_file, parse_file, release_parsed_file
 from contracts.models import Customer, Vehicle, CustomerVehicleLink, Recall, Booking
 
 
 logger = logging.getLogger(__name__)
 
-tenant_cache = {}
-
 
 def run_account_job_from_django_admin(request, accountjob_pk):
     accountjob = AccountJob.objects.get(pk=accountjob_pk)
@@ -33,20 +37,16 @@ def run_account_job_from_django_admin(request, accountjob_pk):
             reverse("admin:tenants_accountjob_change", args=[accountjob_pk])
         )
     
-    run_account_job(accountjob_pk, request)
+    try:
+        run_account_job(accountjob_pk, request)
+    except LockNotAcquired:
+        messages.error(request, "This job is already running (or the account has no free run slot) - try again shortly")
     
     return redirect(
         reverse("admin:tenants_accountjob_change", args=[accountjob_pk])
     )
 
-def csv_to_header_and_rows(contents, separator=','):
-    lines = contents.splitlines()
-    header, *rows = lines
-    header = header.split(separator)
-    rows = [row.split(separator) for row in rows]
-    return header, rows        
-
-def store_raw_row(raw_json_row_dict, row_number, ready_folder_path, path_and_filename, run_id, rawdatamodel, is_tenant_aware):
+def store_raw_row(raw_json_row_dict, row_number, ready_folder_path, path_and_filename, run_id, rawdatamodel, is_tenant_aware, source_schema_id=None):
     try:
         if is_tenant_aware:
             tenant_code = raw_json_row_dict.get('tenant_code')
@@ -55,9 +55,7 @@ def store_raw_row(raw_json_row_dict, row_number, ready_folder_path, path_and_fil
                 return
 
             # cache tenant to avoid repeated DB lookups
-            if tenant_code not in tenant_cache:
-                tenant_cache[tenant_code] = Tenant.objects.get(internal_tenant_code=tenant_code)
-            tenant = tenant_cache[tenant_code]
+            tenant = tenant_cache.by_code(tenant_code)
 
         business_key_hash = raw_json_row_dict.get('business_key_hash')
         debug_business_key = raw_json_row_dict.get('debug_business_key')
@@ -116,7 +114,7 @@ def store_raw_row(raw_json_row_dict, row_number, ready_folder_path, path_and_fil
                 business_key_hash=business_key_hash,
                 debug_business_key=debug_business_key,
                 row_hash=row_hash,
-                payload=raw_json_row_dict,
+                **payload_storage_fields(raw_json_row_dict, source_schema_id),
                 processed=False,
                 is_current=True,
                 source_file=str(path_and_filename),
@@ -129,7 +127,7 @@ def store_raw_row(raw_json_row_dict, row_number, ready_folder_path, path_and_fil
                 business_key_hash=business_key_hash,
                 debug_business_key=debug_business_key,
                 row_hash=row_hash,
-                payload=raw_json_row_dict,
+                **payload_storage_fields(raw_json_row_dict, source_schema_id),
                 processed=False,
                 is_current=True,
                 source_file=str(path_and_filename),
@@ -187,20 +185,26 @@ def map_string_model_to_django_model(string_model):
         1/0
 
 @transaction.atomic
-def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
+def sync_model_from_canonical(accountjob, plan, canonical_rows, build_row_fn, delete_missing=True, snapshot_id=None):
     """
     Perform a FULL SYNC between canonical data and a Django model.
 
     This will:
     - CREATE new rows
     - UPDATE existing rows
-    - DELETE rows not present in canonical_rows
+    - DELETE rows not present in canonical_rows (unless delete_missing is
+      False: one file of a many-file snapshot, deleted at finalisation)
+    - with snapshot_id, stamp every row seen (created, updated or
+      unchanged) with it, for finalise_snapshot
 
     Parameters:
     ----------
     accountjob : AccountJob instance
         Contains account, job, and tenant mapping info.
 
+    plan : canonical.plan.ExecutionPlan
+        Tenant mapping codes with their tenants already loaded.
+
     canonical_rows : iterable of dicts
         Raw input data from source system.
 
@@ -209,7 +213,7 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
 
     Returns:
     -------
-    dict with counts of created/updated/deleted
+    dict with counts of created/updated/deleted/unchanged
     """
 
     # Map contract string → Django model class
@@ -221,11 +225,8 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
         # -----------------------------------
         # 1️⃣ Load scoped tenants for this job
         # -----------------------------------
-        # Get Tenant instances from the tenant mapping
-        tenant_map = {
-            t.mapped_tenant.internal_tenant_code: t.mapped_tenant
-            for t in accountjob.tenant_mapping.mapping_codes.all()
-        }
+        # Tenant instances from the tenant mapping (loaded once by the plan)
+        tenant_map = plan.tenant_mapping.tenants_by_code
 
         # Extract primary keys of tenants (your Tenant PK is internal_tenant_code)
         scoped_tenant_pks = list(tenant_map.keys())
@@ -234,7 +235,7 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
         # 2️⃣ Load existing rows in DB
         # -----------------------------------
         # Filter by tenants included in this job
-        existing_qs = model.objects.filter(tenant__internal_tenant_code__in=scoped_tenant_pks)
+        existing_qs = model.objects.filter(tenant__internal_tenant_code__in=scoped_tenant_pks).select_related("tenant")
     else:
         existing_qs = model.objects.all()
 
@@ -268,6 +269,7 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
     # 3️⃣ Process canonical rows
     # -----------------------------------
     unchanged_count=0
+    unchanged_pks = []
     for row in canonical_rows:
         
         fk_map = {}
@@ -276,6 +278,8 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
             fk_map["tenant"] = tenant_map[tenant_code]
 
         data = build_row_fn(row, model, fk_map=fk_map)
+        if snapshot_id:
+            data["last_seen_run_id"] = snapshot_id
 
         key = tuple(
             data[f].internal_tenant_code if isinstance(data[f], Tenant) else data[f]
@@ -296,6 +300,8 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
                 to_update.append(obj)
             else:
                 unchanged_count += 1
+                if snapshot_id and obj.last_seen_run_id != snapshot_id:
+                    unchanged_pks.append(obj.pk)
         else:
             to_create.append(model(**data))
 
@@ -304,10 +310,13 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
     # -----------------------------------
     # 4️⃣ Delete rows not present in canonical_rows
     # -----------------------------------
-    to_delete = [
-        obj for key, obj in existing_map.items()
-        if key not in seen_keys
-    ]
+    if delete_missing:
+        to_delete = [
+            obj for key, obj in existing_map.items()
+            if key not in seen_keys
+        ]
+    else:
+        to_delete = []
 
     # -----------------------------------
     # 5️⃣ Bulk database operations
@@ -326,6 +335,9 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
             **{"pk__in": [obj.pk for obj in to_delete]}
         ).delete()
 
+    for start in range(0, len(unchanged_pks), 1000):
+        model.objects.filter(pk__in=unchanged_pks[start:start + 1000]).update(last_seen_run_id=snapshot_id)
+
     return {
         "created": len(to_create),
         "updated": len(to_update),
@@ -333,6 +345,21 @@ def sync_model_from_canonical(accountjob, canonical_rows, build_row_fn):
         "unchanged": unchanged_count,
     }
 
+@transaction.atomic
+def delete_unseen_from_canonical(accountjob, snapshot_id, tenant_ids):
+    """
+    Snapshot finalisation for many-file jobs: delete the canonical rows of
+    `tenant_ids` that no part of the snapshot stamped with snapshot_id.
+    """
+    model = map_string_model_to_django_model(accountjob.job.canonical_schema.contract)
+    _, deleted = (
+        model.objects
+        .filter(tenant__in=tenant_ids)
+        .exclude(last_seen_run_id=snapshot_id)
+        .delete()
+    )
+    return deleted.get(model._meta.label, 0)
+
 def validate_header(header, source_fields):
     if not header:
         logger.error("Header is empty or None")
@@ -363,10 +390,70 @@ def validate_header(header, source_fields):
 
     return True
 
-def run_account_job(accountjob_pk, request=None):
-    logger.info(f"Starting run_account_job for pk={accountjob_pk}")
-    accountjob = AccountJob.objects.get(pk=accountjob_pk)
+def ready_files_for(accountjob, ready_folder_path, path_and_filename=None):
+    """
+    Files this job should process: the one it was dispatched for, or (manual
+    runs) everything in the ready folder matching the job's filename prefix.
+    """
+    prefix = accountjob.job.source_schema.filename_prefix
+
+    if path_and_filename is not None:
+        path_and_filename = Path(path_and_filename)
+        if not path_and_filename.is_file():
+            logger.warning(f"File no longer in ready folder: {path_and_filename}")
+            return []
+        return [path_and_filename]
+
+    return [
+        p for p in sorted(ready_folder_path.iterdir())
+        if p.is_file() and p.name.startswith(prefix)
+    ]
+
+def new_snapshot_id():
+    # fits RawData.last_seen_run_id
+    return timezone.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+def run_account_job(accountjob_pk, request=None, path_and_filename=None, snapshot_id=None, parsed_path=None):
+    """
+    Process ready files for an AccountJob in this process: the one file it
+    was dispatched for, or everything matching in the ready folder.
 
+    With snapshot_id, path_and_filename is one part of a many-file snapshot:
+    it runs alongside the snapshot's other parts, stamping the rows it sees
+    with the snapshot; deletions wait for finalise_snapshot.
+
+    With parsed_path, the file is shared by several jobs (tenants.dag): rows
+    are loaded from the one parse and the final DAG step moves the file.
+
+    Raises LockNotAcquired if this job is already running for its drop zone
+    or the account has no free run slot.
+    """
+    logger.info(f"Starting run_account_job for pk={accountjob_pk}")
+    accountjob = AccountJob.objects.select_related(
+        "account",
+        "sftp_drop_zone",
+        "tenant_mapping",
+        "job__source_schema",
+        "job__canonical_schema",
+    ).get(pk=accountjob_pk)
+
+    with account_job_run_lock(accountjob, shared=snapshot_id is not None):
+        if parsed_path is not None:
+            try:
+                return process_file(accountjob, Path(path_and_filename), parsed_path=parsed_path)
+            finally:
+                # done with the shared parse, however the run ended
+                release_parsed_file(parsed_path)
+
+        if snapshot_id is not None:
+            if not Path(path_and_filename).is_file():
+                logger.warning(f"File no longer in ready folder: {path_and_filename}")
+                return None
+            return process_file(accountjob, Path(path_and_filename), snapshot_id=snapshot_id)
+
+        process_ready_files(accountjob, request, path_and_filename)
+
+def process_ready_files(accountjob, request=None, path_and_filename=None):
     if not accountjob.job:
         logger.info(f"Improperly configured account_job {accountjob}: No Job provided")
     if not accountjob.sftp_drop_zone:
@@ -378,165 +465,215 @@ def run_account_job(accountjob_pk, request=None):
 
     logger.info(f"Ready folder: {ready_folder_path}")
 
-    #################################################################
-    # for each file currently in the ready folder awaiting processing
-    #################################################################
-    for path_and_filename in sorted(ready_folder_path.iterdir()):
+    files = ready_files_for(accountjob, ready_folder_path, path_and_filename)
 
-        if not path_and_filename.is_file() or not path_and_filename.name.startswith(accountjob.job.source_schema.filename_prefix):
-            continue
+    if accountjob.job.one_or_many_source_files and path_and_filename is None:
+        # the files together are one snapshot: delete only what none of them has
+        snapshot_id = new_snapshot_id()
+        results = [process_file(accountjob, f, request, snapshot_id) for f in files]
+        finalise_snapshot(accountjob, snapshot_id, results)
+    else:
+        #################################################################
+        # for each file currently in the ready folder awaiting processing
+        #################################################################
+        for f in files:
+            process_file(accountjob, f, request)
 
-        ingest_run = IngestRun()
-        ingest_run.account = accountjob.account
-        ingest_run.accountjob = accountjob
-        ingest_run.sftp_drop_zone = accountjob.sftp_drop_zone
-        ingest_run.result_text = 'Starting job...'
-        ingest_run.path_and_filename = path_and_filename
-        ingest_run.save()
+    logger.info("Job complete")
 
-        account_job_log = AccountJobLog()
-        account_job_log.ingest_run = ingest_run
-        account_job_log.message = ingest_run.result_text
-        account_job_log.save()
+    return
 
-        logger.info(f"Processing file: {path_and_filename}")
+def process_file(accountjob, path_and_filename, request=None, snapshot_id=None, parsed_path=None):
+    """
+    Ingest one file. Without snapshot_id the file is a full snapshot (rows
+    missing from it are flagged/deleted); with one it is a part, and the
+    return value feeds finalise_snapshot. Returns None if validation fails.
+    With parsed_path the rows come from a shared parse and the file is left
+    in place for the other jobs consuming it; the caller releases the parse.
+    """
+    ready_folder_path = path_and_filename.parent
+
+    ingest_run = IngestRun()
+    ingest_run.account = accountjob.account
+    ingest_run.accountjob = accountjob
+    ingest_run.sftp_drop_zone = accountjob.sftp_drop_zone
+    ingest_run.result_text = 'Starting job...'
+    ingest_run.path_and_filename = path_and_filename
+    ingest_run.save()
 
-        last_seen_run_id = timezone.now().strftime("%Y-%m-%d_%H-%M-%S")
+    # (a run that raises is finished as "error" for the dashboard and metrics)
+    with RunLogBuffer(ingest_run) as run_log, RunInstrumentation(ingest_run, run_log) as instrumentation:
+        run_log.log(ingest_run.result_text)
+
+        logger.info(f"Processing file: {path_and_filename}")
 
-        with open(path_and_filename, "r") as f:
-            contents = f.read()
+        last_seen_run_id = snapshot_id or new_snapshot_id()
 
-        header, rows = csv_to_header_and_rows(contents, '|')
+        ######
+        # read
+        ######
+        with instrumentation.stage("read") as metrics:
+            if parsed_path is not None:
+                header, rows = load_parsed_file(parsed_path)
+                metrics["bytes_read"] = os.path.getsize(parsed_path)
+            else:
+                metrics["bytes_read"] = path_and_filename.stat().st_size
+                header, rows = parse_file(path_and_filename)
+            metrics["rows_out"] = len(rows)
 
         logger.debug(f"Header: {header}")
         logger.debug(f"Row count: {len(rows)}")
 
-        source_fields = accountjob.job.source_schema.field_mappings.all()
-
-        if not validate_header(header, source_fields):
-            failed_path = path_and_filename.parent.parent / "failed" / path_and_filename.name
-            if os.environ.get("IS_STAGING_SERVER") == "True":
-                os.makedirs(failed_path, exist_ok=True)
+        ##########
+        # validate
+        ##########
+        with instrumentation.stage("validate", rows_in=len(rows)) as metrics:
+            # schema/mapping metadata for the whole run, so the row loops below
+            # run no metadata queries
+            plan = build_execution_plan_for_accountjob(accountjob)
+            header_is_valid = validate_header(header, plan.source_fields)
+            metrics["rows_out"] = len(rows) if header_is_valid else 0
 
-            shutil.move(path_and_filename, failed_path)
+        if not header_is_valid:
+            # (a shared file may already have been moved by another consumer)
+            if path_and_filename.exists():
+                with instrumentation.stage("file_move"):
+                    failed_path = path_and_filename.parent.parent / "failed" / path_and_filename.name
+                    if os.environ.get("IS_STAGING_SERVER") == "True":
+                        os.makedirs(failed_path, exist_ok=True)
 
-            ingest_run.result_text = "Validation failed on the header"
-            ingest_run.save()
+                    shutil.move(path_and_filename, failed_path)
 
-            account_job_log = AccountJobLog()
-            account_job_log.ingest_run = ingest_run
-            account_job_log.message = ingest_run.result_text
-            account_job_log.save()
-            continue
+            run_log.update_run(result_text="Validation failed on the header")
+            instrumentation.finish("validation_failed")
 
-        ingest_run.result_text = "Processing"
-        ingest_run.save()
+            run_log.log(ingest_run.result_text)
+            return None
 
-        account_job_log = AccountJobLog()
-        account_job_log.ingest_run = ingest_run
-        account_job_log.message = ingest_run.result_text
-        account_job_log.save()
+        run_log.update_run(result_text="Processing")
 
-        tenant_mapping = accountjob.tenant_mapping
-        canonical_fields = accountjob.job.canonical_schema.fields.all()
+        run_log.log(ingest_run.result_text)
 
         ############
         # do the etl
         ############
-        raw_json_rows, canonical_rows, _ = etl_transform(
-            source_fields=source_fields,
-            canonical_fields=canonical_fields,
-            orig_header=header,
-            orig_rows=rows,
-            tenant_mapping=tenant_mapping,
-            prepare_for_display=False,
-        )
+        with instrumentation.stage("transform", rows_in=len(rows)) as metrics:
+            raw_json_rows, canonical_rows, _ = etl_transform(
+                plan,
+                orig_header=header,
+                orig_rows=rows,
+                prepare_for_display=False,
+                raw_rows_as_json=False,
+            )
+            metrics["rows_out"] = len(raw_json_rows)
         logger.info(f"Transformed rows: {len(raw_json_rows)}")
 
         ################
         # store raw rows
         ################
+        with instrumentation.stage("raw_store", rows_in=len(raw_json_rows)) as metrics:
+            # get model
+            rawdatamodel = map_string_model_to_django_model(accountjob.job.source_schema.raw_data_storage_model)
+
+            # get current
+            is_tenant_aware = accountjob.tenant_mapping != None
+
+            if is_tenant_aware:
+                tenants = accountjob.tenant_mapping.mapping_codes.all() # the 'expected' scope of the tenants
+                existing_keys = set(
+                    rawdatamodel.objects.filter(
+                        tenant__in=tenants.values_list('mapped_tenant_id', flat=True),
+                        is_current=True
+                    ).values_list('business_key_hash', flat=True)
+                )
+            else:
+                existing_keys = set(
+                    rawdatamodel.objects.filter(
+                        is_current=True
+                    ).values_list('business_key_hash', flat=True)
+                )
 
-        # get model
-        rawdatamodel = map_string_model_to_django_model(accountjob.job.source_schema.raw_data_storage_model)
-        
-        # get current
-        is_tenant_aware = accountjob.tenant_mapping != None
-
-        if is_tenant_aware:
-            tenants = accountjob.tenant_mapping.mapping_codes.all() # the 'expected' scope of the tenants
-            existing_keys = set(
-                rawdatamodel.objects.filter(
-                    tenant__in=tenants.values_list('mapped_tenant_id', flat=True),
-                    is_current=True
-                ).values_list('business_key_hash', flat=True)
-            )
-        else:
-            existing_keys = set(
-                rawdatamodel.objects.filter(
-                    is_current=True
-                ).values_list('business_key_hash', flat=True)
-            )
-
-        # insert new versions
-        seen_keys = set()
-        row_number = 0
-        for raw_json_row in raw_json_rows:
-            row_number += 1
-
-            # Convert string to dict
-            if isinstance(raw_json_row, str):
-                raw_json_row_dict = json.loads(raw_json_row)
-
-            key = raw_json_row_dict.get('business_key_hash')
-            seen_keys.add(key)
-            
-            result = store_raw_row(
-                raw_json_row_dict,
-                row_number,
-                ready_folder_path,
-                path_and_filename,
-                last_seen_run_id,
-                rawdatamodel,
-                is_tenant_aware
-            )
+            # insert new versions
+            seen_keys = set()
+            seen_tenant_codes = set()
+            row_number = 0
+            stored_count = 0
+            stage_started = time.perf_counter()
+            for raw_json_row in raw_json_rows:
+                row_number += 1
+                instrumentation.progress("raw_store", row_number, len(raw_json_rows), stage_started)
+
+                # Convert string to dict
+                if isinstance(raw_json_row, str):
+                    raw_json_row_dict = serialization.loads(raw_json_row)
+                else:
+                    raw_json_row_dict = raw_json_row
+
+                key = raw_json_row_dict.get('business_key_hash')
+                seen_keys.add(key)
+                if is_tenant_aware:
+                    seen_tenant_codes.add(raw_json_row_dict.get('tenant_code'))
+
+                result = store_raw_row(
+                    raw_json_row_dict,
+                    row_number,
+                    ready_folder_path,
+                    path_and_filename,
+                    last_seen_run_id,
+                    rawdatamodel,
+                    is_tenant_aware,
+                    source_schema_id=accountjob.job.source_schema_id,
+                )
 
-            #logger.debug(f"Row {row_number} store result: {result}")
+                #logger.debug(f"Row {row_number} store result: {result}")
 
-            if result in ["INSERTED", "UPDATED"]:
-                pass
+                if result in ["INSERTED", "UPDATED"]:
+                    stored_count += 1
+            metrics["rows_out"] = stored_count
 
+        ###################################
         # flag omitted items as deleted_at_source
-        missing_keys = existing_keys - seen_keys
-        
-        if is_tenant_aware:
-            rawdatamodel.objects.filter(
-                tenant__in=tenants.values_list('mapped_tenant_id', flat=True),
-                is_current=True,
-                business_key_hash__in=missing_keys
-            ).update(
-                is_deleted_at_source=True,
-            )
-        else:
-            rawdatamodel.objects.filter(
-                is_current=True,
-                business_key_hash__in=missing_keys
-            ).update(
-                is_deleted_at_source=True,
-            )
+        ###################################
+        # (snapshot parts skip this - finalise_snapshot flags across all parts)
+        if snapshot_id is None:
+            with instrumentation.stage("deletion_flagging", rows_in=len(existing_keys)) as metrics:
+                missing_keys = existing_keys - seen_keys
+
+                if is_tenant_aware:
+                    flagged_count = rawdatamodel.objects.filter(
+                        tenant__in=tenants.values_list('mapped_tenant_id', flat=True),
+                        is_current=True,
+                        business_key_hash__in=missing_keys
+                    ).update(
+                        is_deleted_at_source=True,
+                    )
+                else:
+                    flagged_count = rawdatamodel.objects.filter(
+                        is_current=True,
+                        business_key_hash__in=missing_keys
+                    ).update(
+                        is_deleted_at_source=True,
+                    )
+                metrics["rows_out"] = flagged_count
 
         ######################
         # store canonical rows
         ######################
-        result = sync_model_from_canonical(accountjob, canonical_rows, build_canonical_row)
+        with instrumentation.stage("canonical_sync", rows_in=len(canonical_rows)) as metrics:
+            result = sync_model_from_canonical(
+                accountjob, plan, canonical_rows, build_canonical_row,
+                delete_missing=snapshot_id is None, snapshot_id=snapshot_id,
+            )
+            metrics["rows_out"] = result["created"] + result["updated"]
 
-        if accountjob.move_source_file_on_completion:
-            #move the file from /ready to /processed        
-            processed_path = path_and_filename.parent.parent / "processed" / path_and_filename.name
-            if os.environ.get("IS_STAGING_SERVER") == "True":
-                os.makedirs(processed_path, exist_ok=True)
+        if accountjob.move_source_file_on_completion and parsed_path is None:
+            with instrumentation.stage("file_move"):
+                #move the file from /ready to /processed
+                processed_path = path_and_filename.parent.parent / "processed" / path_and_filename.name
+                if os.environ.get("IS_STAGING_SERVER") == "True":
+                    os.makedirs(processed_path, exist_ok=True)
 
-            shutil.move(path_and_filename, processed_path)
+                shutil.move(path_and_filename, processed_path)
 
         logger.info("Finished file processing")
 
@@ -547,17 +684,67 @@ def run_account_job(accountjob_pk, request=None):
                 result_text
             )
 
-        ingest_run.result_text = result_text
-        ingest_run.save()
+        run_log.update_run(result_text=result_text)
+        instrumentation.finish("success")
 
-        account_job_log = AccountJobLog()
-        account_job_log.ingest_run = ingest_run
-        account_job_log.message = ingest_run.result_text
-        account_job_log.save()
+        run_log.log(ingest_run.result_text)
 
-    logger.info("Job complete")
+        # the tenants this part holds data for: finalisation deletes nothing
+        # outside them (seen rows are stamped with the snapshot in the DB)
+        tenants_by_code = plan.tenant_mapping.tenants_by_code if is_tenant_aware else {}
+        return {
+            "ingest_run": ingest_run.pk,
+            "tenants": sorted(str(tenants_by_code[code].pk) for code in seen_tenant_codes if code in tenants_by_code),
+        }
 
-    return
+def finalise_snapshot(accountjob, snapshot_id, results, complete=True):
+    """
+    Once every part of a many-file snapshot is in: flag current raw rows no
+    part touched as deleted at source, and delete canonical rows no part had.
+    `results` are process_file's return values (None for failed validation).
+
+    A snapshot is only what arrived within one gather window, so deletions
+    are limited to the tenants its files actually hold data for, and are
+    skipped altogether when:
+    - any part failed validation (incomplete)
+    - a part is a re-queued retry (complete=False): a lone late part is not
+      the whole drop
+    - the job has no tenant mapping, so there is nothing to scope by
+    """
+    def skip(reason):
+        logger.warning(f"Snapshot {snapshot_id} for {accountjob}: {reason} - skipping deletions")
+        return None
+
+    if not results or any(r is None for r in results):
+        return skip("incomplete")
+    if not complete:
+        return skip("includes re-queued parts")
+    if accountjob.tenant_mapping is None:
+        return skip("no tenant mapping to scope deletions by")
+
+    tenant_ids = sorted({tenant_id for r in results for tenant_id in r["tenants"]})
+    if not tenant_ids:
+        return skip("no tenant data")
+
+    rawdatamodel = map_string_model_to_django_model(accountjob.job.source_schema.raw_data_storage_model)
+    flagged_count = (
+        rawdatamodel.objects
+        .filter(is_current=True, tenant__in=tenant_ids)
+        .exclude(last_seen_run_id=snapshot_id)
+        .update(is_deleted_at_source=True)
+    )
+
+    deleted_count = delete_unseen_from_canonical(accountjob, snapshot_id, tenant_ids)
+
+    message = (
+        f"Snapshot {snapshot_id} finalised over {len(results)} file(s) and {len(tenant_ids)} tenant(s): "
+        f"flagged {flagged_count} deleted at source, deleted {deleted_count} canonical rows"
+    )
+    logger.info(message)
+    AccountJobLog.objects.bulk_create(
+        AccountJobLog(ingest_run_id=r["ingest_run"], message=message) for r in results
+    )
+    return {"flagged": flagged_count, "deleted": deleted_count}
 
 
 
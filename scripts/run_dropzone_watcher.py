@@ -1,5 +1,13 @@
+import django
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# the watcher reads per-zone config from the DB
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "palmtree_etl.settings")
+django.setup()
+
 from watcher.dropzone_watcher import start_dropzone_watcher
 
 if __name__ == "__main__":
     start_dropzone_watcher()
-    
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.templatetags.static import static
 from django.http import HttpResponseRedirect
 from django.utils.safestring import mark_safe
@@ -9,12 +9,13 @@ from django.urls import path
 
 from .admin_extra import register_extra_admin_urls
 from .admin_mixins import AccountScopedAdminMixin, AccountScopedInlineMixin
-from .forms import AccountTableDataForm, SFTPDropZoneAdminForm
+from .forms import AccountJobAdminForm, AccountTableDataForm, SFTPDropZoneAdminForm
 from .models import Account, Tenant, UserAccount, Location, AccountEncryption
 from .models import TenantMapping, TenantMappingCode
 from .models import AccountJob, SFTPDropZone, SFTPDropZoneScopedTenant, AccountTableData, AccountJobLog, IngestRun
 
 from .local_kms import generate_encrypted_dek
+from .hierarchy import account_tree_json
 
 from canonical.models import TableData
 from core.admin_mixins import PalmTreeGenericAdminMixin
@@ -164,6 +165,10 @@ class AccountAdmin(
         (None, {
             "fields": ("name", "short")
         }),
+        ("JOB SCHEDULING", {
+            "classes": ("collapse",),
+            "fields": ("max_concurrent_jobs", "celery_queue")
+        }),
         ("ACCOUNT HIERARCHY", {
             "classes": ("collapse",),  # makes this section collapsible
             "fields": ("account_hierarchy",)
@@ -186,8 +191,8 @@ class AccountAdmin(
         if not obj.pk:
             return "Save account to view structure"
 
-        #tree_data = build_account_organisational_tree(obj)
-        tree_json = {}#json.dumps(tree_data)
+        # organisational (operating group) tree, cached per account
+        tree_json = account_tree_json(obj)
 
         return format_html(
             """
@@ -250,37 +255,16 @@ class AccountAdmin(
         extra_context["disable_account_dropdown"] = True
         return super().add_view(request, form_url, extra_context=extra_context)
     
-def build_account_organisational_tree(account):
-    return build_account_tree(account, TenantGroupType.OPERATING)
-
-def build_account_tree(account,  group_type):
-    roots = TenantGroup.objects.filter(
-        account=account,
-        group_type=group_type,
-        parent__isnull=True,
-    )
-    
-    def node_to_dict(node):
-        return {
-            "id": str(node.id),
-            "text": str(node),
-            "children": [
-                node_to_dict(child)
-                for child in node.get_children()
-            ],
-            "icon": "jstree-folder" if node.node_type != "tenant" else "jstree-file",
-        }
-
-    return [node_to_dict(root) for root in roots]
-
 @admin.register(AccountJob)
 class AccountJobAdmin(SortableAdminMixin,
                        AccountScopedAdminMixin,
                        PalmTreeGenericAdminMixin):
     
     list_display = ('account', 'order_number', 'job', 'sftp_drop_zone', 'tenant_mapping')
+    form = AccountJobAdminForm
     list_display_links = ('job',)
     ordering = ('order', )
+    filter_horizontal = ('depends_on',)
 
     # Derived column for account
     def order_number(self, obj):
@@ -311,6 +295,18 @@ class AccountJobAdmin(SortableAdminMixin,
             kwargs["empty_label"] = "Not a tenant-specific feed"
             
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == "depends_on":
+            object_id = request.resolver_match.kwargs.get("object_id")
+            account_id = request.GET.get("account") or request.session.get("account_id")
+            qs = AccountJob.objects.all()
+            if object_id:
+                qs = qs.exclude(pk=object_id)
+                account_id = AccountJob.objects.filter(pk=object_id).values_list("account_id", flat=True).first()
+            kwargs["queryset"] = qs.filter(account_id=account_id) if account_id else qs.none()
+
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
     
 class TenantMappingCodeInline(admin.TabularInline):
     model = TenantMappingCode
@@ -544,7 +540,8 @@ class AccountEncryptionAdmin(
 class AccountJobLogInline(admin.TabularInline):
     model = AccountJobLog
     extra = 0
-    readonly_fields = ('created_datetime', 'message')
+    fields = ('created_datetime', 'stage', 'message')
+    readonly_fields = ('created_datetime', 'stage', 'message')
     can_delete = False
 
 @admin.register(IngestRun)
@@ -556,10 +553,14 @@ class IngestRunAdmin(admin.ModelAdmin):
         'account',
         'accountjob',
         'completed_datetime',
+        'total_wall_seconds',
         'short_result',
         'path_and_filename',
     )
 
+    readonly_fields = ('stage_metrics_table',)
+    exclude = ('stage_metrics',)
+
     list_filter = (
         'account',
         'accountjob',
@@ -589,3 +590,37 @@ class IngestRunAdmin(admin.ModelAdmin):
     def short_result(self, obj):
         return (obj.result_text[:50] + '...') if obj.result_text else ''
     short_result.short_description = "Result"
+
+    def total_wall_seconds(self, obj):
+        return obj.total_wall_seconds
+    total_wall_seconds.short_description = "Wall time (s)"
+
+    def stage_metrics_table(self, obj):
+        if not obj or not obj.stage_metrics:
+            return "-"
+
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>",
+            (
+                (
+                    stage,
+                    f"{metrics.get('wall_seconds', 0):.3f}",
+                    f"{metrics.get('cpu_seconds', 0):.3f}",
+                    "-" if metrics.get("rows_in") is None else metrics["rows_in"],
+                    "-" if metrics.get("rows_out") is None else metrics["rows_out"],
+                    metrics.get("queries", 0),
+                    metrics.get("bytes_read", 0),
+                )
+                for stage, metrics in obj.stage_metrics.items()
+            ),
+        )
+        return format_html(
+            "<table>"
+            "<thead><tr><th>Stage</th><th>Wall (s)</th><th>CPU (s)</th><th>Rows in</th>"
+            "<th>Rows out</th><th>Queries</th><th>Bytes read</th></tr></thead>"
+            "<tbody>{}</tbody>"
+            "</table>",
+            rows,
+        )
+    stage_metrics_table.short_description = "Stage metrics"
@@ -0,0 +1,78 @@
+import logging
+
+from pathlib import Path
+
+from celery import chain, group
+
+from raw_data.parsed_files import spill_path_for
+
+logger = logging.getLogger(__name__)
+
+
+def dependency_levels(jobs):
+    """
+    Group job index entries (see tenants.dispatch) into levels: every job's
+    depends_on (among `jobs`) sits in an earlier level, so the jobs within a
+    level are independent and can run in parallel. The AccountJob admin form
+    only accepts dependencies on jobs that can read the same file, so none
+    is lost to the `jobs` filter. Raises ValueError on a cycle.
+    """
+    by_pk = {job["pk"]: job for job in jobs}
+    remaining = {job["pk"]: set(job["depends_on"]) & by_pk.keys() for job in jobs}
+
+    levels = []
+    while remaining:
+        ready = [pk for pk, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"AccountJob dependency cycle between {sorted(remaining)}")
+
+        levels.append([by_pk[pk] for pk in ready])
+        for pk in ready:
+            del remaining[pk]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def file_dag(file_path, claimed):
+    """
+    Celery canvas for several AccountJobs consuming one ready file:
+
+        parse once → level 1 jobs (parallel) → level 2 jobs → ... → finish
+
+    `claimed` is [(job index entry, lease key), ...]. The finish step moves
+    the file to /processed (if any consumer asks for that) only after every
+    consumer is done. Each consumer releases the shared parse as it finishes
+    (raw_data.parsed_files); the finish step drops anything left.
+    """
+    from .tasks import (
+        finish_shared_file_celery_task,
+        parse_shared_file_celery_task,
+        release_unfinished_leases_celery_task,
+        run_account_job_file_celery_task,
+    )
+
+    file_path = Path(file_path)
+    parsed_path = str(spill_path_for(file_path))
+    jobs = [job for job, key in claimed]
+    keys = {job["pk"]: key for job, key in claimed}
+    queue = jobs[0]["queue"]
+
+    steps = [parse_shared_file_celery_task.si(str(file_path), parsed_path, len(jobs)).set(queue=queue)]
+    for level in dependency_levels(jobs):
+        steps.append(group(
+            run_account_job_file_celery_task.si(
+                job["pk"], str(file_path), keys[job["pk"]], parsed_path=parsed_path
+            ).set(queue=job["queue"])
+            for job in level
+        ))
+    steps.append(finish_shared_file_celery_task.si(
+        str(file_path),
+        parsed_path,
+        any(job["move_on_completion"] for job in jobs),
+    ).set(queue=queue))
+
+    canvas = chain(*steps)
+    # parse or a consumer failed: let the event/sweep offer the file again
+    canvas.link_error(release_unfinished_leases_celery_task.si(list(keys.values()), parsed_path))
+    return canvas
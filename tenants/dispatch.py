@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+
+from pathlib import Path
+
+from django.conf import settings
+
+from core.redis_client import get_redis_client
+from core.versioned_cache import VersionedLoader
+from .dropzones import zone_key
+from .models import AccountJob
+from .utils import zone_folder
+
+logger = logging.getLogger(__name__)
+
+JOB_INDEX_CACHE_NAME = "account_job_index"
+
+LEASE_KEY_PREFIX = "dispatch:lease"
+ATTEMPTS_KEY_PREFIX = "dispatch:attempts"
+SNAPSHOT_GATE_KEY_PREFIX = "dispatch:snapshot"
+
+# A queued/running lease outlives any sane run; a completed one stops files
+# left in /ready (move_source_file_on_completion unticked) being re-run by
+# the reconciliation sweep.
+DISPATCH_LEASE_SECONDS = getattr(settings, "DISPATCH_LEASE_SECONDS", 6 * 60 * 60)
+DISPATCH_DONE_SECONDS = getattr(settings, "DISPATCH_DONE_SECONDS", 30 * 24 * 60 * 60)
+
+# A file version that fails this many runs of a job is moved to /failed
+# instead of being offered again by every sweep
+DISPATCH_MAX_ATTEMPTS = getattr(settings, "DISPATCH_MAX_ATTEMPTS", 3)
+
+# Many-file jobs: files arriving within this window of the first become one
+# snapshot run (a DMS drops its tenant files together)
+DISPATCH_SNAPSHOT_GATHER_SECONDS = getattr(settings, "DISPATCH_SNAPSHOT_GATHER_SECONDS", 60)
+
+# lease states: pending (waiting for a snapshot run) → queued → done, or
+# failed once DISPATCH_MAX_ATTEMPTS runs have failed; claim takes a file that
+# is unleased or pending
+CLAIM_LEASE_SCRIPT = """
+local state = redis.call('GET', KEYS[1])
+if state == false or state == 'pending' then
+    redis.call('SET', KEYS[1], 'queued', 'EX', ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+#####################
+# (zone, prefix) index
+#####################
+def load_job_index():
+    """
+    zone key -> {"ready_folder": path, "jobs": [{"prefix", "pk", "queue", "many_files",
+    "move_on_completion", "depends_on"}, ...]} for automated jobs, in
+    account/order sequence.
+    """
+    index = {}
+    accountjobs = (
+        AccountJob.objects
+        .filter(auto_or_manual="auto", sftp_drop_zone__isnull=False, sftp_drop_zone__folder_path__isnull=False)
+        .select_related("account", "sftp_drop_zone", "job", "job__source_schema")
+        .prefetch_related("depends_on")
+        .order_by("account", "order")
+    )
+    for accountjob in accountjobs:
+        ready_folder = Path(zone_folder(accountjob.sftp_drop_zone, "ready"))
+        entry = index.setdefault(zone_key(ready_folder.parent), {"ready_folder": ready_folder, "jobs": []})
+        entry["jobs"].append({
+            "prefix": accountjob.job.source_schema.filename_prefix,
+            "pk": accountjob.pk,
+            "queue": accountjob.account.celery_queue,
+            "many_files": accountjob.job.one_or_many_source_files,
+            "move_on_completion": accountjob.move_source_file_on_completion,
+            "depends_on": [dependency.pk for dependency in accountjob.depends_on.all()],
+        })
+    return index
+
+
+# refreshed when an Account, AccountJob, Job or SourceSchema is saved or deleted
+job_index = VersionedLoader(JOB_INDEX_CACHE_NAME, load_job_index)
+
+
+def accountjobs_for_file(file_path):
+    """
+    Index entries of the automated AccountJobs interested in a file in a
+    ready folder.
+    """
+    file_path = Path(file_path)
+    entry = job_index.get().get(zone_key(file_path.parent.parent))
+    if entry is None:
+        return []
+    return [job for job in entry["jobs"] if file_path.name.startswith(job["prefix"])]
+
+
+########
+# leases
+########
+def lease_key(accountjob_pk, file_path, st):
+    """
+    One lease per job per version of a file: a re-upload with the same name
+    has a new mtime/size and is dispatched again.
+    """
+    path_hash = hashlib.sha1(str(file_path).encode()).hexdigest()
+    return f"{LEASE_KEY_PREFIX}:{accountjob_pk}:{path_hash}:{st.st_mtime_ns}:{st.st_size}"
+
+def acquire_lease(key, state="queued"):
+    return bool(get_redis_client().set(key, state, nx=True, ex=DISPATCH_LEASE_SECONDS))
+
+def claim_lease(key):
+    """
+    Fan-out: take a file that no run has queued yet (unleased, or pending a
+    snapshot run).
+    """
+    return bool(get_redis_client().eval(CLAIM_LEASE_SCRIPT, 1, key, DISPATCH_LEASE_SECONDS))
+
+def claim_files(accountjob_pk, file_paths):
+    """
+    (path, lease key) for each file this job should process now; files
+    already queued or done for this job are left out.
+    """
+    claimed = []
+    for file_path in file_paths:
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            continue
+        key = lease_key(accountjob_pk, file_path, st)
+        if claim_lease(key):
+            claimed.append((file_path, key))
+    return claimed
+
+def complete_lease(key):
+    get_redis_client().set(key, "done", ex=DISPATCH_DONE_SECONDS)
+
+def release_lease(key):
+    """
+    Failed or never queued: let the next event or sweep dispatch it again.
+    """
+    get_redis_client().delete(key)
+
+def fail_lease(key):
+    """
+    Gave up on this file version for this job: never dispatch it again.
+    """
+    get_redis_client().set(key, "failed", ex=DISPATCH_DONE_SECONDS)
+
+def attempts_key(key):
+    return ATTEMPTS_KEY_PREFIX + key[len(LEASE_KEY_PREFIX):]
+
+def record_failed_attempt(key):
+    """
+    Count a failed run of a lease's file version; returns the count so far.
+    """
+    client = get_redis_client()
+    pipe = client.pipeline()
+    pipe.incr(attempts_key(key))
+    pipe.expire(attempts_key(key), DISPATCH_DONE_SECONDS)
+    attempts, _ = pipe.execute()
+    return attempts
+
+def failed_attempts(key):
+    return int(get_redis_client().get(attempts_key(key)) or 0)
+
+def release_unfinished_leases(keys):
+    client = get_redis_client()
+    for key in keys:
+        if client.get(key) == b"queued":
+            client.delete(key)
+
+
+##########
+# dispatch
+##########
+def dispatch_file(file_path):
+    """
+    Enqueue each interested AccountJob for a ready file, exactly once per
+    file version. Several one-file jobs consuming the same file run as a
+    dependency DAG sharing one parse (tenants.dag). Many-file jobs schedule
+    one snapshot run per gather window instead, which picks up every file
+    waiting at that point. Returns the number of runs queued.
+    """
+    from .dag import file_dag
+    from .tasks import run_account_job_celery_task, run_account_job_file_celery_task
+
+    file_path = Path(file_path)
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return 0
+
+    queued = 0
+    claimed = []
+    for job in accountjobs_for_file(file_path):
+        key = lease_key(job["pk"], file_path, st)
+
+        if not job["many_files"]:
+            if acquire_lease(key):
+                claimed.append((job, key))
+            continue
+
+        # a file still pending once its gather window has closed arrived
+        # after that snapshot run listed the folder: the reconcile sweep
+        # finds it here and schedules another run for it
+        if not acquire_lease(key, state="pending") and get_redis_client().get(key) != b"pending":
+            continue
+        gate_key = f"{SNAPSHOT_GATE_KEY_PREFIX}:{job['pk']}"
+        if not get_redis_client().set(gate_key, 1, nx=True, ex=DISPATCH_SNAPSHOT_GATHER_SECONDS):
+            # a snapshot run is already gathering
+            continue
+        try:
+            run_account_job_celery_task.apply_async(
+                args=(job["pk"],), queue=job["queue"], countdown=DISPATCH_SNAPSHOT_GATHER_SECONDS
+            )
+        except Exception:
+            release_lease(key)
+            raise
+        logger.info(f"QUEUE SNAPSHOT JOB {job['pk']} | file={file_path.name}")
+        queued += 1
+
+    if not claimed:
+        return queued
+
+    try:
+        if len(claimed) == 1:
+            job, key = claimed[0]
+            # per-account queue, so a big account's backlog can't starve the rest
+            run_account_job_file_celery_task.apply_async(
+                args=(job["pk"], str(file_path), key), queue=job["queue"]
+            )
+        else:
+            file_dag(file_path, claimed).apply_async()
+    except Exception:
+        for job, key in claimed:
+            release_lease(key)
+        raise
+
+    logger.info(f"QUEUE JOBS {[job['pk'] for job, key in claimed]} | file={file_path.name}")
+    return queued + len(claimed)
+
+def on_file_ready(sender, path, **kwargs):
+    dispatch_file(path)
+
+def reconcile_ready_folders():
+    """
+    Safety net for missed events (dispatcher down, broker blip, files copied
+    straight into /ready, a many-file job's file landing after its snapshot
+    run listed the folder): offer every ready file to dispatch_file, whose
+    leases make this a no-op for anything already queued or done.
+    """
+    queued = 0
+    for entry in job_index.get().values():
+        try:
+            with os.scandir(entry["ready_folder"]) as entries:
+                file_paths = [Path(e.path) for e in entries if e.is_file()]
+        except FileNotFoundError:
+            continue
+
+        for file_path in sorted(file_paths):
+            try:
+                queued += dispatch_file(file_path)
+            except Exception:
+                logger.exception(f"Failed to dispatch: {file_path}")
+    return queued
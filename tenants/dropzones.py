@@ -0,0 +1,104 @@
+import errno
+import logging
+import os
+import shutil
+
+from pathlib import Path
+
+from django.dispatch import Signal
+
+from core.versioned_cache import VersionedLoader
+from .models import SFTPDropZone
+
+logger = logging.getLogger(__name__)
+
+ZONE_CONFIG_CACHE_NAME = "sftp_drop_zones"
+
+READY_FOLDER_NAME = "ready"
+
+# Sent with `path` once a file lands in a ready folder
+file_ready = Signal()
+
+
+def dropzone_channel(sftp_drop_zone_id):
+    """
+    core.events channel for a zone's file and ingest run events.
+    """
+    return f"dropzone:{sftp_drop_zone_id}"
+
+
+def zone_key(zone_dir):
+    """
+    (account short, zone folder) for a zone directory, e.g.
+    /srv/sftp_drops/stellant/dms002 -> ("stellant", "dms002").
+    Matches the last two folders before /drop in SFTPDropZone.folder_path.
+    """
+    zone_dir = Path(zone_dir)
+    return (zone_dir.parent.name.lower(), zone_dir.name.lower())
+
+
+def load_zone_configs():
+    configs = {}
+    for sftp_drop_zone in SFTPDropZone.objects.filter(deleted=False).exclude(folder_path__isnull=True):
+        drop_folder = Path(sftp_drop_zone.folder_path)
+        configs[zone_key(drop_folder.parent)] = {
+            "pk": sftp_drop_zone.pk,
+            "account_id": sftp_drop_zone.account_id,
+            "zone_folder": sftp_drop_zone.zone_folder,
+            "wait_time_before_ready_to_move": sftp_drop_zone.wait_time_before_ready_to_move,
+            "retention_period_days": sftp_drop_zone.retention_period_days,
+        }
+    return configs
+
+
+# zone key -> config, refreshed when any SFTPDropZone is saved or deleted
+zone_configs = VersionedLoader(ZONE_CONFIG_CACHE_NAME, load_zone_configs)
+
+
+def get_zone_config(file_path):
+    """
+    Config for the drop zone a drop/ready/processed file belongs to, or None.
+    """
+    return zone_configs.get().get(zone_key(Path(file_path).parent.parent))
+
+
+def stable_seconds_for(file_path, default):
+    config = get_zone_config(file_path)
+    if config is None:
+        return default
+    return config["wait_time_before_ready_to_move"]
+
+
+def promote_to_ready(file_path):
+    """
+    Move file from drop → ready folder.
+
+    drop and ready live on the same filesystem, so this is an atomic rename:
+    no data is copied however large the file, and the file never appears
+    half-written in /ready. Returns the new path, or None if the file had
+    already gone (the watcher and the sweep both promoting it).
+    """
+    file_path = Path(file_path)
+    ready_folder = file_path.parent.parent / READY_FOLDER_NAME
+    ready_folder.mkdir(exist_ok=True)
+
+    destination = ready_folder / file_path.name
+    try:
+        try:
+            os.replace(file_path, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # different filesystems (unusual dev setups) - fall back to copy + unlink
+            shutil.move(str(file_path), str(destination))
+    except FileNotFoundError:
+        logger.info(f"ALREADY MOVED: {file_path}")
+        return None
+
+    logger.info(f"MOVED: {file_path} → {destination}")
+
+    for receiver, response in file_ready.send_robust(sender=None, path=destination):
+        if isinstance(response, Exception):
+            # the reconciliation sweep picks the file up later
+            logger.error(f"file_ready receiver {receiver} failed for {destination}: {response!r}")
+    return destination
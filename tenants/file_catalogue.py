@@ -0,0 +1,150 @@
+import logging
+import os
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.events import publish_event
+
+from .dropzones import dropzone_channel, get_zone_config
+from .models import DropZoneFile, SFTPDropZone
+from .utils import zone_folder
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FOLDERS = [folder for folder, label in DropZoneFile.FOLDER_CHOICES]
+
+# Removed files are kept as soft-deleted rows this long, so pollers can see
+# the removal; a cursor older than this gets a full reload
+CATALOGUE_TOMBSTONE_DAYS = getattr(settings, "DROPZONE_CATALOGUE_TOMBSTONE_DAYS", 2)
+
+
+def file_modified(st):
+    return datetime.fromtimestamp(st.st_mtime, tz=dt_timezone.utc)
+
+def catalogue_entry(file_path):
+    """
+    (sftp_drop_zone pk, folder, name) for a file in a configured zone's
+    drop/ready/processed/failed folder, or None.
+    """
+    file_path = Path(file_path)
+    if file_path.parent.name not in CATALOGUE_FOLDERS:
+        return None
+    config = get_zone_config(file_path)
+    if config is None:
+        return None
+    return config["pk"], file_path.parent.name, file_path.name
+
+
+#########################################
+# event updates (watcher)
+#########################################
+def record_file(file_path):
+    entry = catalogue_entry(file_path)
+    if entry is None:
+        return
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        record_removed(file_path)
+        return
+
+    sftp_drop_zone_id, folder, name = entry
+    DropZoneFile.objects.update_or_create(
+        sftp_drop_zone_id=sftp_drop_zone_id,
+        folder=folder,
+        name=name,
+        defaults={"size": st.st_size, "modified": file_modified(st), "deleted": False},
+    )
+    publish_event(dropzone_channel(sftp_drop_zone_id), "file", {
+        "folder": folder, "name": name, "size": st.st_size, "deleted": False,
+    })
+
+def record_removed(file_path):
+    entry = catalogue_entry(file_path)
+    if entry is None:
+        return
+
+    sftp_drop_zone_id, folder, name = entry
+    # update() skips auto_now, so move the cursor explicitly
+    removed = DropZoneFile.objects.filter(
+        sftp_drop_zone_id=sftp_drop_zone_id, folder=folder, name=name, deleted=False
+    ).update(deleted=True, updated_at=timezone.now())
+    if removed:
+        publish_event(dropzone_channel(sftp_drop_zone_id), "file", {
+            "folder": folder, "name": name, "deleted": True,
+        })
+
+def record_move(source_path, destination_path):
+    record_removed(source_path)
+    record_file(destination_path)
+
+
+#########################################
+# reconciliation sweep
+#########################################
+def sync_zone_catalogue(sftp_drop_zone):
+    """
+    Bring a zone's catalogue in line with the disk (missed events, files
+    still being written when first seen, retention clean-up). One scandir
+    per folder, one read of the catalogue, bulk writes for the differences.
+    """
+    zone_dir = Path(zone_folder(sftp_drop_zone, "drop")).parent
+
+    on_disk = {}
+    for folder in CATALOGUE_FOLDERS:
+        try:
+            with os.scandir(zone_dir / folder) as entries:
+                for e in entries:
+                    if e.is_file():
+                        st = e.stat()
+                        on_disk[(folder, e.name)] = (st.st_size, file_modified(st))
+        except FileNotFoundError:
+            continue
+
+    catalogued = {(f.folder, f.name): f for f in DropZoneFile.objects.filter(sftp_drop_zone=sftp_drop_zone)}
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for key, (size, modified) in on_disk.items():
+        f = catalogued.get(key)
+        if f is None:
+            to_create.append(DropZoneFile(
+                sftp_drop_zone=sftp_drop_zone, folder=key[0], name=key[1], size=size, modified=modified
+            ))
+        elif f.deleted or f.size != size or f.modified != modified:
+            f.size, f.modified, f.deleted, f.updated_at = size, modified, False, now
+            to_update.append(f)
+
+    for key, f in catalogued.items():
+        if key not in on_disk and not f.deleted:
+            f.deleted, f.updated_at = True, now
+            to_update.append(f)
+
+    DropZoneFile.objects.bulk_create(to_create, batch_size=1000)
+    DropZoneFile.objects.bulk_update(to_update, ["size", "modified", "deleted", "updated_at"], batch_size=1000)
+
+    # tombstones nobody polling can still need
+    DropZoneFile.objects.filter(
+        sftp_drop_zone=sftp_drop_zone,
+        deleted=True,
+        updated_at__lt=now - timedelta(days=CATALOGUE_TOMBSTONE_DAYS),
+    ).delete()
+
+    changed = len(to_create) + len(to_update)
+    if changed:
+        publish_event(dropzone_channel(sftp_drop_zone.pk), "files", {"changed": changed})
+    return changed
+
+def sync_catalogues():
+    changed = 0
+    for sftp_drop_zone in SFTPDropZone.objects.filter(deleted=False).exclude(folder_path__isnull=True):
+        try:
+            changed += sync_zone_catalogue(sftp_drop_zone)
+        except Exception:
+            logger.exception(f"Failed to sync file catalogue for: {sftp_drop_zone}")
+    return changed
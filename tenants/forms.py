@@ -1,6 +1,6 @@
 # tenants/forms.py
 from django import forms
-from .models import Tenant, AccountTableData, SFTPDropZone
+from .models import Tenant, AccountTableData, SFTPDropZone, AccountJob
 from canonical.widgets import PalmtreeExcelWidget #move to central
 from django.conf import settings
 
@@ -40,3 +40,34 @@ class SFTPDropZoneAdminForm(forms.ModelForm):
         if not is_staging:
             self.fields.pop("test_sftp_user", None)
             self.fields.pop("test_sftp_password", None)
+
+class AccountJobAdminForm(forms.ModelForm):
+
+    class Meta:
+        model = AccountJob
+        fields = "__all__"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        job = cleaned_data.get("job")
+        if job is None:
+            return cleaned_data
+
+        # depends_on only orders jobs reading the same file: anything else
+        # would be silently ignored by the scheduler
+        zone = cleaned_data.get("sftp_drop_zone")
+        zone_id = zone.pk if zone else None
+        prefix = job.source_schema.filename_prefix
+
+        depends_on = cleaned_data.get("depends_on") or AccountJob.objects.none()
+        others = list(depends_on.select_related("job__source_schema"))
+        if self.instance.pk:
+            others += self.instance.dependents.select_related("job__source_schema")
+
+        unshared = [str(other) for other in others if not AccountJob.can_share_file(zone_id, prefix, other)]
+        if unshared:
+            raise forms.ValidationError(
+                "Dependencies must read the same file from the same sFTP drop zone: %(jobs)s",
+                params={"jobs": ", ".join(unshared)},
+            )
+        return cleaned_data
@@ -0,0 +1,86 @@
+import json
+
+from django.apps import apps
+from django.core.cache import cache
+
+from .models import Tenant, TenantGroupType
+
+ACCOUNT_TREE_KEY_PREFIX = "account_tree:"
+# Backstop only: tenants.signals deletes the entry on Account/Tenant (and
+# TenantGroup, with sandbox) changes
+# (mptt's rebuild()/bulk moves don't send signals)
+ACCOUNT_TREE_TTL_SECONDS = 24 * 60 * 60
+
+# as django.utils.html.json_script: safe to embed in a <script> block
+JSON_SCRIPT_ESCAPES = {ord(">"): "\\u003E", ord("<"): "\\u003C", ord("&"): "\\u0026"}
+
+
+def account_tree_key(account_id, group_type):
+    return f"{ACCOUNT_TREE_KEY_PREFIX}{account_id}:{group_type}"
+
+def invalidate_account_trees(account_id):
+    cache.delete_many([account_tree_key(account_id, group_type) for group_type in TenantGroupType.values])
+
+def build_account_tree(account, group_type):
+    """
+    jsTree data for an account's TenantGroup trees of one group type, from a
+    single query: get_cached_trees() links every node to its children, so
+    get_children() below doesn't query.
+
+    Without the sandbox app there are no groups: the account and its tenants.
+    """
+    if not apps.is_installed("sandbox"):
+        return build_account_tenant_list(account)
+
+    from sandbox.models import TenantGroup
+
+    nodes = (
+        TenantGroup.objects
+        .filter(account=account, group_type=group_type)
+        .select_related("tenant__account")
+        .order_by("tree_id", "lft")
+    )
+
+    def node_to_dict(node):
+        return {
+            "id": str(node.id),
+            "text": str(node),
+            "children": [
+                node_to_dict(child)
+                for child in node.get_children()
+            ],
+            "icon": "jstree-folder" if node.node_type != "tenant" else "jstree-file",
+        }
+
+    return [node_to_dict(root) for root in nodes.get_cached_trees()]
+
+def build_account_tenant_list(account):
+    tenants = Tenant.objects.filter(account=account).order_by("internal_tenant_code")
+    return [{
+        "id": f"account-{account.pk}",
+        "text": str(account),
+        "state": {"opened": True},
+        "children": [
+            {
+                "id": str(tenant.pk),
+                # (Tenant.__str__ would load the account per tenant)
+                "text": f"{tenant.desc} ({tenant.internal_tenant_code})",
+                "children": [],
+                "icon": "jstree-file",
+            }
+            for tenant in tenants
+        ],
+        "icon": "jstree-folder",
+    }]
+
+def account_tree_json(account, group_type=TenantGroupType.OPERATING):
+    """
+    build_account_tree serialised once per account and group type, cached
+    until the account's groups or tenants change.
+    """
+    key = account_tree_key(account.pk, group_type)
+    tree_json = cache.get(key)
+    if tree_json is None:
+        tree_json = json.dumps(build_account_tree(account, group_type)).translate(JSON_SCRIPT_ESCAPES)
+        cache.set(key, tree_json, ACCOUNT_TREE_TTL_SECONDS)
+    return tree_json
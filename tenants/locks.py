@@ -0,0 +1,80 @@
+import hashlib
+import logging
+
+from contextlib import contextmanager, ExitStack
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class LockNotAcquired(Exception):
+    pass
+
+
+def advisory_lock_id(name):
+    """
+    Stable signed 64-bit key for pg_try_advisory_lock from a readable name.
+    """
+    digest = hashlib.sha1(name.encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+def try_advisory_lock(name, shared=False):
+    fn = "pg_try_advisory_lock_shared" if shared else "pg_try_advisory_lock"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {fn}(%s)", [advisory_lock_id(name)])
+        return cursor.fetchone()[0]
+
+def advisory_unlock(name, shared=False):
+    fn = "pg_advisory_unlock_shared" if shared else "pg_advisory_unlock"
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {fn}(%s)", [advisory_lock_id(name)])
+
+
+@contextmanager
+def advisory_lock(name, shared=False):
+    """
+    Session-level Postgres advisory lock, held across the transactions inside
+    the block. Raises LockNotAcquired instead of waiting. Postgres drops the
+    lock if the worker dies, so a crashed run never leaves it stuck.
+    Shared holders run together but exclude an exclusive holder.
+    """
+    if not try_advisory_lock(name, shared):
+        raise LockNotAcquired(name)
+    try:
+        yield
+    finally:
+        advisory_unlock(name, shared)
+
+@contextmanager
+def account_slot(account):
+    """
+    One of the account's max_concurrent_jobs run slots (each slot is its own
+    advisory lock), so one account can't occupy every worker.
+    """
+    for slot in range(max(account.max_concurrent_jobs, 1)):
+        name = f"account:{account.pk}:slot:{slot}"
+        if try_advisory_lock(name):
+            break
+    else:
+        raise LockNotAcquired(f"account:{account.pk}: all {account.max_concurrent_jobs} slots busy")
+
+    try:
+        yield
+    finally:
+        advisory_unlock(name)
+
+@contextmanager
+def account_job_run_lock(accountjob, shared=False):
+    """
+    Held for the whole of run_account_job: at most one run per AccountJob and
+    drop zone, within the account's concurrency limit. The file parts of a
+    many-file snapshot hold it shared, so they fan out across workers while
+    excluding any other run (and the snapshot's finaliser) of the same job.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(
+            advisory_lock(f"accountjob:{accountjob.pk}:zone:{accountjob.sftp_drop_zone_id}", shared)
+        )
+        stack.enter_context(account_slot(accountjob.account))
+        yield
@@ -2,6 +2,7 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from .utils import resolve_user_tenant, NoTenantError, MultipleTenantsError
 from .models import Tenant
+from .tenant_cache import tenant_cache
 
 class TenantResolutionMiddleware:
     def __init__(self, get_response):
@@ -27,9 +28,8 @@ class TenantResolutionMiddleware:
                         return redirect("tenants:no_tenant")
             else:
                 # If tenant_id in session, set request.current_tenant for convenience
-                from .models import Tenant
                 try:
-                    request.current_tenant = Tenant.objects.get(pk=tenant_id)
+                    request.current_tenant = tenant_cache.by_rls_key(tenant_id)
                 except Tenant.DoesNotExist:
                     # If tenant was deleted, clear session and redirect
                     del request.session["tenant_id"]
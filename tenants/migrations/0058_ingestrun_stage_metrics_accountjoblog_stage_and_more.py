@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0057_ingestrun_accountjoblog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestrun",
+            name="stage_metrics",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Per-stage wall time, CPU time, rows in/out, query count and bytes read",
+            ),
+        ),
+        migrations.AddField(
+            model_name="accountjoblog",
+            name="stage",
+            field=models.CharField(blank=True, default="", max_length=30),
+        ),
+        migrations.AddField(
+            model_name="accountjoblog",
+            name="metrics",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0058_ingestrun_stage_metrics_accountjoblog_stage_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="max_concurrent_jobs",
+            field=models.PositiveIntegerField(
+                default=2,
+                help_text="Maximum number of this account's jobs running at the same time",
+            ),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="celery_queue",
+            field=models.CharField(
+                default="celery",
+                help_text="Celery queue for this account's jobs (give large accounts their own queue and workers)",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0059_account_max_concurrent_jobs_account_celery_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accountjob",
+            name="depends_on",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Jobs that must finish with a file before this job starts on it (e.g. customers before customer-vehicle links)",
+                related_name="dependents",
+                to="tenants.accountjob",
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.27 on 2026-10-19 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0060_accountjob_depends_on"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DropZoneFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("deleted", models.BooleanField(default=False)),
+                (
+                    "folder",
+                    models.CharField(
+                        choices=[
+                            ("drop", "Drop"),
+                            ("ready", "Ready"),
+                            ("processed", "Processed"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("size", models.BigIntegerField(default=0)),
+                ("modified", models.DateTimeField()),
+                (
+                    "sftp_drop_zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="files",
+                        to="tenants.sftpdropzone",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("sftp_drop_zone", "folder", "name")},
+                "indexes": [
+                    models.Index(
+                        fields=["sftp_drop_zone", "updated_at", "id"],
+                        name="dropzonefile_zone_cursor_idx",
+                    )
+                ],
+            },
+        ),
+    ]
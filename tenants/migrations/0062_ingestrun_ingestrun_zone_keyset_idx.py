@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0061_dropzonefile"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ingestrun",
+            index=models.Index(
+                fields=["sftp_drop_zone", "completed_datetime", "id"],
+                name="ingestrun_zone_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.27 on 2026-10-19 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0062_ingestrun_ingestrun_zone_keyset_idx"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="accountjoblog",
+            options={"ordering": ["created_datetime", "id"]},
+        ),
+    ]
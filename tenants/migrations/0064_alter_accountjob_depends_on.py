@@ -0,0 +1,22 @@
+# Generated by Django 4.2.27 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tenants", "0063_alter_accountjoblog_options"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="accountjob",
+            name="depends_on",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Jobs that must finish with a file before this job starts on it (only jobs reading the same file from the same drop zone)",
+                related_name="dependents",
+                to="tenants.accountjob",
+            ),
+        ),
+    ]
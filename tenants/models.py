@@ -11,6 +11,15 @@ from core.models import SHORT_LEN
 class Account(CoreModel, FixtureControlledModel):
     name = models.CharField(max_length=255)
     short = models.CharField(max_length=SHORT_LEN, blank=True) #remove blank=True, 
+    max_concurrent_jobs = models.PositiveIntegerField(
+        default=2,
+        help_text="Maximum number of this account's jobs running at the same time"
+    )
+    celery_queue = models.CharField(
+        max_length=50,
+        default="celery",
+        help_text="Celery queue for this account's jobs (give large accounts their own queue and workers)"
+    )
     
     def save(self, *args, **kwargs):
         if self.short:
@@ -204,6 +213,35 @@ class SFTPDropZone(CoreModel, FixtureControlledModel):
     def __str__(self):
         return self.zone_folder
     
+class DropZoneFile(CoreModel):
+    """
+    Catalogue of the files in a drop zone's folders, kept up to date by the
+    watcher and a periodic sweep (tenants.file_catalogue) so the dashboard
+    never walks the disk. Removed files are soft deleted, so pollers using
+    an updated_at cursor see removals too.
+    """
+    FOLDER_CHOICES = [
+        ("drop", "Drop"),
+        ("ready", "Ready"),
+        ("processed", "Processed"),
+        ("failed", "Failed"),
+    ]
+
+    sftp_drop_zone = models.ForeignKey(SFTPDropZone, on_delete=models.CASCADE, related_name="files")
+    folder = models.CharField(max_length=10, choices=FOLDER_CHOICES)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    modified = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("sftp_drop_zone", "folder", "name")
+        indexes = [
+            models.Index(fields=["sftp_drop_zone", "updated_at", "id"], name="dropzonefile_zone_cursor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.sftp_drop_zone} / {self.folder} / {self.name}"
+
 class SFTPDropZoneScopedTenant(CoreModel, FixtureControlledModel):
     sftp_drop_zone = models.ForeignKey(SFTPDropZone, on_delete=models.CASCADE)
     scoped_tenant = models.ForeignKey(
@@ -259,6 +297,13 @@ class AccountJob(CoreModel, FixtureControlledModel):
         help_text="Move the source file from /ready to /processed folder? (If it required by another job then leave unticked)"
     )
     order = models.PositiveIntegerField(default=0, db_index=True)
+    depends_on = models.ManyToManyField(
+        "self",
+        symmetrical=False,
+        blank=True,
+        related_name="dependents",
+        help_text="Jobs that must finish with a file before this job starts on it (only jobs reading the same file from the same drop zone)"
+    )
 
     class Meta:
         ordering = ['order']
@@ -266,6 +311,20 @@ class AccountJob(CoreModel, FixtureControlledModel):
     def __str__(self):
         return f"{self.job}"
 
+    @staticmethod
+    def can_share_file(zone_id, prefix, other):
+        """
+        Could a file in drop zone `zone_id` matching `prefix` also be picked
+        up by `other`? Only then is a dependency between the two scheduled
+        (see tenants.dag.dependency_levels).
+        """
+        other_prefix = other.job.source_schema.filename_prefix
+        return (
+            zone_id is not None
+            and zone_id == other.sftp_drop_zone_id
+            and (prefix.startswith(other_prefix) or other_prefix.startswith(prefix))
+        )
+
 class IngestRun(CoreModel):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
     accountjob = models.ForeignKey(AccountJob, on_delete=models.CASCADE)
@@ -273,20 +332,36 @@ class IngestRun(CoreModel):
     completed_datetime = models.DateTimeField(auto_now_add=True)
     result_text = models.TextField(max_length=1000, blank=True, null=True)
     path_and_filename = models.CharField(max_length=255)
+    stage_metrics = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Per-stage wall time, CPU time, rows in/out, query count and bytes read"
+    )
 
     class Meta:
         ordering = ['completed_datetime']
+        indexes = [
+            # keyset pagination of a zone's runs (processor_logs_for_sftpdropzone_api)
+            models.Index(fields=["sftp_drop_zone", "completed_datetime", "id"], name="ingestrun_zone_keyset_idx"),
+        ]
 
     def __str__(self):
         return f"{self.accountjob} / {self.completed_datetime}"
+
+    @property
+    def total_wall_seconds(self):
+        return round(sum(m.get("wall_seconds", 0) for m in (self.stage_metrics or {}).values()), 3)
     
 class AccountJobLog(CoreModel):    
     ingest_run = models.ForeignKey(IngestRun, null=True, on_delete=models.SET_NULL)
     message = models.TextField(max_length=1000, blank=True, null=True)
+    stage = models.CharField(max_length=30, blank=True, default="")
+    metrics = models.JSONField(null=True, blank=True)
     created_datetime = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['created_datetime']
+        # a buffered flush gives its rows one timestamp; id keeps them in order
+        ordering = ['created_datetime', 'id']
 
     def __str__(self):
         return f"{self.ingest_run} / {self.created_datetime}"
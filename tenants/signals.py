@@ -1,7 +1,16 @@
 from django.contrib.auth.signals import user_logged_in
 from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.apps import apps
 from django.dispatch import receiver
-from tenants.models import UserAccount, Account
+from canonical.models import Job, SourceSchema
+from core.versioned_cache import bump_version
+from tenants.dispatch import JOB_INDEX_CACHE_NAME, on_file_ready
+from tenants.dropzones import ZONE_CONFIG_CACHE_NAME, file_ready
+from tenants.models import UserAccount, Account, AccountJob, SFTPDropZone, Tenant
+from tenants.tenant_cache import TENANT_CACHE_NAME, tenant_cache
+from tenants.utils import invalidate_user_tenants
+from tenants.hierarchy import invalidate_account_trees
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib.admin.views.decorators import staff_member_required
 
@@ -16,3 +25,72 @@ def set_current_account(request, account_id):
     print ("🆔 tenant.signals session['account'] is now: "+str(account_id))
 
     return redirect(request.META.get("HTTP_REFERER", "/"))
+
+
+@receiver(post_save, sender=SFTPDropZone)
+@receiver(post_delete, sender=SFTPDropZone)
+def invalidate_zone_configs(sender, **kwargs):
+    # watcher and celery workers reload their zone → config map
+    bump_version(ZONE_CONFIG_CACHE_NAME)
+    bump_version(JOB_INDEX_CACHE_NAME)
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=AccountJob)
+@receiver(post_delete, sender=AccountJob)
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+@receiver(post_save, sender=SourceSchema)
+@receiver(post_delete, sender=SourceSchema)
+@receiver(m2m_changed, sender=AccountJob.depends_on.through)
+def invalidate_job_index(sender, **kwargs):
+    # (zone, filename prefix) → AccountJob index used by the dispatcher
+    bump_version(JOB_INDEX_CACHE_NAME)
+
+@receiver(pre_save, sender=Tenant)
+def remember_tenant_account(sender, instance, **kwargs):
+    # a tenant moving account changes the old account's lists too
+    instance._previous_account_id = (
+        Tenant.objects.filter(pk=instance.pk).values_list("account_id", flat=True).first()
+        if not instance._state.adding else None
+    )
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, **kwargs):
+    # this process straight away, other processes on their next version check
+    tenant_cache.clear()
+    bump_version(TENANT_CACHE_NAME)
+
+    # users of the account(s) see a different tenant list
+    tenant = kwargs["instance"]
+    account_ids = {tenant.account_id, getattr(tenant, "_previous_account_id", None)} - {None}
+    if account_ids:
+        invalidate_user_tenants(
+            UserAccount.objects.filter(account_id__in=account_ids).values_list("user_id", flat=True)
+        )
+        # tenant nodes are labelled with the tenant
+        for account_id in account_ids:
+            invalidate_account_trees(account_id)
+
+@receiver(post_save, sender=Account)
+def invalidate_account_tree_root(sender, instance, **kwargs):
+    # the tree's root is labelled with the account
+    invalidate_account_trees(instance.pk)
+
+@receiver(post_save, sender=UserAccount)
+@receiver(post_delete, sender=UserAccount)
+def invalidate_user_tenant_list(sender, instance, **kwargs):
+    invalidate_user_tenants([instance.user_id])
+
+def invalidate_account_tree(sender, instance, **kwargs):
+    invalidate_account_trees(instance.account_id)
+
+if apps.is_installed("sandbox"):
+    from sandbox.models import TenantGroup
+
+    post_save.connect(invalidate_account_tree, sender=TenantGroup, dispatch_uid="tenants.invalidate_account_tree")
+    post_delete.connect(invalidate_account_tree, sender=TenantGroup, dispatch_uid="tenants.invalidate_account_tree")
+
+# promotion (watcher or scan_dropzones) → enqueue interested AccountJobs
+file_ready.connect(on_file_ready, dispatch_uid="tenants.dispatch.on_file_ready")
@@ -3,13 +3,29 @@ import os
 import socket
 import threading
 import time
-import shutil
 
 from datetime import datetime
 from pathlib import Path
 
-from celery import shared_task
-from tenants.models import AccountJob
+from celery import chain, chord, shared_task
+from raw_data.parsed_files import evict_stale_parsed_files, remove_parsed_file, spill_parsed_file
+from tenants.dispatch import (
+    DISPATCH_MAX_ATTEMPTS,
+    accountjobs_for_file,
+    claim_files,
+    complete_lease,
+    fail_lease,
+    failed_attempts,
+    job_index,
+    reconcile_ready_folders,
+    record_failed_attempt,
+    release_lease,
+    release_unfinished_leases,
+)
+from tenants.dropzones import promote_to_ready, stable_seconds_for
+from tenants.file_catalogue import sync_catalogues
+from tenants.locks import LockNotAcquired, account_job_run_lock
+from tenants.models import AccountJob, AccountJobLog, IngestRun
 from tenants.utils import ensure_local_ready_folder
 
 logger = logging.getLogger(__name__)
@@ -34,9 +50,14 @@ def debug_context(prefix=""):
 # =====================================================
 
 BASE_FOLDER = Path("/srv/sftp_drops")
-READY_FOLDER_NAME = "ready"
+
+# Only used for drop folders with no SFTPDropZone row
 CHECK_STABLE_SECONDS = 5
 
+# A job whose run lock is busy is retried after this many seconds
+LOCK_RETRY_SECONDS = 30
+LOCK_MAX_RETRIES = 120
+
 
 # =====================================================
 # STAGE 1: DROP → READY
@@ -44,28 +65,16 @@ CHECK_STABLE_SECONDS = 5
 
 def is_stable(file_path: Path) -> bool:
     """
-    Simple stability check (no threads, no watchdog).
+    Non-blocking stability check (no threads, no watchdog, no sleep):
+    a file is stable once it hasn't been written for its zone's
+    wait_time_before_ready_to_move. Files that aren't stable yet are picked
+    up on a later beat tick.
     """
     try:
-        size1 = file_path.stat().st_size
-        time.sleep(CHECK_STABLE_SECONDS)
-        size2 = file_path.stat().st_size
-        return size1 == size2
+        mtime = file_path.stat().st_mtime
     except FileNotFoundError:
         return False
-
-
-def promote_to_ready(file_path: Path):
-    """
-    Move file from drop → ready folder.
-    """
-    ready_folder = file_path.parent.parent / READY_FOLDER_NAME
-    ready_folder.mkdir(exist_ok=True)
-
-    destination = ready_folder / file_path.name
-    shutil.move(str(file_path), str(destination))
-
-    logger.warning(f"MOVED: {file_path} → {destination}")
+    return time.time() - mtime >= stable_seconds_for(file_path, CHECK_STABLE_SECONDS)
 
 
 @shared_task
@@ -95,68 +104,197 @@ def scan_dropzones():
 # STAGE 2: READY → PROCESSING
 # =====================================================
 
-@shared_task(bind=True)
-def run_account_job_celery_task(self, accountjob_id):
+@shared_task
+def run_account_job_celery_task(accountjob_id):
     """
-    Actual job execution (isolated worker task)
+    Fan a job out across workers: one task per ready file.
+
+    One-file jobs: each file is a full snapshot, so the files run as a
+    chain, in filename order. Many-file jobs: the files together are one
+    snapshot, so they run in parallel as a chord whose callback finalises
+    deletions once every file is in.
     """
+    from raw_data.views import new_snapshot_id, ready_files_for
 
-    from django.db import connection
+    accountjob = AccountJob.objects.select_related("account", "job__source_schema", "sftp_drop_zone").get(pk=accountjob_id)
+    ready_folder = Path(ensure_local_ready_folder(accountjob))
 
-    logger.warning(
-        "CELERY DB CONTEXT user=%s db=%s host=%s",
-        connection.settings_dict.get("USER"),
-        connection.settings_dict.get("NAME"),
-        socket.gethostname(),
-    )
+    claimed = claim_files(accountjob.pk, ready_files_for(accountjob, ready_folder))
+    if not claimed:
+        logger.info(f"JOB {accountjob_id}: no new files")
+        return
 
+    queue = accountjob.account.celery_queue
+
+    if accountjob.job.one_or_many_source_files:
+        snapshot_id = new_snapshot_id()
+        # a file whose earlier run failed is re-queued on its own, not as
+        # part of its original drop: never finalise that as a full snapshot
+        complete = not any(failed_attempts(key) for path, key in claimed)
+        logger.info(f"FAN OUT JOB {accountjob_id} | snapshot={snapshot_id} | files={len(claimed)} | complete={complete}")
+        chord(
+            run_account_job_file_celery_task.si(accountjob.pk, str(path), key, snapshot_id).set(queue=queue)
+            for path, key in claimed
+        )(finalise_account_job_snapshot_celery_task.s(accountjob.pk, snapshot_id, complete).set(queue=queue))
+    else:
+        logger.info(f"CHAIN JOB {accountjob_id} | files={len(claimed)}")
+        canvas = chain(
+            run_account_job_file_celery_task.si(accountjob.pk, str(path), key).set(queue=queue)
+            for path, key in claimed
+        )
+        # a link failed: the links after it never run, so offer their files again
+        canvas.link_error(release_unfinished_leases_celery_task.si([key for path, key in claimed]).set(queue=queue))
+        canvas.apply_async()
 
+
+@shared_task(bind=True)
+def run_account_job_file_celery_task(self, accountjob_id, path_and_filename, lease_key, snapshot_id=None, parsed_path=None):
+    """
+    Process one ready file for one AccountJob (queued by tenants.dispatch,
+    fanned out above, or a step of a tenants.dag file DAG). Waits (via
+    retry, keeping its lease) while the job's run lock or the account's
+    slots are busy. The lease is released on failure so the file is
+    offered again, up to DISPATCH_MAX_ATTEMPTS failed runs.
+    """
     from raw_data.views import run_account_job
 
-    logger.warning(f"START JOB {accountjob_id}")
-    run_account_job(accountjob_id)
-    logger.warning(f"END JOB {accountjob_id}")
+    logger.info(f"START JOB {accountjob_id} | file={path_and_filename}")
+    try:
+        result = run_account_job(
+            accountjob_id,
+            path_and_filename=path_and_filename,
+            snapshot_id=snapshot_id,
+            parsed_path=parsed_path,
+        )
+    except LockNotAcquired as e:
+        if self.request.retries >= LOCK_MAX_RETRIES:
+            release_lease(lease_key)
+            raise
+        logger.info(f"JOB {accountjob_id} busy ({e}), retrying")
+        raise self.retry(countdown=LOCK_RETRY_SECONDS, max_retries=LOCK_MAX_RETRIES)
+    except Exception as e:
+        if record_failed_attempt(lease_key) >= DISPATCH_MAX_ATTEMPTS:
+            give_up_on_file(accountjob_id, path_and_filename, lease_key, e)
+        else:
+            release_lease(lease_key)
+        raise
+    complete_lease(lease_key)
+    logger.info(f"END JOB {accountjob_id} | file={path_and_filename}")
+    return result
+
+
+def give_up_on_file(accountjob_id, path_and_filename, lease_key, error):
+    """
+    A file version kept failing for a job: stop offering it, move it to
+    /failed (unless other jobs still consume it) and say why on its run.
+    """
+    path_and_filename = Path(path_and_filename)
+    fail_lease(lease_key)
+
+    message = f"Failed {DISPATCH_MAX_ATTEMPTS} times, giving up on this file: {error}"
+    if path_and_filename.exists() and len(accountjobs_for_file(path_and_filename)) <= 1:
+        failed_path = path_and_filename.parent.parent / "failed" / path_and_filename.name
+        failed_path.parent.mkdir(exist_ok=True)
+        os.replace(path_and_filename, failed_path)
+        message += f" (moved to {failed_path})"
+    logger.error(f"JOB {accountjob_id} | file={path_and_filename} | {message}")
+
+    ingest_run = (
+        IngestRun.objects
+        .filter(accountjob_id=accountjob_id, path_and_filename=str(path_and_filename))
+        .order_by("-id")
+        .first()
+    )
+    if ingest_run is None:
+        # failed before process_file got as far as creating its run
+        accountjob = AccountJob.objects.get(pk=accountjob_id)
+        ingest_run = IngestRun.objects.create(
+            account_id=accountjob.account_id,
+            accountjob=accountjob,
+            sftp_drop_zone_id=accountjob.sftp_drop_zone_id,
+            path_and_filename=str(path_and_filename),
+        )
+    ingest_run.result_text = message[:1000]
+    ingest_run.save(update_fields=["result_text"])
+    AccountJobLog.objects.create(ingest_run=ingest_run, message=message[:1000])
 
 
-@shared_task
-def scan_for_ready_files():
+@shared_task(bind=True)
+def finalise_account_job_snapshot_celery_task(self, results, accountjob_id, snapshot_id, complete=True):
     """
-    Celery Beat task:
-    Scans ready folders and queues processing jobs
+    Chord callback: runs once every file of a many-file snapshot is in
+    (never if one failed, so a partial snapshot deletes nothing).
     """
+    from raw_data.views import finalise_snapshot
 
-    jobs = AccountJob.objects.all().order_by("account", "order")
+    accountjob = AccountJob.objects.select_related("account", "job__source_schema", "job__canonical_schema").get(pk=accountjob_id)
+    try:
+        with account_job_run_lock(accountjob):
+            finalise_snapshot(accountjob, snapshot_id, results, complete)
+    except LockNotAcquired as e:
+        logger.info(f"FINALISE JOB {accountjob_id} busy ({e}), retrying")
+        raise self.retry(countdown=LOCK_RETRY_SECONDS, max_retries=LOCK_MAX_RETRIES)
+    logger.info(f"FINALISED JOB {accountjob_id} | snapshot={snapshot_id}")
 
-    for job in jobs:
-        try:
-            if job.auto_or_manual == "manual":
-                logger.warning('Job is set to manual - skipping')
-                continue
 
-            ready_folder = Path(ensure_local_ready_folder(job))
+# =====================================================
+# SHARED FILE DAG (tenants.dag)
+# =====================================================
 
-            if not ready_folder.exists():
-                logger.warning('ready folder not available - skipping')
-                continue
+@shared_task
+def parse_shared_file_celery_task(path_and_filename, parsed_path, consumers):
+    spill_parsed_file(path_and_filename, parsed_path, consumers)
 
-            logger.warning('Scan for ready files')
-            logger.warning('Prefix: ' + job.job.source_schema.filename_prefix)
-            for f in ready_folder.iterdir():
-                logger.warning('Filename:' + f.name)
-                
-            files = [
-                f for f in ready_folder.iterdir()
-                if f.is_file() and f.name.startswith(job.job.source_schema.filename_prefix)
-            ]
-            if not files:
-                logger.warning('No files available - skipping')
-                continue
 
-            logger.warning(f"QUEUE JOB {job.pk} | files={len(files)}")
+@shared_task
+def finish_shared_file_celery_task(path_and_filename, parsed_path, move_to_processed):
+    """
+    Last DAG step: every consumer of the file has finished.
+    """
+    path_and_filename = Path(path_and_filename)
+    if move_to_processed and path_and_filename.exists():
+        processed_path = path_and_filename.parent.parent / "processed" / path_and_filename.name
+        processed_path.parent.mkdir(exist_ok=True)
+        os.replace(path_and_filename, processed_path)
+        logger.info(f"MOVED: {path_and_filename} → {processed_path}")
+    remove_parsed_file(parsed_path)
+
 
-            # IMPORTANT: async execution
-            run_account_job_celery_task.delay(job.pk)
+@shared_task
+def release_unfinished_leases_celery_task(lease_keys, parsed_path=None):
+    """
+    Chain/DAG error callback: steps that never ran get their file again.
+    """
+    release_unfinished_leases(lease_keys)
+    if parsed_path:
+        remove_parsed_file(parsed_path)
 
-        except Exception as e:
-            logger.exception(f"ERROR job={job.pk}: {e}")
 
+@shared_task
+def scan_for_ready_files():
+    """
+    Celery Beat task:
+    Reconciliation sweep. Jobs are normally queued by the file_ready event
+    on promotion; this catches any file that was missed. Leases stop a file
+    being queued twice, so it is safe to run while jobs are in progress.
+    """
+    queued = reconcile_ready_folders()
+    if queued:
+        logger.warning(f"Reconciliation queued {queued} missed file(s)")
+
+    # parsed-file cache entries left behind by crashed runs
+    evicted = evict_stale_parsed_files(entry["ready_folder"].parent for entry in job_index.get().values())
+    if evicted:
+        logger.warning(f"Evicted {evicted} stale parsed file(s)")
+
+
+@shared_task
+def sync_dropzone_file_catalogues():
+    """
+    Celery Beat task:
+    Repairs the dashboard's file catalogue (the watcher keeps it current
+    from filesystem events) and drops old removal records.
+    """
+    changed = sync_catalogues()
+    if changed:
+        logger.info(f"File catalogue sweep updated {changed} file(s)")
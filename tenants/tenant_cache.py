@@ -0,0 +1,115 @@
+import copy
+import threading
+import time
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.versioned_cache import get_version
+
+TENANT_CACHE_NAME = "tenants"
+TENANT_CACHE_MAX_SIZE = getattr(settings, "TENANT_CACHE_MAX_SIZE", 5000)
+TENANT_CACHE_TTL_SECONDS = getattr(settings, "TENANT_CACHE_TTL_SECONDS", 5 * 60)
+
+
+class TenantCache:
+    """
+    Per-process LRU of Tenant instances by internal_tenant_code and rls_key,
+    shared by the ingest path (store_raw_row) and TenantResolutionMiddleware.
+
+    Entries expire after `ttl` seconds, the least recently used are dropped
+    past `maxsize`, and the whole cache is cleared when a Tenant is saved or
+    deleted anywhere (tenants.signals bumps the shared version, checked at
+    most every `check_interval` seconds). Misses are not cached.
+
+    Callers get their own copy of a cached Tenant, so one thread or request
+    changing an instance can't leak into another's.
+    """
+
+    def __init__(self, maxsize=TENANT_CACHE_MAX_SIZE, ttl=TENANT_CACHE_TTL_SECONDS, check_interval=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (field, value) -> (expires_at, tenant)
+        self._version = None
+        self._checked_at = 0
+
+    def _check_version(self, now):
+        if now - self._checked_at < self.check_interval:
+            return
+        version = get_version(TENANT_CACHE_NAME)
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        self._checked_at = now
+
+    def _cached(self, key, now):
+        # (call with the lock held)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, tenant = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                return copy.copy(tenant)
+            del self._entries[key]
+        return None
+
+    def _store(self, tenants, now):
+        with self._lock:
+            expires_at = now + self.ttl
+            # cache under both keys, whichever was asked for
+            for tenant in tenants:
+                # the caller keeps `tenant`: cache a copy it can't change
+                tenant = copy.copy(tenant)
+                for k in (("internal_tenant_code", tenant.internal_tenant_code), ("pk", str(tenant.pk))):
+                    self._entries[k] = (expires_at, tenant)
+                    self._entries.move_to_end(k)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _get(self, field, value):
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(now)
+            tenant = self._cached((field, str(value)), now)
+        if tenant is not None:
+            return tenant
+
+        from .models import Tenant
+        tenant = Tenant.objects.get(**{field: value})  # raises Tenant.DoesNotExist
+        self._store([tenant], now)
+        return tenant
+
+    def by_code(self, internal_tenant_code):
+        return self._get("internal_tenant_code", internal_tenant_code)
+
+    def by_rls_key(self, rls_key):
+        return self._get("pk", rls_key)
+
+    def many_by_rls_key(self, rls_keys):
+        """
+        Tenants for `rls_keys`, in order, loading every miss in one query.
+        Keys with no Tenant are left out.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(now)
+            found = {str(k): self._cached(("pk", str(k)), now) for k in rls_keys}
+
+        missing = [k for k, tenant in found.items() if tenant is None]
+        if missing:
+            from .models import Tenant
+            loaded = list(Tenant.objects.filter(pk__in=missing))
+            self._store(loaded, now)
+            found.update((str(tenant.pk), tenant) for tenant in loaded)
+
+        return [found[str(k)] for k in rls_keys if found[str(k)] is not None]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+tenant_cache = TenantCache()
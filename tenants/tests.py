@@ -1,8 +1,13 @@
 # tenants/tests/test_account_switch.py
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
-from tenants.models import UserAccount, Account, Tenant
+from canonical.models import CanonicalSchema, Job, SourceSchema, TableData
+from tenants.forms import AccountJobAdminForm
+from tenants.hierarchy import account_tree_json, build_account_tree
+from tenants.models import UserAccount, Account, AccountJob, SFTPDropZone, Tenant, TenantGroupType
+from tenants.tenant_cache import tenant_cache
 
 User = get_user_model()
 
@@ -51,3 +56,111 @@ class AccountTenantUserTests(TestCase):
 
         # Confirm user is logged out
         self.assertNotIn("_auth_user_id", self.client.session)
+
+
+class AccountTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = Account.objects.create(name="Acme", short="ACME")
+        for code, desc in (("ACME/LOC2/BRD", "Acme Leeds"), ("ACME/LOC1/BRD", "Acme York")):
+            Tenant.objects.create(account=self.account, internal_tenant_code=code, external_tenant_code=code, desc=desc)
+
+    def test_tree_lists_account_tenants_without_sandbox(self):
+        with self.assertNumQueries(1):
+            tree = build_account_tree(self.account, TenantGroupType.OPERATING)
+
+        self.assertEqual(tree[0]["text"], "Acme")
+        self.assertEqual(
+            [node["text"] for node in tree[0]["children"]],
+            ["Acme York (ACME/LOC1/BRD)", "Acme Leeds (ACME/LOC2/BRD)"],
+        )
+
+    def test_cached_tree_invalidated_by_tenant_changes(self):
+        self.assertNotIn("Acme Hull", account_tree_json(self.account))
+
+        Tenant.objects.create(
+            account=self.account, internal_tenant_code="ACME/LOC3/BRD", external_tenant_code="T3", desc="Acme Hull",
+        )
+
+        self.assertIn("Acme Hull", account_tree_json(self.account))
+
+
+class AccountJobDependencyTests(TestCase):
+    def setUp(self):
+        self.account = Account.objects.create(name="acme_test_account")
+        self.zone = SFTPDropZone.objects.create(account=self.account, zone_folder="DMS001")
+        self.other_zone = SFTPDropZone.objects.create(account=self.account, zone_folder="DMS002")
+        canonical_schema = CanonicalSchema.objects.create(name="customer", contract="contracts.Customer")
+
+        def job(prefix):
+            source_schema = SourceSchema.objects.create(name=prefix, system="DMS", filename_prefix=prefix)
+            test_table = TableData.objects.create(name=prefix)
+            return Job.objects.create(
+                desc=prefix, canonical_schema=canonical_schema,
+                source_schema=source_schema, test_table=test_table,
+            )
+
+        self.customers = AccountJob.objects.create(
+            account=self.account, job=job("CUST"), sftp_drop_zone=self.zone,
+        )
+        self.links_job = job("CUST_VEH")
+        self.vehicles_job = job("VEH")
+
+    def form(self, job, zone, depends_on):
+        return AccountJobAdminForm(data={
+            "account": self.account.pk,
+            "job": job.pk,
+            "sftp_drop_zone": zone.pk,
+            "auto_or_manual": "auto",
+            "order": 1,
+            "depends_on": [dependency.pk for dependency in depends_on],
+        })
+
+    def test_dependency_reading_the_same_file_is_accepted(self):
+        form = self.form(self.links_job, self.zone, [self.customers])
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_dependency_on_another_file_is_rejected(self):
+        form = self.form(self.vehicles_job, self.zone, [self.customers])
+        self.assertFalse(form.is_valid())
+        self.assertIn("same file", form.non_field_errors()[0])
+
+    def test_dependency_in_another_zone_is_rejected(self):
+        form = self.form(self.links_job, self.other_zone, [self.customers])
+        self.assertFalse(form.is_valid())
+
+    def test_moving_a_dependency_to_another_file_is_rejected(self):
+        links = AccountJob.objects.create(account=self.account, job=self.links_job, sftp_drop_zone=self.zone)
+        links.depends_on.add(self.customers)
+
+        form = AccountJobAdminForm(instance=self.customers, data={
+            "account": self.account.pk,
+            "job": self.vehicles_job.pk,
+            "sftp_drop_zone": self.zone.pk,
+            "auto_or_manual": "auto",
+            "order": 0,
+        })
+        self.assertFalse(form.is_valid())
+
+
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        tenant_cache.clear()
+        self.addCleanup(tenant_cache.clear)
+        self.account = Account.objects.create(name="Acme", short="ACME")
+        self.tenant = Tenant.objects.create(
+            account=self.account, internal_tenant_code="ACME/LOC1/BRD",
+            external_tenant_code="001", desc="Acme Tenant",
+        )
+
+    def test_callers_get_their_own_copy(self):
+        first = tenant_cache.by_code(self.tenant.internal_tenant_code)
+        first.desc = "changed by one caller"
+
+        with self.assertNumQueries(0):
+            second = tenant_cache.by_rls_key(self.tenant.pk)
+            (third,) = tenant_cache.many_by_rls_key([self.tenant.pk])
+
+        self.assertEqual(second.desc, "Acme Tenant")
+        self.assertIsNot(second, third)
+        self.assertEqual(third.pk, self.tenant.pk)
@@ -35,4 +35,5 @@ urlpatterns = [
     path('admin/dropzone-files/<int:pk>/', dropzone_files_api, name='dropzone_files_api'),
     path('dropzone/<int:pk>/ingest-runs/', views.processor_logs_for_sftpdropzone_api, name="processor_logs_for_sftpdropzone_api",
     ),
+    path('admin/dropzone-events/<int:pk>/', views.dropzone_events, name='dropzone_events'),
 ]
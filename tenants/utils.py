@@ -1,10 +1,16 @@
 from .models import Tenant, UserAccount, Account
+from .tenant_cache import tenant_cache
 from django.conf import settings
+from django.core.cache import cache
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+USER_TENANTS_KEY_PREFIX = "user_tenants:"
+# Backstop only: tenants.signals deletes the entry on UserAccount/Tenant changes
+USER_TENANTS_TTL_SECONDS = 60 * 60
+
 
 class NoTenantError(Exception):
     pass
@@ -14,6 +20,33 @@ class MultipleTenantsError(Exception):
     pass
 
 
+def user_tenants_key(user_id):
+    return f"{USER_TENANTS_KEY_PREFIX}{user_id}"
+
+def get_user_tenant_ids(user):
+    """
+    rls_keys (as strings) of the tenants of the user's account, cached per
+    user in Django's cache so steady-state requests run no queries.
+    """
+    key = user_tenants_key(user.pk)
+    tenant_ids = cache.get(key)
+    if tenant_ids is None:
+        # Get the user's account (exactly 1)
+        account_id = UserAccount.objects.values_list("account_id", flat=True).get(user=user)
+
+        # Get all tenants linked to that account
+        tenant_ids = [
+            str(pk) for pk in Tenant.objects.filter(account_id=account_id).values_list("pk", flat=True)
+        ]
+        cache.set(key, tenant_ids, USER_TENANTS_TTL_SECONDS)
+    return tenant_ids
+
+def invalidate_user_tenants(user_ids):
+    cache.delete_many([user_tenants_key(user_id) for user_id in user_ids])
+
+def get_user_tenants(user):
+    return tenant_cache.many_by_rls_key(get_user_tenant_ids(user))
+
 def resolve_user_tenant(request):
     """
     Determines tenant for the logged-in user.
@@ -28,18 +61,14 @@ def resolve_user_tenant(request):
     if user.is_superuser:
         return None
 
-    # Get the user's account (exactly 1)
-    account = UserAccount.objects.get(user=user).account
-
-    # Get all tenants linked to that account
-    tenants = Tenant.objects.filter(account=account)
+    tenant_ids = get_user_tenant_ids(user)
     
-    if tenants.count() == 0:
+    if len(tenant_ids) == 0:
         raise NoTenantError("User has no tenants")
 
-    if tenants.count() == 1:
-        tenant = tenants.first()
-        request.session["tenant_id"] = str(tenant.rls_key)
+    if len(tenant_ids) == 1:
+        tenant = tenant_cache.by_rls_key(tenant_ids[0])
+        request.session["tenant_id"] = tenant_ids[0]
         return tenant
 
     # More than one → user must choose
@@ -48,33 +77,29 @@ def resolve_user_tenant(request):
 def get_current_tenant(request):
     tenant_id = request.session.get("tenant_id")
     if tenant_id:
-        return Tenant.objects.get(rls_key=tenant_id)
+        return tenant_cache.by_rls_key(tenant_id)
     return None
 
-def ensure_local_ready_folder(accountjob):
+def zone_folder(sftp_drop_zone, folder_name):
+    """
+    Local path of one of a drop zone's folders (drop/ready/processed/failed).
+    """
     is_staging = getattr(settings, "IS_STAGING_SERVER", False)
-    
+
     if is_staging:
         base_dir = f"{settings.BASE_DIR}/temp_files"
     else:
         base_dir = "/srv"
 
-    try:
-        folder_path = accountjob.sftp_drop_zone.folder_path
-    except Exception as e:
-        raise
+    cleaned = sftp_drop_zone.folder_path.strip("/").split("/")
+    subpath = "/".join(cleaned[-3:-1])
 
-    try:
-        cleaned = folder_path.strip("/").split("/")
-    except Exception as e:
-        raise
+    return f"{base_dir}/sftp_drops/{subpath}/{folder_name}"
 
-    try:
-        subpath = "/".join(cleaned[-3:-1])
-    except Exception as e:
-        raise
+def ensure_local_ready_folder(accountjob):
+    is_staging = getattr(settings, "IS_STAGING_SERVER", False)
 
-    p = f"{base_dir}/sftp_drops/{subpath}/ready"
+    p = zone_folder(accountjob.sftp_drop_zone, "ready")
 
     if is_staging:
         try:
@@ -5,30 +5,36 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login, logout, get_user_model
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, CreateView, UpdateView
 from django.conf import settings
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_protect
-from django.utils.timezone import make_aware
 from django.utils.dateformat import format as date_format
+from django.utils import timezone
+from django.db.models import Count, Max, Q
 
 # Local app
-from .models import Account, Tenant, UserAccount, AccountJob, SFTPDropZone, AccountJobLog, IngestRun
+from .models import Account, Tenant, UserAccount, AccountJob, SFTPDropZone, AccountJobLog, IngestRun, DropZoneFile
+from .file_catalogue import CATALOGUE_TOMBSTONE_DAYS
+from .dropzones import dropzone_channel
 from .forms import TenantForm, SFTPUploadForm
-from .utils import get_current_tenant
+from .utils import get_current_tenant, get_user_tenants
+from .tenant_cache import tenant_cache
 
 from canonical.widgets import PalmtreeExcelWidget
 from canonical.views import strip_empty_columns, strip_empty_rows, serialize_tabledata_for_widget, canonical_json_to_excel_style_table
 from canonical.etl import etl_transform
+from canonical.plan import build_execution_plan
 from canonical.models import Job
+from core.events import sse_stream
 from tenants.utils import ensure_local_ready_folder
 
 import paramiko
 import os
-from datetime import datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 from uuid import UUID
 import csv
@@ -49,11 +55,8 @@ def select_tenant(request):
     if user.is_superuser:
         return None
     
-    # Get the user's account (exactly 1)
-    account = UserAccount.objects.get(user=user).account
-
-    # Get all tenants linked to that account
-    tenants = Tenant.objects.filter(account=account)
+    # Tenants of the user's account (cached per user)
+    tenants = get_user_tenants(user)
 
     if request.method == "POST":
         tenant_id = request.POST.get("tenant")
@@ -81,7 +84,7 @@ def home(request):
     print (tenant_id)
     if tenant_id:
         try:
-            tenant = Tenant.objects.get(rls_key=UUID(tenant_id))
+            tenant = tenant_cache.by_rls_key(UUID(tenant_id))
             tenant_desc = tenant.desc
         except Tenant.DoesNotExist:
             tenant_desc = None
@@ -225,16 +228,12 @@ def accountjob_transform(accountjob, header, rows):
         "source_schema",
         "test_table"
     ).get(pk=accountjob.job.pk)
-    source_fields = job.source_schema.field_mappings.all()
-    tenant_mapping = accountjob.tenant_mapping
+    plan = build_execution_plan(job.source_schema, job.canonical_schema, accountjob.tenant_mapping)
 
-    canonical_fields = job.canonical_schema.fields.all()
     raw_json_rows, canonical_rows, display_rows = etl_transform(
-        source_fields=source_fields,
-        canonical_fields=canonical_fields,
+        plan,
         orig_header=header,
         orig_rows=rows,
-        tenant_mapping=tenant_mapping,
         prepare_for_display=True,
     )
     return raw_json_rows, canonical_rows, display_rows
@@ -395,62 +394,176 @@ def upload_to_sftp(file_obj, remote_path):
     sftp.close()
     transport.close()
 
+FILES_API_PAGE_SIZE = 500
+FILES_API_MAX_PAGE_SIZE = 2000
+# rows changed this recently may still have concurrent, uncommitted siblings
+# with earlier timestamps: don't move a cursor past them
+FILES_API_CURSOR_SETTLE_SECONDS = 5
+
+def encode_keyset_cursor(moment, pk):
+    return f"{int(moment.timestamp() * 1_000_000)}.{pk}"
+
+def decode_keyset_cursor(cursor):
+    micros, pk = cursor.split(".")
+    return datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc), int(pk)
+
 @staff_member_required
 def dropzone_files_api(request, pk):
+    """
+    The zone's file catalogue (tenants.file_catalogue), oldest change first.
+
+    Without `cursor`: the current files. With `cursor` (from a previous
+    response): only files changed since, including removals ("deleted").
+    Pages of `limit` rows; keep requesting with the returned cursor while
+    `more` is true. `reset` means the cursor is too old to replay removals
+    and the client should drop its state and start again.
+    """
     dropzone = get_object_or_404(SFTPDropZone, pk=pk)
-    base_folder = os.path.dirname(dropzone.folder_path)
-    files = []
+    files = DropZoneFile.objects.filter(sftp_drop_zone=dropzone)
 
     try:
-        for root, dirs, filenames in os.walk(base_folder):
-            for f in filenames:
-                full_path = os.path.join(root, f)
-                if os.path.isfile(full_path):
-                    stat = os.stat(full_path)
-                    relative_path = os.path.relpath(full_path, base_folder)
-                    files.append({
-                        "name": f,
-                        "path": relative_path,
-                        "size": stat.st_size,
-                        "modified": make_aware(datetime.fromtimestamp(stat.st_mtime))
-                                    .strftime("%Y-%m-%d %H:%M:%S"),
-                    })
-    except FileNotFoundError:
-        pass
-
-    files.sort(key=lambda x: x["modified"], reverse=True)
-
-    # return array directly
-    return JsonResponse(files, safe=False)
+        limit = int(request.GET.get("limit", FILES_API_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, FILES_API_MAX_PAGE_SIZE)
+        cursor = decode_keyset_cursor(request.GET["cursor"]) if request.GET.get("cursor") else None
+    except ValueError:
+        return JsonResponse({"error": "Bad limit or cursor"}, status=400)
+
+    # unchanged since the client's last poll → 304, one aggregate query
+    state = files.aggregate(latest=Max("updated_at"), total=Count("id"))
+    etag = f'"{pk}-{request.GET.get("cursor", "")}-{limit}-{state["latest"] and state["latest"].timestamp()}-{state["total"]}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    reset = False
+    if cursor and cursor[0] < timezone.now() - timedelta(days=CATALOGUE_TOMBSTONE_DAYS):
+        cursor, reset = None, True
+
+    if cursor:
+        updated_at, last_pk = cursor
+        files = files.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=last_pk))
+    else:
+        files = files.filter(deleted=False)
+
+    page = list(files.order_by("updated_at", "id")[:limit + 1])
+    more = len(page) > limit
+    page = page[:limit]
+
+    if page:
+        next_updated_at, next_pk = page[-1].updated_at, page[-1].pk
+    else:
+        next_updated_at, next_pk = cursor or (timezone.now(), 0)
+    settled = timezone.now() - timedelta(seconds=FILES_API_CURSOR_SETTLE_SECONDS)
+    if not more and next_updated_at > settled:
+        # replay the last few seconds next poll (clients apply rows idempotently)
+        next_updated_at, next_pk = settled, 0
+
+    response = JsonResponse({
+        "files": [
+            {
+                "name": f.name,
+                "path": f"{f.folder}/{f.name}",
+                "folder": f.folder,
+                "size": f.size,
+                "modified": f.modified.strftime("%Y-%m-%d %H:%M:%S"),
+                "deleted": f.deleted,
+            }
+            for f in page
+        ],
+        "cursor": encode_keyset_cursor(next_updated_at, next_pk),
+        "more": more,
+        "reset": reset,
+    })
+    response["ETag"] = etag
+    return response
+
+@staff_member_required
+def dropzone_events(request, pk):
+    """
+    Server-sent events for a dropzone: file changes ("file"/"files") and
+    ingest run start/stage/progress/outcome ("run", "stage", "progress").
+    """
+    dropzone = get_object_or_404(SFTPDropZone, pk=pk)
+
+    response = StreamingHttpResponse(sse_stream([dropzone_channel(dropzone.pk)]), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx: pass events straight through
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+LOGS_API_PAGE_SIZE = 10
+LOGS_API_MAX_PAGE_SIZE = 100
+
+def ingest_run_to_dict(run):
+    return {
+        "id": run.pk,
+        "accountjob": run.accountjob.job.desc,
+        "sftp_drop_zone": run.sftp_drop_zone.zone_folder if run.sftp_drop_zone else None,
+        "completed_datetime": run.completed_datetime,
+        "result_text": run.result_text,
+        "filename": Path(run.path_and_filename).name,
+    }
 
 @require_GET
 def processor_logs_for_sftpdropzone_api(request, pk):
     """
-    Return recent processor logs for a given dropzone.
+    Ingest runs for a dropzone, newest first, keyset paginated on
+    (completed_datetime, id) so cost doesn't grow with the table.
+
+    `before=<cursor>` pages back through older runs (use the returned
+    `next`); `since=<cursor>` returns only runs newer than a previous
+    response's `latest`, for cheap polling.
     """
 
     # Optional: validate dropzone exists
-    try:
-        sftp_drop_zone = SFTPDropZone.objects.get(pk=pk)
-    except SFTPDropZone.DoesNotExist:
+    if not SFTPDropZone.objects.filter(pk=pk).exists():
         return JsonResponse({"error": "Not found"}, status=404)
 
-    logs = (
+    try:
+        limit = int(request.GET.get("limit", LOGS_API_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, LOGS_API_MAX_PAGE_SIZE)
+        before = decode_keyset_cursor(request.GET["before"]) if request.GET.get("before") else None
+        since = decode_keyset_cursor(request.GET["since"]) if request.GET.get("since") else None
+    except ValueError:
+        return JsonResponse({"error": "Bad limit or cursor"}, status=400)
+
+    runs = (
         IngestRun.objects
-        .filter(sftp_drop_zone=sftp_drop_zone)
-        .order_by("created_at")[:100]   # limit for performance
+        .filter(sftp_drop_zone_id=pk)
+        .select_related("accountjob__job", "sftp_drop_zone")
+        .order_by("-completed_datetime", "-id")
     )
-
-    data = [
-        {
-            "accountjob":log.accountjob.job.desc,
-            "sftp_drop_zone": log.igest_run.sftp_drop_zone.zone_folder,
-            "completed_datetime": log.completed_datetime,
-            "result_text": log.result_text,
-            "filename": Path(log.path_and_filename).name
-
-        }
-        for log in logs
-    ]
-
-    return JsonResponse(data, safe=False)
\ No newline at end of file
+    if before:
+        completed_datetime, run_id = before
+        runs = runs.filter(
+            Q(completed_datetime__lt=completed_datetime)
+            | Q(completed_datetime=completed_datetime, id__lt=run_id)
+        )
+    if since:
+        completed_datetime, run_id = since
+        runs = runs.filter(
+            Q(completed_datetime__gt=completed_datetime)
+            | Q(completed_datetime=completed_datetime, id__gt=run_id)
+        )
+
+    page = list(runs[:limit + 1])
+    more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse({
+        "runs": [ingest_run_to_dict(run) for run in page],
+        # older page, if there is one
+        "next": encode_keyset_cursor(page[-1].completed_datetime, page[-1].pk) if more else None,
+        # poll with since=latest for newer runs
+        "latest": (
+            encode_keyset_cursor(page[0].completed_datetime, page[0].pk) if page
+            else request.GET.get("since")
+        ),
+        # with since: more new runs than one page, the client should reload
+        "more": more,
+    })
@@ -1,125 +1,110 @@
 import time
-import shutil
 import logging
 import os
 
 from pathlib import Path
-from threading import Thread, Lock
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from tenants.dropzones import promote_to_ready, stable_seconds_for
+from tenants.file_catalogue import record_file, record_move, record_removed
+from watcher.stability import StabilityTracker
+
 # =========================
 # Configuration
 # =========================
 
 BASE_FOLDER = Path("/srv/sftp_drops")
-READY_FOLDER_NAME = "ready"
 
-SFTP_DROP_STABLE_SECONDS = int(os.getenv("SFTP_DROP_STABLE_SECONDS"))
-CHECK_INTERVAL = 5
+# Stability window for drop folders with no SFTPDropZone row; configured zones
+# use their own wait_time_before_ready_to_move
+SFTP_DROP_STABLE_SECONDS = int(os.getenv("SFTP_DROP_STABLE_SECONDS", "60"))
 
 # =========================
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-processing_files = set()
-processing_lock = Lock()
-
 
-class DropzoneHandler(FileSystemEventHandler):
+def promote(file_path: Path):
     """
-    Watches drop folders and promotes files
-    once they are stable for SFTP_DROP_STABLE_SECONDS.
+    Rename file into the ready folder (same filesystem, so no copy).
     """
+    try:
+        promote_to_ready(file_path)
+    except Exception:
+        logger.exception(f"Failed to promote: {file_path}")
 
-    def on_created(self, event):
-        if not event.is_directory:
-            self._handle(Path(event.src_path))
-
-    def on_modified(self, event):
-        if not event.is_directory:
-            self._handle(Path(event.src_path))
-
-    def on_moved(self, event):
-        if not event.is_directory:
-            self._handle(Path(event.dest_path))
-
-    def _handle(self, file_path: Path):
-        """
-        Start monitoring a file if inside a 'drop' folder.
-        """
-
-        if file_path.parent.name != "drop":
-            return
-
-        with processing_lock:
-            if file_path in processing_files:
-                return
-            processing_files.add(file_path)
-
-        logger.info(f"Tracking file: {file_path}")
-
-        Thread(
-            target=self._wait_and_promote,
-            args=(file_path,),
-            daemon=True
-        ).start()
-
-    def _wait_and_promote(self, file_path: Path):
-        """
-        Wait until file size is stable,
-        then move to ready folder.
-        """
 
-        try:
-            last_size = -1
-            stable_start = None
+def zone_stable_seconds(file_path: Path):
+    try:
+        return stable_seconds_for(file_path, SFTP_DROP_STABLE_SECONDS)
+    except Exception:
+        # DB/cache unavailable - keep watching with the default window
+        logger.exception(f"Could not load drop zone config for: {file_path}")
+        return SFTP_DROP_STABLE_SECONDS
 
-            while True:
 
-                if not file_path.exists():
-                    logger.info(f"File no longer exists: {file_path}")
-                    return
+# Promotion is a rename, cheap enough to run on the tracker thread itself
+tracker = StabilityTracker(
+    on_stable=promote,
+    stable_seconds_for=zone_stable_seconds,
+)
 
-                current_size = file_path.stat().st_size
 
-                if current_size == last_size:
-                    if stable_start is None:
-                        stable_start = time.time()
-                    elif time.time() - stable_start >= SFTP_DROP_STABLE_SECONDS:
-                        self._promote(file_path)
-                        return
-                else:
-                    stable_start = None
-                    last_size = current_size
+def is_drop_file(file_path: Path):
+    return file_path.parent.name == "drop"
 
-                time.sleep(CHECK_INTERVAL)
 
-        finally:
-            with processing_lock:
-                processing_files.discard(file_path)
+def catalogue(record, *file_paths):
+    """
+    Keep the dashboard's file catalogue current; the periodic sweep repairs
+    anything missed here.
+    """
+    try:
+        record(*file_paths)
+    except Exception:
+        logger.exception(f"Failed to update file catalogue for: {file_paths}")
 
-    def _promote(self, file_path: Path):
-        """
-        Copy file to ready folder and delete original.
-        """
 
-        ready_folder = file_path.parent.parent / READY_FOLDER_NAME
-        ready_folder.mkdir(exist_ok=True)
+class DropzoneHandler(FileSystemEventHandler):
+    """
+    Watches drop folders and feeds file activity into the stability tracker,
+    which promotes files once they are stable for their zone's
+    wait_time_before_ready_to_move.
+    """
 
-        destination = ready_folder / file_path.name
+    def on_created(self, event):
+        if not event.is_directory:
+            catalogue(record_file, Path(event.src_path))
+            self._touch(Path(event.src_path))
 
-        try:
-            shutil.copy2(file_path, destination)
-            logger.info(f"Copied: {file_path} → {destination}")
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._touch(Path(event.src_path))
 
-            file_path.unlink()
-            logger.info(f"Deleted original: {file_path}")
+    def on_moved(self, event):
+        if not event.is_directory:
+            # promotions, and moves to processed/failed by the workers
+            catalogue(record_move, Path(event.src_path), Path(event.dest_path))
+            tracker.forget(Path(event.src_path))
+            self._touch(Path(event.dest_path))
+
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE (Linux only); other platforms rely on the window
+        if not event.is_directory and is_drop_file(Path(event.src_path)):
+            catalogue(record_file, Path(event.src_path))
+            tracker.closed(Path(event.src_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            catalogue(record_removed, Path(event.src_path))
+            tracker.forget(Path(event.src_path))
 
-        except Exception:
-            logger.exception(f"Failed to promote: {file_path}")
+    def _touch(self, file_path: Path):
+        if is_drop_file(file_path):
+            tracker.touch(file_path)
 
 
 # =========================
@@ -141,7 +126,7 @@ def scan_existing_files():
         for file_path in drop_folder.iterdir():
             if file_path.is_file():
                 logger.info(f"Found existing file: {file_path}")
-                DropzoneHandler()._handle(file_path)
+                tracker.touch(file_path)
 
 
 # =========================
@@ -154,6 +139,8 @@ def start_dropzone_watcher():
         logger.error(f"Base folder does not exist: {BASE_FOLDER}")
         return
 
+    tracker.start()
+
     # First: process files already on disk
     scan_existing_files()
 
@@ -172,6 +159,7 @@ def start_dropzone_watcher():
         observer.stop()
 
     observer.join()
+    tracker.stop()
 
 
 if __name__ == "__main__":
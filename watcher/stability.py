@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# After an inotify close-write the upload is normally complete; wait this long
+# for a reopen/append (e.g. a resumed SFTP upload) before promoting
+CLOSE_WRITE_SETTLE_SECONDS = 2
+
+
+class StabilityTracker:
+    """
+    Tracks files being uploaded into drop folders and calls `on_stable(path)`
+    once a file has seen no activity for its stability window.
+
+    One thread serves every file: per-file deadlines live in a heap and the
+    thread sleeps on a condition until the earliest deadline (or new work).
+    Filesystem events only update an in-memory record, so a busy upload that
+    fires thousands of modify events costs O(1) per event; the heap entry is
+    re-armed lazily when it comes due.
+
+    A file is stable when, at its deadline, no event has arrived within the
+    window and its size/mtime are unchanged since the last event. inotify
+    close-write events shorten the window to CLOSE_WRITE_SETTLE_SECONDS.
+
+    `clock` (monotonic seconds) can be swapped for a fake in tests, which
+    drive pop_due() directly instead of starting the thread.
+    """
+
+    def __init__(self, on_stable, stable_seconds_for, clock=time.monotonic):
+        self.on_stable = on_stable
+        self.stable_seconds_for = stable_seconds_for
+        self.clock = clock
+
+        self._heap = []                 # (deadline, seq, path)
+        self._tracked = {}              # path -> {"last_activity", "window", "stat"}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="stability-tracker", daemon=True)
+
+    # -------------------------
+    # Events
+    # -------------------------
+    def touch(self, file_path: Path):
+        """
+        Created / modified / moved-in: (re)start the stability window.
+        """
+        self._activity(file_path, self.stable_seconds_for(file_path))
+
+    def closed(self, file_path: Path):
+        """
+        inotify close-write: the writer has finished, so settle briefly.
+        """
+        self._activity(file_path, min(CLOSE_WRITE_SETTLE_SECONDS, self.stable_seconds_for(file_path)))
+
+    def forget(self, file_path: Path):
+        with self._cond:
+            self._tracked.pop(file_path, None)
+
+    def _activity(self, file_path: Path, window):
+        now = self.clock()
+        with self._cond:
+            record = self._tracked.get(file_path)
+            if record is None:
+                logger.info(f"Tracking file: {file_path}")
+                self._tracked[file_path] = {
+                    "last_activity": now,
+                    "window": window,
+                    "stat": _stat(file_path),
+                }
+                self._push(now + window, file_path)
+                return
+
+            # Already tracked: just record the activity, the pending heap entry
+            # re-arms itself when it comes due. A close-write shortens the
+            # window, so that needs an earlier entry.
+            record["last_activity"] = now
+            record["stat"] = _stat(file_path)
+            if window < record["window"]:
+                self._push(now + window, file_path)
+            record["window"] = window
+
+    def _push(self, deadline, file_path):
+        heapq.heappush(self._heap, (deadline, next(self._seq), file_path))
+        self._cond.notify()
+
+    # -------------------------
+    # Timer loop
+    # -------------------------
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._tracked)
+
+    def pop_due(self):
+        """
+        Files stable as of now, removed from tracking (on_stable not called).
+        """
+        with self._cond:
+            return self._pop_due(self.clock())
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, file_path = heapq.heappop(self._heap)
+            if self._check_due(file_path, now):
+                due.append(file_path)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - self.clock()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+
+                if self._stopped:
+                    return
+
+                due = self._pop_due(self.clock())
+
+            for file_path in due:
+                try:
+                    self.on_stable(file_path)
+                except Exception:
+                    logger.exception(f"Failed to handle stable file: {file_path}")
+
+    def _check_due(self, file_path, now):
+        """
+        Called with the lock held. Returns True if the file is stable and has
+        been removed from tracking; otherwise re-arms or drops it.
+        """
+        record = self._tracked.get(file_path)
+        if record is None:
+            # stale heap entry (already promoted or forgotten)
+            return False
+
+        stable_at = record["last_activity"] + record["window"]
+        if stable_at > now:
+            # activity since this entry was pushed
+            self._push(stable_at, file_path)
+            return False
+
+        current = _stat(file_path)
+        if current is None:
+            logger.info(f"File no longer exists: {file_path}")
+            del self._tracked[file_path]
+            return False
+
+        if current != record["stat"]:
+            # changed without us seeing an event (e.g. polling observer)
+            record["stat"] = current
+            record["last_activity"] = now
+            self._push(now + record["window"], file_path)
+            return False
+
+        del self._tracked[file_path]
+        return True
+
+
+def _stat(file_path: Path):
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
@@ -0,0 +1,143 @@
+import tempfile
+
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from watcher.stability import CLOSE_WRITE_SETTLE_SECONDS, StabilityTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class StabilityTrackerTests(SimpleTestCase):
+    WINDOW = 10
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.folder = Path(tmp.name)
+        self.clock = FakeClock()
+        self.tracker = StabilityTracker(
+            on_stable=lambda path: None,
+            stable_seconds_for=lambda path: self.WINDOW,
+            clock=self.clock,
+        )
+
+    def upload(self, name, contents="a|b\n"):
+        path = self.folder / name
+        path.write_text(contents)
+        return path
+
+    def test_due_after_window(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+
+        self.clock.advance(self.WINDOW - 1)
+        self.assertEqual(self.tracker.pop_due(), [])
+
+        self.clock.advance(1)
+        self.assertEqual(self.tracker.pop_due(), [path])
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+    def test_touch_restarts_window(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+        self.clock.advance(5)
+        self.tracker.touch(path)
+
+        self.clock.advance(5)
+        self.assertEqual(self.tracker.pop_due(), [])
+        self.assertEqual(self.tracker.pending_count(), 1)
+
+        self.clock.advance(5)
+        self.assertEqual(self.tracker.pop_due(), [path])
+
+    def test_closed_settles_briefly(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+        self.tracker.closed(path)
+
+        self.clock.advance(CLOSE_WRITE_SETTLE_SECONDS)
+        self.assertEqual(self.tracker.pop_due(), [path])
+
+        # the original, longer entry is stale once the file is promoted
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [])
+
+    def test_closed_never_lengthens_window(self):
+        tracker = StabilityTracker(lambda path: None, lambda path: 1, clock=self.clock)
+        path = self.upload("file.csv")
+        tracker.closed(path)
+
+        self.clock.advance(1)
+        self.assertEqual(tracker.pop_due(), [path])
+
+    def test_touch_after_closed_restores_full_window(self):
+        path = self.upload("file.csv")
+        self.tracker.closed(path)
+        self.clock.advance(1)
+        self.tracker.touch(path)
+
+        # a reopen/append: the upload isn't finished after all
+        self.clock.advance(CLOSE_WRITE_SETTLE_SECONDS)
+        self.assertEqual(self.tracker.pop_due(), [])
+        self.clock.advance(self.WINDOW - CLOSE_WRITE_SETTLE_SECONDS)
+        self.assertEqual(self.tracker.pop_due(), [path])
+
+    def test_forget(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+        self.tracker.forget(path)
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [])
+
+    def test_forget_untracked_file(self):
+        self.tracker.forget(self.folder / "never_seen.csv")
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+    def test_change_without_event_rearms(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+        path.write_text("a|b\nc|d\n")
+
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [])
+        self.assertEqual(self.tracker.pending_count(), 1)
+
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [path])
+
+    def test_deleted_file_is_dropped(self):
+        path = self.upload("file.csv")
+        self.tracker.touch(path)
+        path.unlink()
+
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [])
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+    def test_files_come_due_in_deadline_order(self):
+        first = self.upload("first.csv")
+        second = self.upload("second.csv")
+        third = self.upload("third.csv")
+        self.tracker.touch(first)
+        self.clock.advance(3)
+        self.tracker.touch(second)
+        self.tracker.closed(third)
+
+        self.clock.advance(CLOSE_WRITE_SETTLE_SECONDS)
+        self.assertEqual(self.tracker.pop_due(), [third])
+
+        self.clock.advance(self.WINDOW)
+        self.assertEqual(self.tracker.pop_due(), [first, second])